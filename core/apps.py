@@ -7,3 +7,8 @@ class CoreConfig(AppConfig):
 
     def ready(self) -> None:
         import core.signals.handlers
+        from django.db.backends.signals import connection_created
+
+        from .metrics import install_query_recorder
+
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,101 @@
+import os
+import time
+from contextvars import ContextVar
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess
+
+REQUEST_LATENCY = Histogram(
+    "storefront_request_duration_seconds",
+    "Time spent handling a request",
+    ["view", "method", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "storefront_request_db_queries",
+    "Database queries run by a request",
+    ["view"],
+    buckets=[0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89],
+)
+REQUEST_DB_TIME = Histogram(
+    "storefront_request_db_duration_seconds",
+    "Time a request spent waiting on the database",
+    ["view"],
+)
+REQUEST_RESPONSE_SIZE = Histogram(
+    "storefront_response_size_bytes",
+    "Size of non-streaming response bodies",
+    ["view"],
+    buckets=[2**exponent for exponent in range(8, 24, 2)],
+)
+CACHE_LOOKUPS = Counter(
+    "storefront_cache_lookups_total",
+    "Catalog cache lookups by result",
+    ["view", "result"],
+)
+TASK_LATENCY = Histogram(
+    "storefront_celery_task_duration_seconds",
+    "Time spent running a Celery task",
+    ["task", "state"],
+)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+current_request = ContextVar("current_request", default=None)
+
+
+# Installed on every connection (see CoreConfig.ready). The ORM's
+# sync_to_async threads copy the request context, so async views are
+# counted too.
+def record_query(execute, sql, params, many, context):
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_cache_lookup(hit):
+    stats = current_request.get()
+    if stats is None:
+        CACHE_LOOKUPS.labels(view="", result="hit" if hit else "miss").inc()
+    elif hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+def observe_request(view, method, status, duration, stats, size=None):
+    REQUEST_LATENCY.labels(view=view, method=method, status=status).observe(duration)
+    REQUEST_DB_QUERIES.labels(view=view).observe(stats.queries)
+    REQUEST_DB_TIME.labels(view=view).observe(stats.db_time)
+    if stats.cache_hits:
+        CACHE_LOOKUPS.labels(view=view, result="hit").inc(stats.cache_hits)
+    if stats.cache_misses:
+        CACHE_LOOKUPS.labels(view=view, result="miss").inc(stats.cache_misses)
+    if size is not None:
+        REQUEST_RESPONSE_SIZE.labels(view=view).observe(size)
+
+
+def registry():
+    # gunicorn workers and prefork Celery children each keep their own
+    # metrics, prometheus_client merges them when PROMETHEUS_MULTIPROC_DIR is set.
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry)
+    return collector_registry
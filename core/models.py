@@ -1,6 +1,22 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import OpClass
+
+
+# The admin's customer and order searches are case-insensitive prefix matches,
+# which Postgres runs as UPPER(column::text) LIKE 'TERM%'.
+def upper_prefix_index(field, name):
+    return models.Index(OpClass(Upper(field), name="text_pattern_ops"), name=name)
 
 
 class User(AbstractUser):
     email = models.CharField(max_length=255, unique=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            upper_prefix_index("username", "user_username_upper_like"),
+            upper_prefix_index("email", "user_email_upper_like"),
+            upper_prefix_index("first_name", "user_first_name_upper_like"),
+            upper_prefix_index("last_name", "user_last_name_upper_like"),
+        ]
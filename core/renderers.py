@@ -0,0 +1,40 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# orjson and msgpack encode the common types themselves and hand the rest
+# (Decimal, lazy strings, querysets...) to DRF's encoder, so both agree with
+# what JSONRenderer has always returned.
+encode_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        options = self.options
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=encode_default, option=options)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+# Opt in per view with renderer_classes = FAST_RENDERER_CLASSES; everything
+# else keeps DRF's JSONRenderer. Clients that don't ask for
+# application/msgpack still get JSON.
+FAST_RENDERER_CLASSES = [ORJSONRenderer, MessagePackRenderer, BrowsableAPIRenderer]
@@ -3,4 +3,7 @@ from django.views.generic import TemplateView
 from . import views
 
 # URLConf
-urlpatterns = [path("", TemplateView.as_view(template_name="core/index.html"))]
+urlpatterns = [
+    path("", TemplateView.as_view(template_name="core/index.html")),
+    path("metrics", views.metrics),
+]
@@ -1,3 +1,16 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-# Create your views here.
+from . import metrics as storefront_metrics
+
+
+def metrics(request):
+    # Prometheus scrapes from METRICS_ALLOWED_IPS; staff signed in to the
+    # admin can look too.
+    allowed = request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+    if not allowed and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(storefront_metrics.registry()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,245 @@
+from collections import defaultdict
+from uuid import uuid4
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, Q
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+from .models import LikedItem
+
+PENDING_KEY = "likes:pending"
+FLUSHING_KEY = "likes:pending:flushing"
+FLUSH_LOCK_KEY = "likes:flush:lock"
+FLUSH_LOCK_TIMEOUT = 5 * 60
+BATCH_SIZE = 1000
+
+
+def pending_field(content_type_id, object_id, user_id):
+    return f"{content_type_id}:{object_id}:{user_id}"
+
+
+# Likes are taken in Redis and reach likes_likeditem in bulk, see flush().
+# Per model there is a hash of object_id -> like count and, once an object has
+# been liked or unliked, a set of the ids of the users who like it. Every
+# change is also noted in the pending hash as content_type:object:user -> 1
+# (like) or 0 (unlike), so only the last one per user and object is written.
+class LikeCounter:
+    # Flip the user's membership and, if it changed, note it as pending.
+    # Returns nil until the object's likers are loaded, see load().
+    # KEYS: likers set, counts hash, loaded hash, pending hash
+    # ARGV: object_id, user_id, pending field, 1 to like or 0 to unlike
+    toggle_script = """
+    if redis.call('HEXISTS', KEYS[3], ARGV[1]) == 0 then return false end
+    local changed
+    if ARGV[4] == '1' then
+        changed = redis.call('SADD', KEYS[1], ARGV[2])
+    else
+        changed = redis.call('SREM', KEYS[1], ARGV[2])
+    end
+    local count = redis.call('SCARD', KEYS[1])
+    if changed == 1 then
+        redis.call('HSET', KEYS[4], ARGV[3], ARGV[4])
+        redis.call('HSET', KEYS[2], ARGV[1], count)
+    end
+    return count
+    """
+    # Move the likers staged from the database into place unless someone
+    # else loaded them first.
+    # KEYS: likers set, counts hash, loaded hash, staging set; ARGV: object_id
+    load_script = """
+    if redis.call('HEXISTS', KEYS[3], ARGV[1]) == 1 then
+        redis.call('DEL', KEYS[4])
+        return 0
+    end
+    if redis.call('EXISTS', KEYS[4]) == 1 then
+        redis.call('RENAME', KEYS[4], KEYS[1])
+    else
+        redis.call('DEL', KEYS[1])
+    end
+    redis.call('HSET', KEYS[2], ARGV[1], redis.call('SCARD', KEYS[1]))
+    redis.call('HSET', KEYS[3], ARGV[1], 1)
+    return 1
+    """
+
+    def __init__(self, model, content_type=None):
+        self.redis = get_redis_connection("default")
+        # Async callers look the content type up on the ORM's thread first.
+        self.content_type = content_type or ContentType.objects.get_for_model(model)
+        self.prefix = f"likes:{self.content_type.id}"
+        self.counts_key = f"{self.prefix}:counts"
+        self.loaded_key = f"{self.prefix}:loaded"
+
+    def likers_key(self, object_id):
+        return f"{self.prefix}:{object_id}:likers"
+
+    def liked_items(self):
+        return LikedItem.objects.filter(content_type=self.content_type)
+
+    def like(self, object_id, user_id):
+        return self.toggle(object_id, user_id, True)
+
+    def unlike(self, object_id, user_id):
+        return self.toggle(object_id, user_id, False)
+
+    def toggle(self, object_id, user_id, liked):
+        args = [
+            self.likers_key(object_id),
+            self.counts_key,
+            self.loaded_key,
+            PENDING_KEY,
+            object_id,
+            user_id,
+            pending_field(self.content_type.id, object_id, user_id),
+            int(liked),
+        ]
+        count = self.redis.eval(self.toggle_script, 4, *args)
+        if count is None:
+            self.load(object_id)
+            count = self.redis.eval(self.toggle_script, 4, *args)
+        return count
+
+    def load(self, object_id):
+        # After a restart without persistence the likers come back from the
+        # database, which the flushes have kept up to date.
+        user_ids = list(
+            self.liked_items().filter(object_id=object_id).values_list("user_id", flat=True)
+        )
+        staging_key = f"{self.likers_key(object_id)}:{uuid4().hex}"
+        pipeline = self.redis.pipeline()
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            pipeline.sadd(staging_key, *user_ids[start : start + BATCH_SIZE])
+        pipeline.expire(staging_key, 60)
+        pipeline.execute()
+        self.redis.eval(
+            self.load_script,
+            4,
+            self.likers_key(object_id),
+            self.counts_key,
+            self.loaded_key,
+            staging_key,
+            object_id,
+        )
+
+    def counts(self, object_ids, stored=None):
+        # One HMGET for a page; objects never counted so far cost one query,
+        # unless their stored counts came with the caller's rows.
+        object_ids = list(dict.fromkeys(object_ids))
+        if not object_ids:
+            return {}
+        counts = self.known_counts(object_ids, self.redis.hmget(self.counts_key, object_ids))
+        missing = [object_id for object_id in object_ids if object_id not in counts]
+        if missing:
+            loaded = self.stored_counts(missing, stored)
+            unknown = [object_id for object_id in missing if object_id not in loaded]
+            if unknown:
+                loaded.update(self.count_query(unknown))
+            self.store_counts(counts, missing, loaded)
+        return counts
+
+    async def acounts(self, object_ids, stored=None):
+        object_ids = list(dict.fromkeys(object_ids))
+        if not object_ids:
+            return {}
+        # The Redis client is thread safe, so its calls don't need to queue on
+        # the single thread the async ORM runs in.
+        values = await sync_to_async(self.redis.hmget, thread_sensitive=False)(
+            self.counts_key, object_ids
+        )
+        counts = self.known_counts(object_ids, values)
+        missing = [object_id for object_id in object_ids if object_id not in counts]
+        if missing:
+            loaded = self.stored_counts(missing, stored)
+            unknown = [object_id for object_id in missing if object_id not in loaded]
+            if unknown:
+                async for object_id, count in self.count_query(unknown):
+                    loaded[object_id] = count
+            await sync_to_async(self.store_counts, thread_sensitive=False)(
+                counts, missing, loaded
+            )
+        return counts
+
+    def known_counts(self, object_ids, values):
+        return {
+            object_id: int(value)
+            for object_id, value in zip(object_ids, values)
+            if value is not None
+        }
+
+    def stored_counts(self, object_ids, stored):
+        stored = stored or {}
+        return {object_id: stored[object_id] for object_id in object_ids if object_id in stored}
+
+    def count_query(self, object_ids):
+        return (
+            self.liked_items()
+            .filter(object_id__in=object_ids)
+            .values("object_id")
+            .annotate(count=Count("id"))
+            .values_list("object_id", "count")
+        )
+
+    def store_counts(self, counts, missing, loaded):
+        pipeline = self.redis.pipeline()
+        for object_id in missing:
+            counts[object_id] = loaded.get(object_id, 0)
+            # NX: a like that landed meanwhile has the newer count.
+            pipeline.hsetnx(self.counts_key, object_id, counts[object_id])
+        pipeline.execute()
+
+def flush():
+    redis = get_redis_connection("default")
+    lock = redis.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        # A flush that died half way left its batch behind. It goes first, and
+        # replaying it is harmless.
+        if not redis.exists(FLUSHING_KEY):
+            try:
+                redis.rename(PENDING_KEY, FLUSHING_KEY)
+            except ResponseError:
+                return 0
+        changes = redis.hgetall(FLUSHING_KEY)
+        write_changes(changes)
+        redis.delete(FLUSHING_KEY)
+        return len(changes)
+    finally:
+        lock.release()
+
+
+def write_changes(changes):
+    likes = []
+    unlikes = defaultdict(list)
+    for field, liked in changes.items():
+        content_type_id, object_id, user_id = map(int, field.decode().split(":"))
+        if liked == b"1":
+            likes.append(
+                LikedItem(content_type_id=content_type_id, object_id=object_id, user_id=user_id)
+            )
+        else:
+            unlikes[content_type_id, object_id].append(user_id)
+    # Likes of users deleted since would fail the whole batch on the foreign key.
+    existing = set(
+        get_user_model()
+        .objects.filter(pk__in={item.user_id for item in likes})
+        .values_list("pk", flat=True)
+    )
+    unliked = [
+        Q(content_type_id=content_type_id, object_id=object_id, user_id__in=user_ids)
+        for (content_type_id, object_id), user_ids in unlikes.items()
+    ]
+    with transaction.atomic():
+        LikedItem.objects.bulk_create(
+            [item for item in likes if item.user_id in existing],
+            ignore_conflicts=True,
+            batch_size=BATCH_SIZE,
+        )
+        for start in range(0, len(unliked), BATCH_SIZE):
+            condition = Q()
+            for q in unliked[start : start + BATCH_SIZE]:
+                condition |= q
+            LikedItem.objects.filter(condition).delete()
@@ -11,3 +11,15 @@ class LikedItem(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey()
+
+    class Meta:
+        constraints = [
+            # Lets the flush insert with ON CONFLICT DO NOTHING.
+            models.UniqueConstraint(
+                fields=["user", "content_type", "object_id"], name="unique_like"
+            ),
+        ]
+        indexes = [
+            # Counting and loading an object's likes.
+            models.Index(fields=["content_type", "object_id"]),
+        ]
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from . import counters
+
+
+@shared_task
+def flush_likes():
+    return counters.flush()
@@ -0,0 +1,105 @@
+"""Compares the sync DRF endpoints served by gunicorn (WSGI) with their async
+twins served by daphne (ASGI) at high concurrency.
+
+    python locustfiles/benchmark_asgi.py --concurrency 200 --duration 20
+    python locustfiles/benchmark_asgi.py --cold  # bust the catalog cache
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import time
+from itertools import count
+from random import randint
+
+import aiohttp
+
+from run_load_test import ROOT, create_database, manage, wait_for
+
+ENDPOINTS = [
+    ('product list', '/store/products/', '/store/async/products/'),
+    ('product detail', '/store/products/{id}/', '/store/async/products/{id}/'),
+    ('collection list', '/store/collections/', '/store/async/collections/'),
+]
+
+
+async def hammer(base_url, path, concurrency, duration, cold):
+    latencies = []
+    errors = 0
+    unique = count()
+    deadline = time.monotonic() + duration
+
+    async def worker(session):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            url = base_url + path.format(id=randint(1, 1000))
+            if cold:
+                url += f'?_={next(unique)}'
+            start = time.perf_counter()
+            try:
+                async with session.get(url) as response:
+                    await response.read()
+                    if response.status >= 500:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        'rps': len(latencies) / duration,
+        'p50': percentiles[49],
+        'p95': percentiles[94],
+        'p99': percentiles[98],
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--workers', type=int, default=4,
+                        help='gunicorn sync workers for the WSGI side')
+    parser.add_argument('--cold', action='store_true')
+    parser.add_argument('--skip-seed', action='store_true')
+    options = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'storefront.settings.loadtest')
+    if not options.skip_seed:
+        create_database(env)
+        manage('migrate', '--no-input', env=env)
+        manage('prepare_load_test', env=env)
+
+    wsgi, asgi = 'http://127.0.0.1:8002', 'http://127.0.0.1:8003'
+    servers = [
+        subprocess.Popen(['gunicorn', 'storefront.wsgi', '--workers', str(options.workers),
+                          '--bind', '127.0.0.1:8002'], cwd=ROOT, env=env),
+        subprocess.Popen(['daphne', '-b', '127.0.0.1', '-p', '8003',
+                          'storefront.asgi:application'], cwd=ROOT, env=env),
+    ]
+    try:
+        wait_for(f'{wsgi}/store/collections/')
+        wait_for(f'{asgi}/store/async/collections/')
+        print(f"{'endpoint':<18}{'stack':<6}" + ''.join(
+            f'{metric:>10}' for metric in ['rps', 'p50', 'p95', 'p99', 'errors']))
+        for name, sync_path, async_path in ENDPOINTS:
+            for stack, base_url, path in [('wsgi', wsgi, sync_path), ('asgi', asgi, async_path)]:
+                result = asyncio.run(hammer(
+                    base_url, path, options.concurrency, options.duration, options.cold))
+                print(f'{name:<18}{stack:<6}' + ''.join(
+                    f'{value:>10.1f}' for value in result.values()))
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
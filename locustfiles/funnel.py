@@ -0,0 +1,122 @@
+import os
+from itertools import count
+from random import choice, randint, sample
+
+from locust import HttpUser, between, task
+
+# Accounts created by `manage.py prepare_load_test`.
+PASSWORD = os.environ.get('LOAD_TEST_PASSWORD', 'loadtest-password')
+BUYERS = int(os.environ.get('LOAD_TEST_BUYERS', 50))
+# Ids and words from store/management/commands/seed.sql.
+PRODUCT_IDS = (1, 1000)
+COLLECTION_IDS = (2, 6)
+SEARCH_TERMS = ['bread', 'wine', 'cheese', 'juice', 'pasta', 'oil', 'cake', 'rice']
+
+
+def product_id():
+    return randint(*PRODUCT_IDS)
+
+
+def log_in(user, username):
+    response = user.client.post(
+        '/auth/jwt/create/',
+        name='/auth/jwt/create',
+        json={'username': username, 'password': PASSWORD})
+    response.raise_for_status()
+    user.client.headers['Authorization'] = f"JWT {response.json()['access']}"
+
+
+class AnonymousBrowser(HttpUser):
+    weight = 6
+    wait_time = between(1, 5)
+
+    @task(2)
+    def view_collections(self):
+        self.client.get('/store/collections/', name='/store/collections')
+
+    @task(4)
+    def view_products(self):
+        self.client.get(
+            f'/store/products/?collection_id={randint(*COLLECTION_IDS)}',
+            name='/store/products')
+
+    @task(6)
+    def view_product(self):
+        self.client.get(f'/store/products/{product_id()}/', name='/store/products/:id')
+
+    @task(1)
+    def view_reviews(self):
+        self.client.get(
+            f'/store/products/{product_id()}/reviews/', name='/store/products/:id/reviews')
+
+
+class SearchingUser(HttpUser):
+    weight = 3
+    wait_time = between(1, 3)
+
+    @task(4)
+    def search(self):
+        self.client.get(
+            f'/store/products/?search={choice(SEARCH_TERMS)}', name='/store/products?search')
+
+    @task(1)
+    def filter_by_price(self):
+        low = randint(1, 50)
+        self.client.get(
+            f'/store/products/?price_gt={low}&price_lt={low + 25}&ordering=unit_price',
+            name='/store/products?price')
+
+    @task(2)
+    def view_result(self):
+        self.client.get(f'/store/products/{product_id()}/', name='/store/products/:id')
+
+
+class Buyer(HttpUser):
+    weight = 2
+    wait_time = between(2, 6)
+    accounts = count()
+
+    def on_start(self):
+        log_in(self, f'loadtest-buyer-{next(self.accounts) % BUYERS}')
+
+    @task(3)
+    def browse(self):
+        self.client.get(
+            f'/store/products/?collection_id={randint(*COLLECTION_IDS)}',
+            name='/store/products')
+
+    @task(2)
+    def check_out(self):
+        cart_id = self.client.post('/store/carts/', name='/store/carts').json()['id']
+        items = [
+            {'product_id': pk, 'quantity': randint(1, 3)}
+            for pk in sample(range(PRODUCT_IDS[0], PRODUCT_IDS[1] + 1), randint(1, 4))]
+        self.client.post(
+            f'/store/carts/{cart_id}/items/', name='/store/carts/:id/items', json=items)
+        self.client.get(f'/store/carts/{cart_id}/', name='/store/carts/:id')
+        self.client.post('/store/orders/', name='/store/orders [checkout]',
+                         json={'cart_id': cart_id})
+
+    @task(2)
+    def view_order_history(self):
+        self.client.get('/store/orders/', name='/store/orders')
+
+
+class Staff(HttpUser):
+    weight = 1
+    wait_time = between(2, 8)
+
+    def on_start(self):
+        log_in(self, 'loadtest-staff')
+
+    @task(3)
+    def list_orders(self):
+        self.client.get('/store/orders/', name='/store/orders [staff]')
+
+    @task(3)
+    def list_order_summaries(self):
+        self.client.get('/store/orders/?summary', name='/store/orders?summary [staff]')
+
+    @task(1)
+    def list_customers(self):
+        self.client.get('/store/customers/', name='/store/customers [staff]')
@@ -0,0 +1,157 @@
+"""Boots the app against a local database, seeds it and runs the locust
+funnel headless.
+
+    python locustfiles/run_load_test.py run --label baseline
+    python locustfiles/run_load_test.py run --label after --users 100
+    python locustfiles/run_load_test.py compare baseline after
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+REPORTS = Path(__file__).resolve().parent / 'reports'
+METRICS = ['rps', 'p50', 'p95', 'p99', 'failures']
+
+
+def manage(*args, env):
+    subprocess.run([sys.executable, 'manage.py', *args], cwd=ROOT, env=env, check=True)
+
+
+def create_database(env):
+    os.environ['DJANGO_SETTINGS_MODULE'] = env['DJANGO_SETTINGS_MODULE']
+    sys.path.insert(0, str(ROOT))
+    import psycopg2
+    from django.conf import settings
+
+    database = settings.DATABASES['default']
+    connection = psycopg2.connect(
+        dbname='postgres', user=database['USER'], password=database['PASSWORD'],
+        host=database['HOST'] or None, port=database['PORT'] or None)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_database WHERE datname = %s', [database['NAME']])
+        if not cursor.fetchone():
+            cursor.execute(f'CREATE DATABASE "{database["NAME"]}"')
+    connection.close()
+
+
+def wait_for(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2)
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise SystemExit(f'{url} did not come up within {timeout}s')
+
+
+def summarize(label):
+    # Keep the numbers worth comparing from locust's <label>_stats.csv.
+    with open(REPORTS / f'{label}_stats.csv', newline='') as file:
+        rows = {
+            f"{row['Type']} {row['Name']}".strip(): {
+                'rps': float(row['Requests/s']),
+                'p50': float(row['50%']),
+                'p95': float(row['95%']),
+                'p99': float(row['99%']),
+                'failures': int(row['Failure Count']),
+            }
+            for row in csv.DictReader(file)
+        }
+    (REPORTS / f'{label}.json').write_text(json.dumps(rows, indent=2))
+    return rows
+
+
+def print_table(rows):
+    print(f"{'endpoint':<45}" + ''.join(f'{metric:>10}' for metric in METRICS))
+    for name, values in rows.items():
+        print(f'{name:<45}' + ''.join(f'{values[metric]:>10}' for metric in METRICS))
+
+
+def run(options):
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'storefront.settings.loadtest')
+    env['LOAD_TEST_PASSWORD'] = options.password
+    env['LOAD_TEST_BUYERS'] = str(options.buyers)
+    host = f'http://127.0.0.1:{options.port}'
+
+    if not options.skip_seed:
+        create_database(env)
+        manage('migrate', '--no-input', env=env)
+        manage('prepare_load_test', '--buyers', str(options.buyers),
+               '--password', options.password, env=env)
+
+    server = subprocess.Popen(
+        ['gunicorn', 'storefront.wsgi', '--workers', str(options.workers),
+         '--bind', f'127.0.0.1:{options.port}'],
+        cwd=ROOT, env=env)
+    try:
+        wait_for(f'{host}/store/collections/')
+        REPORTS.mkdir(exist_ok=True)
+        subprocess.run(
+            ['locust', '-f', str(Path(__file__).with_name('funnel.py')), '--headless',
+             '--host', host, '--users', str(options.users),
+             '--spawn-rate', str(options.spawn_rate), '--run-time', options.run_time,
+             '--csv', str(REPORTS / options.label),
+             '--html', str(REPORTS / f'{options.label}.html'), '--only-summary'],
+            cwd=ROOT, env=env)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print_table(summarize(options.label))
+
+
+def compare(options):
+    before = json.loads((REPORTS / f'{options.before}.json').read_text())
+    after = json.loads((REPORTS / f'{options.after}.json').read_text())
+    print(f"{'endpoint':<45}" + ''.join(f'{metric:>18}' for metric in METRICS))
+    for name in sorted(before.keys() | after.keys()):
+        cells = []
+        for metric in METRICS:
+            old = before.get(name, {}).get(metric)
+            new = after.get(name, {}).get(metric)
+            if old is None or new is None:
+                cells.append(f'{"-":>18}')
+            elif old:
+                cells.append(f'{new:>10} ({(new - old) / old:+6.0%})')
+            else:
+                cells.append(f'{new:>18}')
+        print(f'{name:<45}' + ''.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run')
+    run_parser.add_argument('--label', default=time.strftime('%Y%m%d-%H%M%S'))
+    run_parser.add_argument('--users', type=int, default=50)
+    run_parser.add_argument('--spawn-rate', type=float, default=10)
+    run_parser.add_argument('--run-time', default='2m')
+    run_parser.add_argument('--port', type=int, default=8001)
+    run_parser.add_argument('--workers', type=int, default=4)
+    run_parser.add_argument('--buyers', type=int, default=50)
+    run_parser.add_argument('--password', default='loadtest-password')
+    run_parser.add_argument('--skip-seed', action='store_true')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.set_defaults(handler=compare)
+
+    options = parser.parse_args()
+    options.handler(options)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,34 @@
+import json
 from typing import Any, List, Tuple
+from uuid import uuid4
+from django import forms
 from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.admin.options import get_content_type_for_model
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Q
 from django.db.models.query import QuerySet
-from django.http.request import HttpRequest
-from django.db.models import Count
-from django.urls import reverse
+from django.http import JsonResponse
+from django.urls import path, reverse
+from django.utils import timezone
 from django.utils.http import urlencode
 from django.utils.html import format_html
 
+from . import bulk
+from . import cache as catalog_cache
 from . import models
+from .tasks import run_bulk_action
+from .pagination import EstimatedCountPaginator
+from .search import match_products
+
+
+# For tables that grow without bound: an estimated total, and no second
+# COUNT(*) for the "n of total" line when a filter or search is applied.
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(models.Promotion)
@@ -23,16 +44,88 @@ class CollectionAdmin(admin.ModelAdmin):
     list_display = ("title", "product_count")
     list_per_page = 10
 
+    @admin.display(ordering="products_count")
     def product_count(self, collection):
         url = (
             reverse("admin:store_product_changelist")
             + "?"
             + urlencode({"collection__id": str(collection.id)})
         )
-        return format_html("<a href={}>{}</a>", url, collection.product_count)
+        return format_html("<a href={}>{}</a>", url, collection.products_count)
+
+
+# Admin actions that run through store.bulk: small selections in the request,
+# bigger ones in a Celery task whose progress is polled from bulk/<job_id>/.
+class BulkActionAdmin(LargeTableAdmin):
+    inline_limit = 1000
+
+    def start_bulk_action(self, request, queryset, name, **params):
+        job_id = uuid4().hex
+        total = queryset.count()
+        if total <= self.inline_limit:
+            done = bulk.run(job_id, name, queryset, params, total=total)
+            self.message_user(request, f"{done} row(s) updated.", messages.SUCCESS)
+            return
+        bulk.set_progress(job_id, action=name, status="pending", total=total, done=0)
+        model_label = queryset.model._meta.label
+        selection = bulk.describe_selection(request)
+        transaction.on_commit(
+            lambda: run_bulk_action.delay(job_id, name, model_label, selection, params)
+        )
+        opts = self.model._meta
+        url = reverse(f"admin:{opts.app_label}_{opts.model_name}_bulk_progress", args=[job_id])
+        self.message_user(
+            request,
+            format_html(
+                '{} rows are being updated in the background: <a href="{}">progress</a>',
+                total,
+                url,
+            ),
+            messages.INFO,
+        )
 
-    def get_queryset(self, request: HttpRequest) -> QuerySet[Any]:
-        return super().get_queryset(request).annotate(product_count=Count("products"))
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path(
+                "bulk/<str:job_id>/",
+                self.admin_site.admin_view(self.bulk_progress_view),
+                name=f"{opts.app_label}_{opts.model_name}_bulk_progress",
+            )
+        ] + super().get_urls()
+
+    def bulk_progress_view(self, request, job_id):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        progress = bulk.get_progress(job_id)
+        if progress is None:
+            return JsonResponse({"detail": "Not found."}, status=404)
+        return JsonResponse(progress)
+
+
+class CollectionFilter(admin.SimpleListFilter):
+    title = "collection"
+    # Same parameter the product counts on the collection changelist link with.
+    parameter_name = "collection__id"
+    limit = 20
+
+    def lookups(self, request: Any, model_admin: Any) -> List[Tuple[Any, str]]:
+        # The biggest collections and the selected one instead of all of them.
+        collections = models.Collection.objects.only("id", "title")
+        selected = Q(pk=self.value()) if self.selected_id() else Q(pk__in=[])
+        choices = collections.filter(
+            Q(pk__in=collections.order_by("-products_count", "id").values("id")[: self.limit])
+            | selected
+        ).order_by("title")
+        return [(str(collection.id), collection.title) for collection in choices]
+
+    def selected_id(self):
+        value = self.value()
+        return int(value) if value and value.isdigit() else None
+
+    def queryset(self, request: Any, queryset: QuerySet[Any]) -> QuerySet[Any] | None:
+        if self.selected_id() is not None:
+            return queryset.filter(collection_id=self.selected_id())
 
 
 class InventoryFilter(admin.SimpleListFilter):
@@ -51,26 +144,96 @@ class InventoryFilter(admin.SimpleListFilter):
 
 class ProductImageInline(admin.TabularInline):
     model = models.ProductImage
-    readonly_fields = ["thumbnail"]
+    readonly_fields = ["thumbnail", "processing_error"]
 
     def thumbnail(self, instance: models.ProductImage):
-        if instance.image.name != "":
-            return format_html(f'<img src="{instance.image.url}" class="thumbnail"/>')
-        return ""
+        if instance.image.name == "":
+            return ""
+        # Fall back to the upload until the variants have been rendered.
+        name = instance.variants.get("thumbnail", {}).get("jpeg")
+        url = instance.image.storage.url(name) if name else instance.image.url
+        return format_html('<img src="{}" class="thumbnail"/>', url)
+
+
+class ProductActionForm(ActionForm):
+    percent = forms.DecimalField(
+        required=False,
+        max_digits=5,
+        decimal_places=2,
+        min_value=-99,
+        help_text="For price adjustments, e.g. 10 or -5.",
+    )
 
 
 @admin.register(models.Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(BulkActionAdmin):
     autocomplete_fields = ["collection"]
     prepopulated_fields = {"slug": ["title"]}
-    actions = ["clear_inventory"]
+    action_form = ProductActionForm
+    actions = ["clear_inventory", "adjust_prices"]
     inlines = [ProductImageInline]
     list_display = ("title", "unit_price", "inventory_status", "collection")
     list_editable = ("unit_price",)
+    list_select_related = ["collection"]
+    # Matched through the full-text index, see get_search_results().
     search_fields = ["title"]
-    list_filter = ("collection", "last_update", InventoryFilter)
+    list_filter = (CollectionFilter, "last_update", InventoryFilter)
     list_per_page = 10
 
+    def changelist_view(self, request, extra_context=None):
+        if request.method != "POST" or "_save" not in request.POST:
+            return super().changelist_view(request, extra_context)
+        # list_editable saves and logs each changed row on its own;
+        # save_model() and log_change() only collect them, so the page goes
+        # out in one UPDATE and one INSERT.
+        request.edited_products = []
+        request.edited_log_entries = []
+        with transaction.atomic():
+            response = super().changelist_view(request, extra_context)
+            self.save_edited_products(request.edited_products)
+            LogEntry.objects.bulk_create(request.edited_log_entries)
+        return response
+
+    def save_model(self, request, obj, form, change):
+        edited = getattr(request, "edited_products", None)
+        if edited is None:
+            return super().save_model(request, obj, form, change)
+        edited.append(obj)
+
+    def log_change(self, request, obj, message):
+        entries = getattr(request, "edited_log_entries", None)
+        if entries is None:
+            return super().log_change(request, obj, message)
+        # What LogEntry.objects.log_action() would write.
+        entries.append(
+            LogEntry(
+                user_id=request.user.pk,
+                content_type_id=get_content_type_for_model(obj).pk,
+                object_id=str(obj.pk),
+                object_repr=str(obj)[:200],
+                action_flag=CHANGE,
+                change_message=json.dumps(message) if isinstance(message, list) else message,
+            )
+        )
+
+    def save_edited_products(self, products):
+        if not products:
+            return
+        now = timezone.now()
+        for product in products:
+            product.last_update = now
+        models.Product.objects.bulk_update(products, [*self.list_editable, "last_update"])
+        # bulk_update() bypasses post_save, so drop the cached catalog by hand.
+        catalog_cache.invalidate_products(
+            (product.pk, product.collection_id) for product in products
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return match_products(queryset, search_term), False
+
     @admin.display(ordering="inventory")
     def inventory_status(self, product):
         if product.inventory < 10:
@@ -79,24 +242,44 @@ class ProductAdmin(admin.ModelAdmin):
 
     @admin.action(description="Clear inventory")
     def clear_inventory(self, request, queryset):
-        updated_count = queryset.update(inventory=0)
-        self.message_user(
-            request, f"{updated_count} was deleted successfully", messages.ERROR
-        )
+        self.start_bulk_action(request, queryset, "clear_inventory")
+
+    @admin.action(description="Adjust prices by percent")
+    def adjust_prices(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields["action"].choices = self.get_action_choices(request)
+        if not form.is_valid() or form.cleaned_data["percent"] is None:
+            self.message_user(
+                request, "Enter a valid percent to adjust prices by.", messages.ERROR
+            )
+            return
+        percent = str(form.cleaned_data["percent"])
+        self.start_bulk_action(request, queryset, "adjust_prices", percent=percent)
 
     class Media:
         css = {"all": ["store/styles.css"]}
 
 
+# Case-insensitive prefix matches, each served by an UPPER() index on the
+# user table, see core.models.User.
+USER_SEARCH_FIELDS = [
+    "username__istartswith",
+    "email__istartswith",
+    "first_name__istartswith",
+    "last_name__istartswith",
+]
+USER_SEARCH_HELP_TEXT = "Matches the start of the username, email, first or last name."
+
+
 @admin.register(models.Customer)
-class CustomerAdmin(admin.ModelAdmin):
-    search_fields = ["first_name", "last_name"]
+class CustomerAdmin(LargeTableAdmin):
     list_display = ("first_name", "last_name", "membership")
     list_editable = ("membership",)
     list_per_page = 10
     list_select_related = ["user"]
     ordering = ("user__first_name", "user__last_name")
-    search_fields = ["first_name__istartswith", "last_name__istartswith"]
+    search_fields = [f"user__{field}" for field in USER_SEARCH_FIELDS]
+    search_help_text = USER_SEARCH_HELP_TEXT
 
 
 class OrderItemInline(admin.TabularInline):
@@ -108,12 +291,24 @@ class OrderItemInline(admin.TabularInline):
 
 
 @admin.register(models.Order)
-class OrderClass(admin.ModelAdmin):
-    search_fields = ["customer"]
+class OrderClass(LargeTableAdmin):
+    search_fields = [f"customer__user__{field}" for field in USER_SEARCH_FIELDS]
+    search_help_text = f"An order number. {USER_SEARCH_HELP_TEXT}"
     inlines = [OrderItemInline]
-    list_display = ("payment_status", "placed_at", "customer")
+    list_display = ("payment_status", "placed_at", "customer", "total")
+    # Customer.__str__ reads the user.
+    list_select_related = ["customer__user"]
+    readonly_fields = ["total"]
+
+    def get_search_results(self, request, queryset, search_term):
+        # An order number goes straight to the primary key.
+        search_term = search_term.strip()
+        if search_term.isdigit() and len(search_term) < 19:
+            return queryset.filter(pk=int(search_term)), False
+        return super().get_search_results(request, queryset, search_term)
 
 
 @admin.register(models.CartItem)
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(LargeTableAdmin):
     list_display = ["cart", "product", "quantity"]
+    list_select_related = ["cart", "product"]
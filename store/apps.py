@@ -1,8 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
     def ready(self) -> None:
-        import store.signals.handlers
\ No newline at end of file
+        import store.signals.handlers
+        from store.search import install_search_index
+
+        post_migrate.connect(install_search_index, sender=self)
\ No newline at end of file
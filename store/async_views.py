@@ -0,0 +1,87 @@
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+
+from core.renderers import ORJSONRenderer
+
+from . import cache as catalog_cache
+from . import likes
+from .models import Collection, Product, ProductImage
+from .serializers import CollectionSerializer, ProductRowSerializer
+from .views import ProductViewSet
+
+# Async twins of the product detail/list and collection list endpoints. They
+# read through the async ORM and render the same payloads as the viewsets, so
+# a slow query only parks a coroutine instead of a whole worker under ASGI.
+
+
+def render(data, status=200):
+    return HttpResponse(
+        ORJSONRenderer().render(data), status=status, content_type="application/json"
+    )
+
+
+async def render_with_likes(data, rows=()):
+    like_counts = await likes.acounts(likes.product_ids(data), likes.stored_counts(rows))
+    return render(likes.with_likes(data, like_counts))
+
+
+def render_error(exc):
+    if isinstance(exc.detail, (list, dict)):
+        return render(exc.detail, exc.status_code)
+    return render({"detail": exc.detail}, exc.status_code)
+
+
+@require_safe
+async def product_list(request):
+    request = Request(request)
+    key = await catalog_cache.aproduct_list_key(request)
+    data = await catalog_cache.aget_cached(key)
+    if data is not None:
+        return await render_with_likes(data)
+    # Borrow the viewset's queryset, filter backends, paginator and serializer.
+    view = ProductViewSet(request=request, action="list", args=(), kwargs={}, format_kwarg=None)
+    try:
+        # Filtering, search and ordering only build the query.
+        queryset = view.filter_queryset(view.get_queryset())
+        rows = await view.paginator.apaginate_queryset(queryset, request, view)
+    except APIException as exc:
+        return render_error(exc)
+    serializer = view.get_serializer(rows, many=True)
+    data = view.paginator.get_paginated_data(await serializer.ato_representation(rows))
+    await catalog_cache.aset_cached(key, data)
+    return await render_with_likes(data, rows)
+
+
+@require_safe
+async def product_detail(request, pk):
+    request = Request(request)
+    key = await catalog_cache.aproduct_detail_key(request, pk)
+    data = await catalog_cache.aget_cached(key)
+    if data is not None:
+        return await render_with_likes(data)
+    try:
+        row = await (
+            Product.objects.for_catalog()
+            .values(*ProductRowSerializer.Meta.fields)
+            .aget(pk=pk)
+        )
+    except Product.DoesNotExist:
+        return render_error(NotFound("No Product matches the given query."))
+    serializer = ProductRowSerializer(context={"request": request})
+    images = [
+        serializer.image(*image_row)
+        async for image_row in ProductImage.objects.filter(product_id=pk).values_list(
+            "id", "image", "variants"
+        )
+    ]
+    data = serializer.to_representation(row, images)
+    await catalog_cache.aset_cached(key, data)
+    return await render_with_likes(data, [row])
+
+
+@require_safe
+async def collection_list(request):
+    collections = [collection async for collection in Collection.objects.all()]
+    return render(CollectionSerializer(collections, many=True).data)
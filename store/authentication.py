@@ -0,0 +1,51 @@
+from django.utils.functional import cached_property
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from .customers import get_customer_id
+
+
+# The customer id rides in the tokens as a claim, so authenticated requests
+# know it without a query. Refreshed access tokens copy it from the refresh
+# token.
+class CustomerTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token["customer_id"] = get_customer_id(user.pk)
+        return token
+
+
+class CustomerJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None and result[1].get("customer_id") is not None:
+            request.customer_id = result[1]["customer_id"]
+        return result
+
+
+# request.customer_id is the token's claim when CustomerJWTAuthentication
+# found one. Tokens that predate the claim, and other authenticators, look it
+# up through the cache, and only when a view asks for it.
+class CustomerRequest(Request):
+    @cached_property
+    def customer_id(self):
+        if not self.user.is_authenticated:
+            return None
+        # Authenticating just now may have set the claim.
+        if "customer_id" in self.__dict__:
+            return self.__dict__["customer_id"]
+        return get_customer_id(self.user.id)
+
+
+class CustomerRequestMixin:
+    def initialize_request(self, request, *args, **kwargs):
+        initialized = super().initialize_request(request, *args, **kwargs)
+        return CustomerRequest(
+            request,
+            parsers=initialized.parsers,
+            authenticators=initialized.authenticators,
+            negotiator=initialized.negotiator,
+            parser_context=initialized.parser_context,
+        )
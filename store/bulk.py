@@ -0,0 +1,120 @@
+from decimal import Decimal
+
+from django.apps import apps
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least, Round
+from django.http import HttpRequest, QueryDict
+
+from . import cache as catalog_cache
+
+BATCH_SIZE = 500
+PROGRESS_TIMEOUT = 60 * 60 * 24
+
+# name -> function(queryset of one batch, **params)
+ACTIONS = {}
+
+
+def bulk_action(name):
+    def register(function):
+        ACTIONS[name] = function
+        return function
+
+    return register
+
+
+def progress_key(job_id):
+    return f"store:bulk:{job_id}"
+
+
+def get_progress(job_id):
+    return cache.get(progress_key(job_id))
+
+
+def set_progress(job_id, **progress):
+    cache.set(progress_key(job_id), progress, timeout=PROGRESS_TIMEOUT)
+
+
+# The selection travels to the worker as JSON: the ticked ids, or for "select
+# all" the changelist's filter and search parameters, from which the worker
+# rebuilds the queryset the way the admin does.
+def describe_selection(request):
+    if request.POST.get("select_across") == "1":
+        return {"user_id": request.user.pk, "params": request.GET.urlencode()}
+    return {"ids": request.POST.getlist(ACTION_CHECKBOX_NAME)}
+
+
+def rebuild_selection(model_label, selection):
+    from django.contrib import admin
+
+    model = apps.get_model(model_label)
+    if "ids" in selection:
+        return model._default_manager.filter(pk__in=selection["ids"])
+    request = HttpRequest()
+    request.GET = QueryDict(selection["params"])
+    request.user = get_user_model()._default_manager.get(pk=selection["user_id"])
+    model_admin = admin.site.get_model_admin(model)
+    return model_admin.get_changelist_instance(request).get_queryset(request)
+
+
+def batches(queryset, batch_size=BATCH_SIZE):
+    # Keyed on the primary key, so every batch is an index range scan and
+    # rows an earlier batch moved out of the selection can't shift the rest.
+    ids = queryset.order_by("pk").values_list("pk", flat=True)
+    last = None
+    while True:
+        batch = list((ids if last is None else ids.filter(pk__gt=last))[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+
+def run(job_id, name, queryset, params, total=None, batch_size=None):
+    action = ACTIONS[name]
+    if total is None:
+        total = queryset.count()
+    progress = {"action": name, "status": "running", "total": total, "done": 0}
+    set_progress(job_id, **progress)
+    manager = queryset.model._default_manager
+    try:
+        for batch in batches(queryset, batch_size or BATCH_SIZE):
+            # One short transaction per batch, so locks are held briefly.
+            with transaction.atomic():
+                action(manager.filter(pk__in=batch), **params)
+            progress["done"] += len(batch)
+            set_progress(job_id, **progress)
+    except Exception as exc:
+        progress.update(status="failed", error=str(exc))
+        set_progress(job_id, **progress)
+        raise
+    progress["status"] = "done"
+    set_progress(job_id, **progress)
+    return progress["done"]
+
+
+def invalidate_products(products):
+    # update() bypasses post_save, so drop the cached catalog by hand.
+    catalog_cache.invalidate_products(products.values_list("id", "collection_id"))
+
+
+@bulk_action("clear_inventory")
+def clear_inventory(products):
+    products.update(inventory=0)
+    invalidate_products(products)
+
+
+@bulk_action("adjust_prices")
+def adjust_prices(products, percent):
+    # Rounded to cents and kept within what unit_price can hold.
+    factor = (Decimal(100) + Decimal(percent)) / 100
+    products.update(
+        unit_price=Least(
+            Greatest(Round(F("unit_price") * Value(factor), 2), Value(Decimal(1))),
+            Value(Decimal("9999.99")),
+        )
+    )
+    invalidate_products(products)
@@ -0,0 +1,147 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import urlencode
+from django_redis import get_redis_connection
+
+from core import metrics
+
+CATALOG_VERSION_KEY = "store:catalog:version"
+HITS_KEY = "store:catalog:hits"
+MISSES_KEY = "store:catalog:misses"
+
+
+def collection_version_key(collection_id):
+    return f"store:collection:{collection_id}:version"
+
+
+def product_version_key(product_id):
+    return f"store:product:{product_id}:version"
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Seed with a timestamp rather than 1 so an evicted counter can never
+        # fall back to a version that older entries were stored under.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_all(keys):
+    # One round trip however many keys: seed a missing counter the way
+    # get_version() does, then bump it.
+    seed = time.time_ns()
+    pipeline = get_redis_connection("default").pipeline()
+    for key in dict.fromkeys(keys):
+        name = cache.client.make_key(key)
+        pipeline.set(name, seed, nx=True)
+        pipeline.incr(name)
+    pipeline.execute()
+
+
+def invalidate(keys):
+    keys = list(keys)
+    _bump_all(keys)
+    # Bump again once the transaction commits, otherwise a concurrent reader
+    # could cache the pre-commit rows under the new version.
+    transaction.on_commit(lambda: _bump_all(keys))
+
+
+def invalidate_product(product_id, *collection_ids):
+    keys = [CATALOG_VERSION_KEY, product_version_key(product_id)]
+    keys += [
+        collection_version_key(collection_id)
+        for collection_id in set(collection_ids)
+        if collection_id is not None
+    ]
+    invalidate(keys)
+
+
+def invalidate_products(rows):
+    # For (product_id, collection_id) rows changed in bulk: the catalog key and
+    # each collection key are bumped once, not once per product.
+    keys = [CATALOG_VERSION_KEY]
+    for product_id, collection_id in rows:
+        keys.append(product_version_key(product_id))
+        if collection_id is not None:
+            keys.append(collection_version_key(collection_id))
+    invalidate(keys)
+
+
+def invalidate_collection(collection_id):
+    invalidate([CATALOG_VERSION_KEY, collection_version_key(collection_id)])
+
+
+def _params_digest(request):
+    params = sorted(request.query_params.lists())
+    # The path matters too: the sync and async product lists link to themselves.
+    raw = f"{request.get_host()}{request.path}?{urlencode(params, doseq=True)}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def product_list_key(request):
+    collection_id = request.query_params.get("collection_id", "")
+    if collection_id.isdigit():
+        collection_id = int(collection_id)
+        scope = f"collection:{collection_id}"
+        version = get_version(collection_version_key(collection_id))
+    else:
+        scope = "all"
+        version = get_version(CATALOG_VERSION_KEY)
+    return f"store:products:list:{scope}:{version}:{_params_digest(request)}"
+
+
+def product_detail_key(request, product_id):
+    product_id = int(product_id)
+    version = get_version(product_version_key(product_id))
+    return f"store:products:detail:{product_id}:{version}:{_params_digest(request)}"
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_cached(key):
+    data = cache.get(key)
+    _incr(MISSES_KEY if data is None else HITS_KEY)
+    metrics.record_cache_lookup(data is not None)
+    return data
+
+
+def set_cached(key, data):
+    cache.set(key, data, timeout=settings.CATALOG_CACHE_TIMEOUT)
+
+
+# BaseCache.aget() and friends run on the thread-sensitive executor, which
+# queues every async request behind one thread. The Redis client is thread
+# safe, so the async views reach it through the default pool instead.
+aproduct_list_key = sync_to_async(product_list_key, thread_sensitive=False)
+aproduct_detail_key = sync_to_async(product_detail_key, thread_sensitive=False)
+aget_cached = sync_to_async(get_cached, thread_sensitive=False)
+aset_cached = sync_to_async(set_cached, thread_sensitive=False)
+
+
+def stats():
+    values = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,244 @@
+from decimal import Decimal
+from uuid import UUID, uuid4
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django_redis import get_redis_connection
+
+from .models import Cart, CartItem, Product
+from .pricing import effective_price
+
+
+def get_cart_store():
+    return import_string(settings.CART_STORE)()
+
+
+class DatabaseCartStore:
+    def create(self):
+        cart = Cart.objects.create()
+        cart.total_price = Decimal(0)  # type: ignore
+        return cart
+
+    def get(self, cart_id):
+        try:
+            return (
+                Cart.objects.with_total_price()
+                .prefetch_related(Prefetch("items", queryset=self.items_queryset()))
+                .get(pk=cart_id)
+            )
+        except (Cart.DoesNotExist, ValidationError):
+            return None
+
+    def delete(self, cart):
+        cart.delete()
+
+    def items_queryset(self):
+        return CartItem.objects.select_related("product").with_total_price()
+
+    def items(self, cart_id):
+        return self.items_queryset().filter(cart_id=cart_id)
+
+    def get_item(self, cart_id, item_id):
+        try:
+            return self.items(cart_id).get(pk=item_id)
+        except (CartItem.DoesNotExist, ValueError, ValidationError):
+            return None
+
+    def add_item(self, cart_id, product_id, quantity):
+        cart_items = self.add_items(cart_id, {product_id: quantity})
+        return cart_items[0] if cart_items else None
+
+    def add_items(self, cart_id, quantities):
+        # The foreign key is only checked at commit, so look the cart up first.
+        try:
+            if not Cart.objects.filter(pk=cart_id).exists():
+                return None
+            # INSERT ... ON CONFLICT (cart_id, product_id) DO UPDATE, so
+            # concurrent adds of the same product can't trip the unique constraint.
+            return CartItem.objects.bulk_create(
+                [
+                    CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity)
+                    for product_id, quantity in quantities.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["cart", "product"],
+                update_fields=["quantity"],
+            )
+        except (IntegrityError, ValidationError):
+            return None
+
+    def update_item(self, cart_item, quantity):
+        cart_item.quantity = quantity
+        cart_item.save()
+        return cart_item
+
+    def persist(self, cart_id):
+        pass
+
+    def forget(self, cart_id):
+        pass
+
+
+# Mirror just enough of the Cart/CartItem API for the cart serializers.
+class CartItems(list):
+    def all(self):
+        return self
+
+
+class StoredCart:
+    def __init__(self, id, items):
+        self.id = id
+        self.items = CartItems(items)
+
+    @property
+    def total_price(self):
+        return sum((item.total_price for item in self.items), Decimal(0))
+
+
+class StoredCartItem:
+    def __init__(self, cart_id, product_id, quantity, product=None):
+        # A product appears at most once per cart, so it doubles as the item id.
+        self.id = product_id
+        self.cart_id = cart_id
+        self.product_id = product_id
+        self.quantity = quantity
+        self.product = product
+
+    @property
+    def total_price(self):
+        # The product comes from load_items(), with its discount.
+        return self.quantity * effective_price(self.product.unit_price, self.product.discount)
+
+
+# Each cart is a Redis hash of product_id -> quantity that expires CART_TTL
+# seconds after its last write. Carts only reach store_cart/store_cartitem when
+# they are checked out, see persist().
+class RedisCartStore:
+    key_prefix = "store:cart:"
+    created_field = "created_at"
+    # HSET only if the cart still exists, then refresh its TTL.
+    # ARGV is the TTL followed by product_id, quantity pairs.
+    set_items_script = """
+    if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+    return 1
+    """
+
+    def __init__(self):
+        self.redis = get_redis_connection("default")
+        self.ttl = settings.CART_TTL
+
+    def key(self, cart_id):
+        return f"{self.key_prefix}{cart_id}"
+
+    def parse_id(self, cart_id):
+        try:
+            return UUID(str(cart_id))
+        except ValueError:
+            return None
+
+    def read(self, cart_id):
+        cart_id = self.parse_id(cart_id)
+        if cart_id is None:
+            return None, {}
+        fields = self.redis.hgetall(self.key(cart_id))
+        if not fields:
+            return None, {}
+        quantities = {
+            int(field): int(quantity)
+            for field, quantity in fields.items()
+            if field.decode() != self.created_field
+        }
+        return cart_id, quantities
+
+    def load_items(self, cart_id, quantities):
+        products = Product.objects.with_discount().only("id", "title", "unit_price").in_bulk(
+            list(quantities)
+        )
+        return [
+            StoredCartItem(cart_id, product_id, quantity, products[product_id])
+            for product_id, quantity in sorted(quantities.items())
+            if product_id in products
+        ]
+
+    def create(self):
+        cart_id = uuid4()
+        key = self.key(cart_id)
+        pipeline = self.redis.pipeline()
+        pipeline.hset(key, self.created_field, timezone.now().isoformat())
+        pipeline.expire(key, self.ttl)
+        pipeline.execute()
+        return StoredCart(cart_id, [])
+
+    def get(self, cart_id):
+        cart_id, quantities = self.read(cart_id)
+        if cart_id is None:
+            return None
+        return StoredCart(cart_id, self.load_items(cart_id, quantities))
+
+    def delete(self, cart):
+        self.redis.delete(self.key(cart.id))
+
+    def items(self, cart_id):
+        cart_id, quantities = self.read(cart_id)
+        if cart_id is None:
+            return []
+        return self.load_items(cart_id, quantities)
+
+    def get_item(self, cart_id, item_id):
+        for item in self.items(cart_id):
+            if str(item.id) == str(item_id):
+                return item
+        return None
+
+    def add_item(self, cart_id, product_id, quantity):
+        cart_items = self.add_items(cart_id, {product_id: quantity})
+        return cart_items[0] if cart_items else None
+
+    def add_items(self, cart_id, quantities):
+        cart_id = self.parse_id(cart_id)
+        if cart_id is None:
+            return None
+        pairs = [value for item in quantities.items() for value in item]
+        stored = self.redis.eval(
+            self.set_items_script, 1, self.key(cart_id), self.ttl, *pairs
+        )
+        if not stored:
+            return None
+        return [
+            StoredCartItem(cart_id, product_id, quantity)
+            for product_id, quantity in quantities.items()
+        ]
+
+    def update_item(self, cart_item, quantity):
+        if self.add_item(cart_item.cart_id, cart_item.product_id, quantity) is None:
+            return None
+        cart_item.quantity = quantity
+        return cart_item
+
+    def persist(self, cart_id):
+        cart_id, quantities = self.read(cart_id)
+        if cart_id is None:
+            return
+        existing = set(
+            Product.objects.filter(pk__in=list(quantities)).values_list("id", flat=True)
+        )
+        Cart.objects.bulk_create([Cart(id=cart_id)], ignore_conflicts=True)
+        CartItem.objects.bulk_create(
+            [
+                CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity)
+                for product_id, quantity in quantities.items()
+                if product_id in existing
+            ],
+            update_conflicts=True,
+            unique_fields=["cart", "product"],
+            update_fields=["quantity"],
+        )
+
+    def forget(self, cart_id):
+        self.redis.delete(self.key(cart_id))
@@ -0,0 +1,98 @@
+import hashlib
+from calendar import timegm
+
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+CONDITIONAL_HEADERS = ["HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE"]
+
+
+def get_value(row, name):
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+def validators(request, rows):
+    # Weak ETag over the URL and the ids and timestamps of the rows, so edits,
+    # deletions and moves all change it. Last-Modified is the newest
+    # last_update of the rows.
+    rows = [(get_value(row, "id"), get_value(row, "last_update")) for row in rows]
+    last_update = max((updated for _, updated in rows), default=None)
+    raw = request.get_full_path() + "|" + ",".join(
+        f"{pk}@{updated.timestamp()}" for pk, updated in rows
+    )
+    etag = f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+    last_modified = timegm(last_update.utctimetuple()) if last_update else None
+    return etag, last_modified
+
+
+def not_modified(request, etag, last_modified):
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+# ETag/Last-Modified for list and retrieve. A request carrying If-None-Match
+# or If-Modified-Since first runs a query for just the ids and last_update of
+# the rows it would render, and gets a 304 without serializing anything.
+class ConditionalGetMixin:
+    def is_conditional(self, request):
+        return any(header in request.META for header in CONDITIONAL_HEADERS)
+
+    def validator_rows(self, queryset):
+        return queryset.values("id", "last_update")
+
+    def get_validators(self, request, rows):
+        return validators(request, rows)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.is_conditional(request):
+            rows = self.validator_rows(queryset)
+            if self.paginator is not None:
+                rows = self.paginator.paginate_queryset(rows, request, view=self)
+            response = not_modified(request, *self.get_validators(request, rows))
+            if response is not None:
+                return response
+
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        serializer = self.get_serializer(rows, many=True)
+        if page is not None:
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(serializer.data)
+        return set_validators(response, *self.get_validators(request, rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.is_conditional(request):
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                rows = list(
+                    self.validator_rows(
+                        self.filter_queryset(self.get_queryset()).filter(
+                            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+                        )
+                    )
+                )
+            except (ValueError, ValidationError):
+                rows = []
+            if rows:
+                response = not_modified(request, *self.get_validators(request, rows))
+                if response is not None:
+                    return response
+
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        return set_validators(Response(serializer.data), *self.get_validators(request, [instance]))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Customer
+
+
+def customer_key(user_id):
+    return f"store:customer:{user_id}"
+
+
+def get_customer_id(user_id):
+    key = customer_key(user_id)
+    customer_id = cache.get(key)
+    if customer_id is None:
+        customer_id = (
+            Customer.objects.filter(user_id=user_id).values_list("id", flat=True).first()
+        )
+        if customer_id is not None:
+            cache.set(key, customer_id, timeout=settings.CUSTOMER_CACHE_TIMEOUT)
+    return customer_id
+
+
+def forget_customer(user_id):
+    key = customer_key(user_id)
+    cache.delete(key)
+    # Again after commit, so a reader can't cache the pre-commit customer.
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,79 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+CHUNK_SIZE = 2000
+
+# (header, OrderItem lookup) for every exported column, one row per order item.
+COLUMNS = [
+    ("order_id", "order_id"),
+    ("placed_at", "order__placed_at"),
+    ("payment_status", "order__payment_status"),
+    ("order_total", "order__total"),
+    ("customer_id", "order__customer_id"),
+    ("first_name", "order__customer__user__first_name"),
+    ("last_name", "order__customer__user__last_name"),
+    ("email", "order__customer__user__email"),
+    ("product_id", "product_id"),
+    ("product_title", "product__title"),
+    ("quantity", "quantity"),
+    ("unit_price", "unit_price"),
+]
+HEADER = [header for header, _ in COLUMNS]
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    # iterator() streams from a server-side cursor on Postgres, so only one
+    # chunk of rows is in memory at a time.
+    return (
+        queryset.order_by("order_id", "id")
+        .values_list(*[lookup for _, lookup in COLUMNS])
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def chunked(lines, chunk_size=CHUNK_SIZE):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(HEADER)
+    for row in rows:
+        yield writer.writerow(
+            [value.isoformat() if hasattr(value, "isoformat") else value for value in row]
+        )
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(HEADER, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+FORMATS = {
+    "csv": (csv_lines, "text/csv", "orders.csv"),
+    "ndjson": (ndjson_lines, "application/x-ndjson", "orders.ndjson"),
+}
+
+
+def streaming_response(queryset, file_type, chunk_size=CHUNK_SIZE):
+    lines, content_type, filename = FORMATS[file_type]
+    response = StreamingHttpResponse(
+        chunked(lines(export_rows(queryset, chunk_size)), chunk_size), content_type=content_type
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
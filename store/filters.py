@@ -1,6 +1,7 @@
 from django_filters.rest_framework import FilterSet
 import django_filters
-from .models import Product
+from tags.models import TaggedItem
+from .models import Order, Product
 
 
 class ProductFiltering(FilterSet):
@@ -13,3 +14,25 @@ class ProductFiltering(FilterSet):
     collection_id = django_filters.NumberFilter(
         field_name="collection_id", lookup_expr="exact"
     )
+    tags = django_filters.CharFilter(method="filter_tags", label="tags")
+
+    def filter_tags(self, queryset, name, value):
+        # ?tags=a,b matches products with any of the tags.
+        labels = [label.strip() for label in value.split(",") if label.strip()]
+        if not labels:
+            return queryset
+        return queryset.filter(
+            id__in=TaggedItem.objects.object_ids_tagged(Product, labels)
+        )
+
+
+class OrderExportFiltering(FilterSet):
+    placed_after = django_filters.DateTimeFilter(
+        field_name="order__placed_at", lookup_expr="gte"
+    )
+    placed_before = django_filters.DateTimeFilter(
+        field_name="order__placed_at", lookup_expr="lt"
+    )
+    payment_status = django_filters.ChoiceFilter(
+        field_name="order__payment_status", choices=Order.PAYMENT_STATUS_CHOICES
+    )
@@ -0,0 +1,54 @@
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Longest edge of each variant, in pixels.
+VARIANT_SIZES = {"thumbnail": 150, "medium": 600}
+# (Pillow format, extension, save options) for every encoding of a variant.
+ENCODINGS = {
+    "jpeg": ("JPEG", "jpg", {"quality": 85, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 6}),
+}
+
+
+def encode(image, encoding):
+    image_format, _, options = ENCODINGS[encoding]
+    buffer = BytesIO()
+    # Pillow only writes EXIF/ICC metadata when asked to, so this strips it.
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def render_variants(file, name, storage):
+    with Image.open(file) as original:
+        # Apply the EXIF orientation before the metadata is dropped.
+        original = ImageOps.exif_transpose(original).convert("RGB")
+    stem = PurePosixPath(name)
+    variants = {}
+    for variant, size in VARIANT_SIZES.items():
+        image = original.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        variants[variant] = {}
+        for encoding, (_, extension, _) in ENCODINGS.items():
+            path = str(stem.parent / "variants" / f"{stem.stem}_{variant}.{extension}")
+            if storage.exists(path):
+                storage.delete(path)
+            variants[variant][encoding] = storage.save(
+                path, ContentFile(encode(image, encoding))
+            )
+    return variants
+
+
+def delete_variants(variants, storage):
+    for encodings in variants.values():
+        for name in encodings.values():
+            storage.delete(name)
+
+
+def variant_urls(variants, url):
+    return {
+        variant: {encoding: url(name) for encoding, name in encodings.items()}
+        for variant, encodings in variants.items()
+    }
@@ -0,0 +1,276 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from . import cache as catalog_cache
+from .models import Collection, Product
+from .search import product_search_vector
+
+CHUNK_SIZE = 5000
+
+# Columns every catalog file has, in COPY order. "collection" is the
+# collection title, collections that don't exist yet are created.
+FIELDS = ["title", "slug", "description", "unit_price", "inventory"]
+COLUMNS = FIELDS + ["collection"]
+
+STAGING_TABLE = "store_product_import"
+ROWS_TABLE = "store_product_import_rows"
+TOUCHED_TABLE = "store_product_import_touched"
+
+
+class InvalidRowError(Exception):
+    pass
+
+
+def read_csv(file):
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(file):
+    for line_num, line in enumerate(file, start=1):
+        if line.strip():
+            try:
+                yield line_num, json.loads(line)
+            except ValueError as error:
+                raise InvalidRowError(f"line {line_num}: {error}")
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def clean_row(line_num, row):
+    cleaned = {}
+    for name in FIELDS:
+        field = Product._meta.get_field(name)
+        try:
+            cleaned[name] = field.clean(row.get(name), None)
+        except ValidationError as error:
+            raise InvalidRowError(f"line {line_num}: {name}: {' '.join(error.messages)}")
+    collection = (row.get("collection") or "").strip()
+    if not collection:
+        raise InvalidRowError(f"line {line_num}: collection: This field cannot be blank.")
+    cleaned["collection"] = collection[:255]
+    return cleaned
+
+
+def read_chunks(file, file_type, chunk_size):
+    rows = (
+        (line_num, clean_row(line_num, row))
+        for line_num, row in READERS[file_type](file)
+    )
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def forget_products(product_ids):
+    # Dropping a version key re-seeds it from the clock, which is ahead of
+    # every version the cached details were stored under.
+    cache.delete_many([catalog_cache.product_version_key(pk) for pk in product_ids])
+
+
+def invalidate_catalog(product_ids=()):
+    product_ids = iter(product_ids)
+    for chunk in iter(lambda: list(islice(product_ids, CHUNK_SIZE)), []):
+        forget_products(chunk)
+    collection_ids = Collection.objects.values_list("id", flat=True)
+    catalog_cache.invalidate(
+        [catalog_cache.CATALOG_VERSION_KEY]
+        + [catalog_cache.collection_version_key(pk) for pk in collection_ids]
+    )
+
+
+# COPY every row into a temporary staging table, then upsert by slug with
+# INSERT ... ON CONFLICT and a handful of other set-based statements. Memory
+# is bounded by one chunk of rows.
+class CopyImporter:
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def copy_chunk(self, cursor, chunk):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for line_num, row in chunk:
+            writer.writerow([line_num] + [row[name] for name in COLUMNS])
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} (line, {', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+    def run(self, file, file_type):
+        try:
+            with transaction.atomic():
+                counts = self.load(file, file_type)
+            invalidate_catalog(
+                Product.objects.filter(
+                    id__in=RawSQL(f"SELECT id FROM {TOUCHED_TABLE}", [])
+                )
+                .values_list("id", flat=True)
+                .iterator(chunk_size=self.chunk_size)
+            )
+            return counts
+        finally:
+            with connection.cursor() as cursor:
+                for table in [STAGING_TABLE, ROWS_TABLE, TOUCHED_TABLE]:
+                    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+    def load(self, file, file_type):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {STAGING_TABLE} ("
+                "line bigint, title text, slug text, description text, "
+                "unit_price numeric(6, 2), inventory integer, collection text)"
+            )
+            for chunk in read_chunks(file, file_type, self.chunk_size):
+                self.copy_chunk(cursor, chunk)
+
+            # A slug can appear more than once, the last line wins.
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {ROWS_TABLE} AS "
+                "SELECT DISTINCT ON (slug) *, NULL::bigint AS collection_id "
+                f"FROM {STAGING_TABLE} ORDER BY slug, line DESC"
+            )
+            cursor.execute(f"CREATE INDEX ON {ROWS_TABLE} (slug)")
+            cursor.execute(f"ANALYZE {ROWS_TABLE}")
+
+            cursor.execute(
+                "INSERT INTO store_collection (title, products_count, last_update) "
+                f"SELECT DISTINCT r.collection, 0, now() FROM {ROWS_TABLE} r "
+                "WHERE NOT EXISTS ("
+                "SELECT 1 FROM store_collection c WHERE c.title = r.collection)"
+            )
+            collections = cursor.rowcount
+            cursor.execute(
+                f"UPDATE {ROWS_TABLE} r SET collection_id = c.id FROM ("
+                "SELECT title, MIN(id) AS id FROM store_collection GROUP BY title"
+                ") c WHERE c.title = r.collection"
+            )
+
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {TOUCHED_TABLE} (id bigint, inserted boolean)"
+            )
+            # Unchanged rows are skipped by the WHERE and not returned; xmax is
+            # 0 only for rows this statement inserted.
+            cursor.execute(
+                "WITH upserted AS ("
+                "INSERT INTO store_product "
+                "(title, slug, description, unit_price, inventory, collection_id, last_update) "
+                "SELECT r.title, r.slug, r.description, r.unit_price, r.inventory, "
+                f"r.collection_id, now() FROM {ROWS_TABLE} r ORDER BY r.line "
+                "ON CONFLICT (slug) DO UPDATE SET title = EXCLUDED.title, "
+                "description = EXCLUDED.description, unit_price = EXCLUDED.unit_price, "
+                "inventory = EXCLUDED.inventory, collection_id = EXCLUDED.collection_id, "
+                "last_update = EXCLUDED.last_update WHERE "
+                "(store_product.title, store_product.description, store_product.unit_price, "
+                "store_product.inventory, store_product.collection_id) IS DISTINCT FROM "
+                "(EXCLUDED.title, EXCLUDED.description, EXCLUDED.unit_price, "
+                "EXCLUDED.inventory, EXCLUDED.collection_id) "
+                "RETURNING id, xmax = 0) "
+                f"INSERT INTO {TOUCHED_TABLE} SELECT * FROM upserted"
+            )
+            cursor.execute(
+                f"SELECT (SELECT COUNT(*) FROM {ROWS_TABLE}), "
+                "COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) "
+                f"FROM {TOUCHED_TABLE}"
+            )
+            rows, inserted, updated = cursor.fetchone()
+
+        Product.objects.filter(
+            id__in=RawSQL(f"SELECT id FROM {TOUCHED_TABLE}", [])
+        ).update(search_vector=product_search_vector())
+        Collection.objects.recount_products()
+        return {
+            "inserted": inserted,
+            "updated": updated,
+            "unchanged": rows - inserted - updated,
+            "collections": collections,
+        }
+
+
+# Upsert chunk by chunk with the ORM. Each chunk is its own transaction so
+# neither memory nor the transaction grows with the file; re-running an
+# import that failed half way is safe.
+class BatchImporter:
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.collections = {}
+
+    def collection_ids(self, titles):
+        missing = [title for title in titles if title not in self.collections]
+        for title, pk in (
+            Collection.objects.filter(title__in=missing).order_by("-id").values_list("title", "id")
+        ):
+            self.collections[title] = pk
+        new = [Collection(title=title) for title in missing if title not in self.collections]
+        for collection in Collection.objects.bulk_create(new):
+            self.collections[collection.title] = collection.pk
+        return len(new)
+
+    def run(self, file, file_type):
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "collections": 0}
+        for chunk in read_chunks(file, file_type, self.chunk_size):
+            with transaction.atomic():
+                product_ids = self.load(chunk, counts)
+            forget_products(product_ids)
+        invalidate_catalog()
+        return counts
+
+    def load(self, chunk, counts):
+        rows = {row["slug"]: row for _, row in chunk}
+        counts["collections"] += self.collection_ids({row["collection"] for row in rows.values()})
+        for row in rows.values():
+            row["collection_id"] = self.collections[row["collection"]]
+        fields = ["title", "description", "unit_price", "inventory", "collection_id"]
+
+        stored = {
+            product.slug: product
+            for product in Product.objects.filter(slug__in=list(rows)).only("slug", *fields)
+        }
+        now = timezone.now()
+        upsert = [
+            Product(slug=slug, last_update=now, **{name: row[name] for name in fields})
+            for slug, row in rows.items()
+            if slug not in stored
+            or any(getattr(stored[slug], name) != row[name] for name in fields)
+        ]
+        # INSERT ... ON CONFLICT (slug) DO UPDATE, so a product another import
+        # created meanwhile is updated instead of failing the chunk.
+        upserted = Product.objects.bulk_create(
+            upsert,
+            update_conflicts=True,
+            unique_fields=["slug"],
+            update_fields=fields + ["last_update"],
+            batch_size=500,
+        )
+        changed = [stored[product.slug] for product in upsert if product.slug in stored]
+        counts["updated"] += len(changed)
+        counts["inserted"] += len(upsert) - len(changed)
+        counts["unchanged"] += len(stored) - len(changed)
+        # bulk_create() recounts the collections products moved to, not the
+        # ones they left.
+        Collection.objects.filter(
+            pk__in={product.collection_id for product in changed}
+        ).recount_products()
+
+        product_ids = {product.pk for product in changed + upserted} - {None}
+        if connection.vendor == "postgresql":
+            Product.objects.filter(pk__in=product_ids).update(
+                search_vector=product_search_vector()
+            )
+        return product_ids
+
+
+def import_products(file, file_type="csv", method=None, chunk_size=CHUNK_SIZE):
+    if method is None:
+        method = "copy" if connection.vendor == "postgresql" else "batch"
+    importer = CopyImporter if method == "copy" else BatchImporter
+    return importer(chunk_size).run(file, file_type)
@@ -0,0 +1,54 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.contrib.contenttypes.models import ContentType
+
+from likes.counters import LikeCounter
+
+from .models import Product
+
+# Like counts come from the counters on every request instead of the catalog
+# cache, which would hold them for CATALOG_CACHE_TIMEOUT.
+
+
+def counts(product_ids, stored=None):
+    return LikeCounter(Product).counts(product_ids, stored)
+
+
+async def acounts(product_ids, stored=None):
+    # get_for_model() may query, so it runs where the async ORM does; only
+    # the Redis calls in LikeCounter.acounts() leave that thread.
+    content_type = await sync_to_async(ContentType.objects.get_for_model)(Product)
+    return await LikeCounter(Product, content_type).acounts(product_ids, stored)
+
+
+def stored_counts(rows):
+    # Annotated by ProductQuerySet.with_stored_likes(); rows loaded without
+    # it leave the counters to query.
+    stored = {}
+    for row in rows:
+        if isinstance(row, dict):
+            if "stored_likes" in row:
+                stored[row["id"]] = row["stored_likes"]
+        elif hasattr(row, "stored_likes"):
+            stored[row.id] = row.stored_likes
+    return stored
+
+
+def product_ids(data):
+    # A product list page or a single product.
+    if "results" in data:
+        return [product["id"] for product in data["results"]]
+    return [data["id"]]
+
+
+def with_likes(data, counts):
+    if "results" in data:
+        return {**data, "results": [with_likes(product, counts) for product in data["results"]]}
+    return {**data, "likes": counts.get(data["id"], 0)}
+
+
+def etag(catalog_etag, counts):
+    # Last-Modified only follows the catalog, but the ETag covers the counts.
+    raw = catalog_etag + "|" + ",".join(f"{pk}:{count}" for pk, count in sorted(counts.items()))
+    return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
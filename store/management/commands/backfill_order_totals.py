@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum
+
+from store.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = 'Fills Order.total for orders placed before totals were stored'
+
+    def handle(self, *args, **options):
+        totals = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .order_by()
+            .values('order')
+            .annotate(total=Sum(F('quantity') * F('unit_price'),
+                                output_field=DecimalField(max_digits=12, decimal_places=2)))
+            .values('total')
+        )
+        updated = Order.objects.filter(total__isnull=True).update(total=Subquery(totals))
+        self.stdout.write(f'Filled the total of {updated} order(s).')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils.text import slugify
+
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = ('Gives products that share a slug distinct ones, run it before '
+            'migrating to the unique slug constraint')
+
+    def handle(self, *args, **options):
+        duplicates = (
+            Product.objects.values('slug')
+            .annotate(count=Count('id'))
+            .filter(count__gt=1)
+            .values('slug')
+        )
+        products = list(Product.objects.filter(slug__in=duplicates).only('id', 'title'))
+        max_length = Product._meta.get_field('slug').max_length
+        for product in products:
+            suffix = f'-{product.id}'
+            base = slugify(product.title)[: max_length - len(suffix)].strip('-')
+            product.slug = f'{base}{suffix}'
+        Product.objects.bulk_update(products, ['slug'], batch_size=1000)
+        self.stdout.write(f'Backfilled {len(products)} slug(s).')
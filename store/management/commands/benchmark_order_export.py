@@ -0,0 +1,34 @@
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+
+from store import exports
+from store.models import OrderItem
+
+
+class Command(BaseCommand):
+    help = 'Streams the staff order export and reports rows, time and peak RSS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file-type', choices=list(exports.FORMATS), default='csv')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        response = exports.streaming_response(
+            OrderItem.objects.all(), options['file_type'], chunk_size=options['chunk_size']
+        )
+        rows = 0
+        size = 0
+        for chunk in response.streaming_content:
+            rows += chunk.count(b'\n')
+            size += len(chunk)
+        elapsed = time.perf_counter() - start
+        # ru_maxrss is in kilobytes on Linux.
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.stdout.write(
+            f'Exported {rows} line(s), {size / 1024 / 1024:.1f} MiB in {elapsed:.2f}s; '
+            f'peak RSS {peak_rss / 1024:.1f} MiB ({(peak_rss - start_rss) / 1024:+.1f} MiB).'
+        )
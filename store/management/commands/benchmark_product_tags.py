@@ -0,0 +1,96 @@
+import statistics
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from store.filters import ProductFiltering
+from store.models import Product
+from store.serializers import ProductRowSerializer
+from tags.models import Tag, TaggedItem
+
+LABEL_PREFIX = 'benchmark-tag-'
+
+
+class Command(BaseCommand):
+    help = 'Tags products with up to a million items and times tagged catalog pages and ?tags='
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1_000_000)
+        parser.add_argument('--tags', type=int, default=1000)
+        parser.add_argument('--per-product', type=int, default=8)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--keep', action='store_true', help='keep the generated tags')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The tag benchmark needs Postgres.')
+        product_ids = list(Product.objects.order_by('id').values_list('id', flat=True)[:100])
+        if not product_ids:
+            raise CommandError('Seed some products first, e.g. manage.py seed_db.')
+        per_product = min(options['per_product'], options['tags'])
+
+        try:
+            self.generate(options['items'], options['tags'], per_product)
+            self.report(product_ids, options['iterations'])
+        finally:
+            if not options['keep']:
+                # Raw deletes: a million post_delete signals would dwarf the run.
+                TaggedItem.objects.filter(tag__label__startswith=LABEL_PREFIX)._raw_delete(
+                    connection.alias
+                )
+                Tag.objects.filter(label__startswith=LABEL_PREFIX)._raw_delete(connection.alias)
+
+    def generate(self, items, tag_count, per_product):
+        start = time.perf_counter()
+        content_type = ContentType.objects.get_for_model(Product)
+        with transaction.atomic():
+            tags = Tag.objects.bulk_create(
+                [Tag(label=f'{LABEL_PREFIX}{index}') for index in range(tag_count)]
+            )
+            tag_ids = [tag.id for tag in tags]
+            # per_product items for each of object ids 1, 2, ..., most of which
+            # are past the seeded products, like a catalog of items / per_product
+            # products. 7919 is prime, so one object never gets a tag twice.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'INSERT INTO tags_taggeditem (tag_id, content_type_id, object_id) '
+                    'SELECT (%s::bigint[])[1 + (n::bigint * 7919) %% %s], %s, 1 + n / %s '
+                    'FROM generate_series(0, %s - 1) AS n',
+                    [tag_ids, len(tag_ids), content_type.id, per_product, items],
+                )
+                cursor.execute('ANALYZE tags_tag')
+                cursor.execute('ANALYZE tags_taggeditem')
+        self.stdout.write(
+            f'Tagged {items} item(s) with {tag_count} tag(s) in {time.perf_counter() - start:.1f}s'
+        )
+
+    def report(self, product_ids, iterations):
+        page = product_ids
+        labels = [f'{LABEL_PREFIX}1', f'{LABEL_PREFIX}2']
+        filtered = ProductFiltering(
+            {'tags': ','.join(labels)}, queryset=Product.objects.order_by('id')
+        ).qs[:10]
+        # The rows the product API renders, tags included, for a 100-product page.
+        catalog_page = (
+            Product.objects.for_catalog()
+            .values(*ProductRowSerializer.Meta.fields)
+            .filter(pk__in=page)
+            .order_by('id')
+        )
+        cases = [
+            ('catalog page of 100', lambda: list(catalog_page.all())),
+            ('?tags= page', lambda: list(filtered.all())),
+        ]
+        self.stdout.write(f"{'case':<24}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, run in cases:
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - start) * 1000)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            self.stdout.write(f'{name:<24}{statistics.median(timings):>10.2f}{p95:>10.2f}')
+        for name, queryset in [('catalog page of 100', catalog_page), ('?tags= page', filtered)]:
+            self.stdout.write(f'\n{name}:\n{queryset.explain()}')
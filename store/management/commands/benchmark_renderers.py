@@ -0,0 +1,47 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+from store.models import Product
+from store.serializers import ProductRowSerializer
+
+RENDERERS = [
+    ('drf json', JSONRenderer()),
+    ('orjson', ORJSONRenderer()),
+    ('msgpack', MessagePackRenderer()),
+]
+
+
+class Command(BaseCommand):
+    help = 'Compares encoding time and payload size of the API renderers on a product page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/store/products/'))
+        rows = Product.objects.for_catalog().values(
+            *ProductRowSerializer.Meta.fields).order_by('id')
+        products = ProductRowSerializer(
+            rows[:options['page_size']], many=True, context={'request': request}).data
+        data = {'next': None, 'previous': None, 'results': products}
+
+        self.stdout.write(f'{len(products)} product(s), {options["iterations"]} iteration(s)')
+        self.stdout.write(f"{'renderer':<10}{'bytes':>10}{'p50 ms':>10}{'speedup':>10}")
+        baseline = None
+        for name, renderer in RENDERERS:
+            timings = []
+            for _ in range(options['iterations']):
+                start = time.perf_counter()
+                content = renderer.render(data)
+                timings.append((time.perf_counter() - start) * 1000)
+            median = statistics.median(timings)
+            baseline = baseline or median
+            self.stdout.write(
+                f'{name:<10}{len(content):>10}{median:>10.3f}{baseline / median:>9.1f}x')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from store import cache as catalog_cache
+
+
+class Command(BaseCommand):
+    help = 'Reports hit/miss counters of the product catalog cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Reset the counters after reporting them')
+
+    def handle(self, *args, **options):
+        stats = catalog_cache.stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  "
+            f"hit ratio: {stats['hit_ratio']:.2%}")
+        if options['reset']:
+            catalog_cache.reset_stats()
@@ -0,0 +1,35 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.imports import CHUNK_SIZE, READERS, InvalidRowError, import_products
+
+
+class Command(BaseCommand):
+    help = 'Upserts products (by slug) and collections (by title) from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--file-type', choices=list(READERS),
+                            help='Defaults to jsonl for .jsonl/.ndjson files, csv otherwise')
+        parser.add_argument('--method', choices=['copy', 'batch'],
+                            help='copy (Postgres only) or batch bulk_create, defaults to '
+                                 'copy on Postgres')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_type = options['file_type'] or (
+            'jsonl' if path.suffix in ['.jsonl', '.ndjson'] else 'csv')
+        start = time.perf_counter()
+        try:
+            with path.open(newline='', encoding='utf-8') as file:
+                counts = import_products(
+                    file, file_type, options['method'], options['chunk_size'])
+        except (OSError, InvalidRowError) as error:
+            raise CommandError(error)
+        self.stdout.write(
+            f'Inserted {counts["inserted"]}, updated {counts["updated"]}, '
+            f'unchanged {counts["unchanged"]} product(s) and created '
+            f'{counts["collections"]} collection(s) in {time.perf_counter() - start:.1f}s.')
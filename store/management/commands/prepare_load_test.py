@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from store.imports import invalidate_catalog
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Seeds the catalog and creates the accounts the locust scenarios log in with'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=50)
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument('--inventory', type=int, default=1_000_000,
+                            help='Restock every product so checkouts never run out')
+
+    def handle(self, *args, **options):
+        if not Product.objects.exists():
+            call_command('seed_db')
+
+        User = get_user_model()
+        accounts = [('loadtest-staff', True)] + [
+            (f'loadtest-buyer-{index}', False) for index in range(options['buyers'])]
+        created = 0
+        for username, is_staff in accounts:
+            user, is_new = User.objects.get_or_create(
+                username=username,
+                defaults={'email': f'{username}@example.com', 'is_staff': is_staff})
+            user.set_password(options['password'])
+            user.save()
+            created += is_new
+
+        Product.objects.update(inventory=options['inventory'])
+        invalidate_catalog(Product.objects.values_list('id', flat=True).iterator())
+        self.stdout.write(
+            f'Created {created} account(s), {len(accounts)} ready; '
+            f'restocked {Product.objects.count()} products.')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+
+from store.models import Collection
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Collection.products_count and reports drifted counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report drift, do not fix it')
+
+    def handle(self, *args, **options):
+        drifted = (
+            Collection.objects.annotate(actual=Count('products'))
+            .exclude(products_count=F('actual'))
+            .values_list('id', 'title', 'products_count', 'actual')
+        )
+        drifted = list(drifted)
+        for collection_id, title, stored, actual in drifted:
+            self.stdout.write(
+                f'{collection_id} {title}: stored {stored}, actual {actual}')
+        if not options['dry_run']:
+            Collection.objects.recount_products()
+        self.stdout.write(f'{len(drifted)} collection(s) drifted.')
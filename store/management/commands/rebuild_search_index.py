@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from store.search import install_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product full-text search index'
+
+    def handle(self, *args, **options):
+        install_search_index()
+        count = rebuild_search_index()
+        self.stdout.write(f'Indexed {count} products.')
@@ -1,16 +1,16 @@
 insert into
-  store_collection (id, title, featured_product_id)
+  store_collection (id, title, featured_product_id, products_count, last_update)
 values
-  (1, 'Flowers', null),
-  (2, 'Grocery', null),
-  (3, 'Beauty', null),
-  (4, 'Cleaning', null),
-  (5, 'Stationary', null),
-  (6, 'Pets', null),
-  (7, 'Baking', null),
-  (8, 'Spices', null),
-  (9, 'Toys', null),
-  (10, 'Magazines', null);
+  (1, 'Flowers', null, 0, now()),
+  (2, 'Grocery', null, 0, now()),
+  (3, 'Beauty', null, 0, now()),
+  (4, 'Cleaning', null, 0, now()),
+  (5, 'Stationary', null, 0, now()),
+  (6, 'Pets', null, 0, now()),
+  (7, 'Baking', null, 0, now()),
+  (8, 'Spices', null, 0, now()),
+  (9, 'Toys', null, 0, now()),
+  (10, 'Magazines', null, 0, now());
 
 insert into
   store_product (
@@ -32,7 +32,7 @@ values
     11,
     '2020-09-11 00:00:00',
     6,
-    '-'
+    'bread-ww-cluster-1'
   ),
   (
     2,
@@ -42,7 +42,7 @@ values
     40,
     '2020-07-07 00:00:00',
     3,
-    '-'
+    'island-oasis-raspberry'
   ),
   (
     3,
@@ -52,7 +52,7 @@ values
     29,
     '2021-04-05 00:00:00',
     3,
-    '-'
+    'shrimp-2125-peel-and-deviened-3'
   ),
   (
     4,
@@ -62,7 +62,7 @@ values
     40,
     '2020-07-20 00:00:00',
     5,
-    '-'
+    'wood-chips-regular'
   ),
   (
     5,
@@ -72,7 +72,7 @@ values
     56,
     '2020-08-18 00:00:00',
     5,
-    '-'
+    'lettuce-mini-greens-whole'
   ),
   (
     6,
@@ -82,7 +82,7 @@ values
     18,
     '2020-10-25 00:00:00',
     6,
-    '-'
+    'mustard-individual-pkg-6'
   ),
   (
     7,
@@ -92,7 +92,7 @@ values
     48,
     '2020-08-08 00:00:00',
     4,
-    '-'
+    'turkey-tenderloin-frozen'
   ),
   (
     8,
@@ -102,7 +102,7 @@ values
     55,
     '2021-06-03 00:00:00',
     6,
-    '-'
+    'silicone-parch-163x243'
   ),
   (
     9,
@@ -112,7 +112,7 @@ values
     45,
     '2021-03-03 00:00:00',
     5,
-    '-'
+    'tomatoes-cherry-yellow'
   ),
   (
     10,
@@ -122,7 +122,7 @@ values
     69,
     '2021-04-18 00:00:00',
     5,
-    '-'
+    'sloe-gin-mcguinness'
   ),
   (
     11,
@@ -132,7 +132,7 @@ values
     71,
     '2021-01-19 00:00:00',
     6,
-    '-'
+    'wine-magnotta-belpaese'
   ),
   (
     12,
@@ -142,7 +142,7 @@ values
     55,
     '2020-12-28 00:00:00',
     3,
-    '-'
+    'beer-alexander-kieths-pale-ale'
   ),
   (
     13,
@@ -152,7 +152,7 @@ values
     41,
     '2020-07-07 00:00:00',
     6,
-    '-'
+    'basil-thai'
   ),
   (
     14,
@@ -162,7 +162,7 @@ values
     24,
     '2020-08-29 00:00:00',
     4,
-    '-'
+    'tofu-soft'
   ),
   (
     15,
@@ -172,7 +172,7 @@ values
     35,
     '2020-07-25 00:00:00',
     4,
-    '-'
+    'mayonnaise-individual-pkg'
   ),
   (
     16,
@@ -182,7 +182,7 @@ values
     63,
     '2020-07-16 00:00:00',
     6,
-    '-'
+    'sauce-hollandaise'
   ),
   (
     17,
@@ -192,7 +192,7 @@ values
     60,
     '2021-03-05 00:00:00',
     3,
-    '-'
+    'salt-rock-course'
   ),
   (
     18,
@@ -202,7 +202,7 @@ values
     85,
     '2020-07-26 00:00:00',
     4,
-    '-'
+    'beef-ox-tail-frozen'
   ),
   (
     19,
@@ -212,7 +212,7 @@ values
     10,
     '2021-05-14 00:00:00',
     5,
-    '-'
+    'schnappes-peach-walkers'
   ),
   (
     20,
@@ -222,7 +222,7 @@ values
     97,
     '2020-08-12 00:00:00',
     3,
-    '-'
+    'cheese-parmesan-cubes'
   ),
   (
     21,
@@ -232,7 +232,7 @@ values
     49,
     '2021-01-14 00:00:00',
     5,
-    '-'
+    'sweet-pea-sprouts'
   ),
   (
     22,
@@ -242,7 +242,7 @@ values
     56,
     '2020-11-13 00:00:00',
     5,
-    '-'
+    'straw-regular-22'
   ),
   (
     23,
@@ -252,7 +252,7 @@ values
     63,
     '2021-01-22 00:00:00',
     6,
-    '-'
+    'peach-fresh-23'
   ),
   (
     24,
@@ -262,7 +262,7 @@ values
     64,
     '2020-10-31 00:00:00',
     3,
-    '-'
+    'chinese-foods-pepper-beef'
   ),
   (
     25,
@@ -272,7 +272,7 @@ values
     96,
     '2021-05-05 00:00:00',
     4,
-    '-'
+    'guava'
   ),
   (
     26,
@@ -282,7 +282,7 @@ values
     0,
     '2021-03-24 00:00:00',
     3,
-    '-'
+    'tendrils-baby-pea-organic'
   ),
   (
     27,
@@ -292,7 +292,7 @@ values
     84,
     '2020-10-24 00:00:00',
     5,
-    '-'
+    'sugar-brown'
   ),
   (
     28,
@@ -302,7 +302,7 @@ values
     90,
     '2021-02-11 00:00:00',
     5,
-    '-'
+    'oil-pumpkinseed'
   ),
   (
     29,
@@ -312,7 +312,7 @@ values
     82,
     '2021-02-07 00:00:00',
     6,
-    '-'
+    'beef-tongue-cooked'
   ),
   (
     30,
@@ -322,7 +322,7 @@ values
     66,
     '2021-03-01 00:00:00',
     4,
-    '-'
+    'goat-leg'
   ),
   (
     31,
@@ -332,7 +332,7 @@ values
     79,
     '2021-05-26 00:00:00',
     5,
-    '-'
+    'orange-roughy-46-oz'
   ),
   (
     32,
@@ -342,7 +342,7 @@ values
     83,
     '2021-06-03 00:00:00',
     5,
-    '-'
+    'lemons'
   ),
   (
     33,
@@ -352,7 +352,7 @@ values
     8,
     '2021-03-23 00:00:00',
     6,
-    '-'
+    'turnip-mini-33'
   ),
   (
     34,
@@ -362,7 +362,7 @@ values
     45,
     '2020-08-23 00:00:00',
     3,
-    '-'
+    'hinge-w-undercut'
   ),
   (
     35,
@@ -372,7 +372,7 @@ values
     76,
     '2020-10-13 00:00:00',
     3,
-    '-'
+    'cheese-mozzarella'
   ),
   (
     36,
@@ -382,7 +382,7 @@ values
     2,
     '2021-06-07 00:00:00',
     4,
-    '-'
+    'basil-fresh'
   ),
   (
     37,
@@ -392,7 +392,7 @@ values
     12,
     '2020-11-17 00:00:00',
     3,
-    '-'
+    'pastry-choclate-baked-37'
   ),
   (
     38,
@@ -402,7 +402,7 @@ values
     98,
     '2021-04-29 00:00:00',
     5,
-    '-'
+    'vol-au-vents-38'
   ),
   (
     39,
@@ -412,7 +412,7 @@ values
     61,
     '2020-09-04 00:00:00',
     4,
-    '-'
+    'tomatoes-roma-39'
   ),
   (
     40,
@@ -422,7 +422,7 @@ values
     8,
     '2021-04-07 00:00:00',
     5,
-    '-'
+    'bread-hamburger-buns-40'
   ),
   (
     41,
@@ -432,7 +432,7 @@ values
     54,
     '2020-12-22 00:00:00',
     3,
-    '-'
+    'cheese-cambozola-41'
   ),
   (
     42,
@@ -442,7 +442,7 @@ values
     52,
     '2020-08-29 00:00:00',
     5,
-    '-'
+    'cup-4oz-translucent'
   ),
   (
     43,
@@ -452,7 +452,7 @@ values
     38,
     '2021-05-15 00:00:00',
     6,
-    '-'
+    'macaroons-two-bite-choc-43'
   ),
   (
     44,
@@ -462,7 +462,7 @@ values
     88,
     '2021-02-10 00:00:00',
     6,
-    '-'
+    'vinegar-raspberry'
   ),
   (
     45,
@@ -472,7 +472,7 @@ values
     93,
     '2020-09-26 00:00:00',
     3,
-    '-'
+    'cake-night-and-day-choclate'
   ),
   (
     46,
@@ -482,7 +482,7 @@ values
     92,
     '2020-07-14 00:00:00',
     6,
-    '-'
+    'wine-domaine-boyar-royal-46'
   ),
   (
     47,
@@ -492,7 +492,7 @@ values
     15,
     '2021-04-28 00:00:00',
     3,
-    '-'
+    'sword-pick-asst-47'
   ),
   (
     48,
@@ -502,7 +502,7 @@ values
     94,
     '2021-06-06 00:00:00',
     6,
-    '-'
+    'sage-ground'
   ),
   (
     49,
@@ -512,7 +512,7 @@ values
     16,
     '2020-07-07 00:00:00',
     3,
-    '-'
+    'muffin-mix-chocolate-chip'
   ),
   (
     50,
@@ -522,7 +522,7 @@ values
     14,
     '2020-06-11 00:00:00',
     4,
-    '-'
+    'tia-maria-50'
   ),
   (
     51,
@@ -532,7 +532,7 @@ values
     94,
     '2021-05-05 00:00:00',
     3,
-    '-'
+    'apple-fuji-51'
   ),
   (
     52,
@@ -542,7 +542,7 @@ values
     44,
     '2020-06-14 00:00:00',
     4,
-    '-'
+    'veal-tenderloin-untrimmed'
   ),
   (
     53,
@@ -552,7 +552,7 @@ values
     58,
     '2021-01-19 00:00:00',
     3,
-    '-'
+    'mushroom-crimini'
   ),
   (
     54,
@@ -562,7 +562,7 @@ values
     93,
     '2021-04-24 00:00:00',
     3,
-    '-'
+    'parsley-italian-fresh'
   ),
   (
     55,
@@ -572,7 +572,7 @@ values
     43,
     '2020-09-06 00:00:00',
     4,
-    '-'
+    'tart-pecan-butter-squares-55'
   ),
   (
     56,
@@ -582,7 +582,7 @@ values
     60,
     '2021-05-09 00:00:00',
     5,
-    '-'
+    'vinegar-tarragon-56'
   ),
   (
     57,
@@ -592,7 +592,7 @@ values
     5,
     '2021-01-01 00:00:00',
     3,
-    '-'
+    'beef-tender-tips'
   ),
   (
     58,
@@ -602,7 +602,7 @@ values
     11,
     '2021-04-07 00:00:00',
     3,
-    '-'
+    'chicken-whole-roasting-58'
   ),
   (
     59,
@@ -612,7 +612,7 @@ values
     13,
     '2020-08-14 00:00:00',
     6,
-    '-'
+    'water-tonic'
   ),
   (
     60,
@@ -622,7 +622,7 @@ values
     100,
     '2020-07-21 00:00:00',
     4,
-    '-'
+    'shrimp-tiger-2125-60'
   ),
   (
     61,
@@ -632,7 +632,7 @@ values
     43,
     '2020-09-25 00:00:00',
     6,
-    '-'
+    'hagen-daza-dk-choocolate'
   ),
   (
     62,
@@ -642,7 +642,7 @@ values
     34,
     '2020-10-14 00:00:00',
     6,
-    '-'
+    'grenadillo'
   ),
   (
     63,
@@ -652,7 +652,7 @@ values
     34,
     '2020-09-22 00:00:00',
     5,
-    '-'
+    'coffee-10oz-cup-92961-63'
   ),
   (
     64,
@@ -662,7 +662,7 @@ values
     32,
     '2021-02-13 00:00:00',
     5,
-    '-'
+    'seabream-whole-farmed'
   ),
   (
     65,
@@ -672,7 +672,7 @@ values
     12,
     '2021-03-10 00:00:00',
     4,
-    '-'
+    'coconut-milk-unsweetened-65'
   ),
   (
     66,
@@ -682,7 +682,7 @@ values
     31,
     '2020-06-13 00:00:00',
     5,
-    '-'
+    'soap-mrclean-floor-soap-66'
   ),
   (
     67,
@@ -692,7 +692,7 @@ values
     33,
     '2021-01-13 00:00:00',
     5,
-    '-'
+    'cheese-cambozola-67'
   ),
   (
     68,
@@ -702,7 +702,7 @@ values
     7,
     '2021-04-14 00:00:00',
     5,
-    '-'
+    'soup-campbells-mexicali-tortilla'
   ),
   (
     69,
@@ -712,7 +712,7 @@ values
     6,
     '2021-02-10 00:00:00',
     4,
-    '-'
+    'apron'
   ),
   (
     70,
@@ -722,7 +722,7 @@ values
     15,
     '2020-12-10 00:00:00',
     3,
-    '-'
+    'wine-penfolds-koonuga-hill-70'
   ),
   (
     71,
@@ -732,7 +732,7 @@ values
     25,
     '2020-08-19 00:00:00',
     5,
-    '-'
+    'milk-chocolate-250-ml'
   ),
   (
     72,
@@ -742,7 +742,7 @@ values
     43,
     '2020-10-10 00:00:00',
     4,
-    '-'
+    'beer-paulaner-hefeweisse-72'
   ),
   (
     73,
@@ -752,7 +752,7 @@ values
     50,
     '2020-11-02 00:00:00',
     4,
-    '-'
+    'chocolate-feathers'
   ),
   (
     74,
@@ -762,7 +762,7 @@ values
     72,
     '2021-04-13 00:00:00',
     3,
-    '-'
+    'club-soda-schweppes-355-ml-74'
   ),
   (
     75,
@@ -772,7 +772,7 @@ values
     53,
     '2020-10-12 00:00:00',
     4,
-    '-'
+    'corn-kernels-frozen'
   ),
   (
     76,
@@ -782,7 +782,7 @@ values
     72,
     '2020-12-08 00:00:00',
     3,
-    '-'
+    'cheese-cloth-no-60'
   ),
   (
     77,
@@ -792,7 +792,7 @@ values
     93,
     '2020-07-06 00:00:00',
     3,
-    '-'
+    'chips-assorted'
   ),
   (
     78,
@@ -802,7 +802,7 @@ values
     39,
     '2020-08-29 00:00:00',
     4,
-    '-'
+    'bagelers-78'
   ),
   (
     79,
@@ -812,7 +812,7 @@ values
     24,
     '2021-05-13 00:00:00',
     3,
-    '-'
+    'corn-cream-canned'
   ),
   (
     80,
@@ -822,7 +822,7 @@ values
     70,
     '2020-07-09 00:00:00',
     4,
-    '-'
+    'bread-raisin'
   ),
   (
     81,
@@ -832,7 +832,7 @@ values
     29,
     '2020-12-15 00:00:00',
     5,
-    '-'
+    'soup-campbells-81'
   ),
   (
     82,
@@ -842,7 +842,7 @@ values
     67,
     '2020-10-25 00:00:00',
     5,
-    '-'
+    'ecolab-hobart-washarm-end-cap'
   ),
   (
     83,
@@ -852,7 +852,7 @@ values
     17,
     '2020-07-27 00:00:00',
     3,
-    '-'
+    'asparagus-white-canned'
   ),
   (
     84,
@@ -862,7 +862,7 @@ values
     11,
     '2020-12-23 00:00:00',
     6,
-    '-'
+    'muffin-mix-lemon-cranberry'
   ),
   (
     85,
@@ -872,7 +872,7 @@ values
     58,
     '2021-06-07 00:00:00',
     5,
-    '-'
+    'shrimp-1620-peeled-deviened'
   ),
   (
     86,
@@ -882,7 +882,7 @@ values
     88,
     '2021-05-04 00:00:00',
     3,
-    '-'
+    'soda-water-club-soda-355-ml'
   ),
   (
     87,
@@ -892,7 +892,7 @@ values
     52,
     '2020-10-10 00:00:00',
     5,
-    '-'
+    'napkin-white-starched'
   ),
   (
     88,
@@ -902,7 +902,7 @@ values
     59,
     '2020-06-20 00:00:00',
     3,
-    '-'
+    'beer-steamwhistle-88'
   ),
   (
     89,
@@ -912,7 +912,7 @@ values
     92,
     '2020-10-11 00:00:00',
     6,
-    '-'
+    'pail-for-lid-1537'
   ),
   (
     90,
@@ -922,7 +922,7 @@ values
     48,
     '2020-12-28 00:00:00',
     3,
-    '-'
+    'chinese-foods-chicken-wing'
   ),
   (
     91,
@@ -932,7 +932,7 @@ values
     32,
     '2021-05-15 00:00:00',
     5,
-    '-'
+    'spice-montreal-steak-spice-91'
   ),
   (
     92,
@@ -942,7 +942,7 @@ values
     26,
     '2020-07-16 00:00:00',
     5,
-    '-'
+    'juice-grapefruit-341-ml'
   ),
   (
     93,
@@ -952,7 +952,7 @@ values
     87,
     '2020-12-29 00:00:00',
     5,
-    '-'
+    'wine-wyndham-estate-bin-777'
   ),
   (
     94,
@@ -962,7 +962,7 @@ values
     71,
     '2020-07-16 00:00:00',
     5,
-    '-'
+    'water-mineral-natural-94'
   ),
   (
     95,
@@ -972,7 +972,7 @@ values
     15,
     '2020-06-21 00:00:00',
     3,
-    '-'
+    'chicken-leg-boneless'
   ),
   (
     96,
@@ -982,7 +982,7 @@ values
     2,
     '2020-10-19 00:00:00',
     3,
-    '-'
+    'sunflower-seed-raw'
   ),
   (
     97,
@@ -992,7 +992,7 @@ values
     31,
     '2021-02-23 00:00:00',
     6,
-    '-'
+    'energy-drink-bawls'
   ),
   (
     98,
@@ -1002,7 +1002,7 @@ values
     38,
     '2020-08-11 00:00:00',
     3,
-    '-'
+    'tarragon-primerba-paste'
   ),
   (
     99,
@@ -1012,7 +1012,7 @@ values
     96,
     '2021-03-20 00:00:00',
     3,
-    '-'
+    'table-cloth-62x120-colour'
   ),
   (
     100,
@@ -1022,7 +1022,7 @@ values
     40,
     '2021-02-20 00:00:00',
     3,
-    '-'
+    'lamb-loin-chops-100'
   ),
   (
     101,
@@ -1032,7 +1032,7 @@ values
     32,
     '2020-06-27 00:00:00',
     6,
-    '-'
+    'sherry-dry-101'
   ),
   (
     102,
@@ -1042,7 +1042,7 @@ values
     66,
     '2021-03-02 00:00:00',
     4,
-    '-'
+    'chickensplit-half'
   ),
   (
     103,
@@ -1052,7 +1052,7 @@ values
     77,
     '2020-07-12 00:00:00',
     3,
-    '-'
+    'tea-orange-pekoe-103'
   ),
   (
     104,
@@ -1062,7 +1062,7 @@ values
     62,
     '2020-09-03 00:00:00',
     3,
-    '-'
+    'sauce-caesar-dressing'
   ),
   (
     105,
@@ -1072,7 +1072,7 @@ values
     24,
     '2020-06-20 00:00:00',
     6,
-    '-'
+    'rice-brown-105'
   ),
   (
     106,
@@ -1082,7 +1082,7 @@ values
     22,
     '2020-07-30 00:00:00',
     5,
-    '-'
+    'soup-knorr-ministrone'
   ),
   (
     107,
@@ -1092,7 +1092,7 @@ values
     10,
     '2021-04-13 00:00:00',
     3,
-    '-'
+    'wine-cotes-du-rhone-parallele'
   ),
   (
     108,
@@ -1102,7 +1102,7 @@ values
     13,
     '2020-10-23 00:00:00',
     3,
-    '-'
+    'chips-potato-all-dressed-43g'
   ),
   (
     109,
@@ -1112,7 +1112,7 @@ values
     95,
     '2021-01-08 00:00:00',
     3,
-    '-'
+    'sugar-crumb-109'
   ),
   (
     110,
@@ -1122,7 +1122,7 @@ values
     7,
     '2021-04-06 00:00:00',
     4,
-    '-'
+    'ice-cream-strawberry-110'
   ),
   (
     111,
@@ -1132,7 +1132,7 @@ values
     94,
     '2021-04-14 00:00:00',
     3,
-    '-'
+    'paper-cocktail-umberlla-80-180'
   ),
   (
     112,
@@ -1142,7 +1142,7 @@ values
     59,
     '2021-02-26 00:00:00',
     6,
-    '-'
+    'salmon-canned'
   ),
   (
     113,
@@ -1152,7 +1152,7 @@ values
     80,
     '2020-08-14 00:00:00',
     5,
-    '-'
+    'seedlings-buckwheat-organic'
   ),
   (
     114,
@@ -1162,7 +1162,7 @@ values
     66,
     '2020-08-06 00:00:00',
     3,
-    '-'
+    'cheese-brie-triple-creme-114'
   ),
   (
     115,
@@ -1172,7 +1172,7 @@ values
     45,
     '2021-02-03 00:00:00',
     3,
-    '-'
+    'phyllo-dough'
   ),
   (
     116,
@@ -1182,7 +1182,7 @@ values
     59,
     '2020-12-29 00:00:00',
     4,
-    '-'
+    'pastry-banana-muffin-mini-116'
   ),
   (
     117,
@@ -1192,7 +1192,7 @@ values
     97,
     '2020-11-25 00:00:00',
     3,
-    '-'
+    'jameson-irish-whiskey-117'
   ),
   (
     118,
@@ -1202,7 +1202,7 @@ values
     3,
     '2021-04-02 00:00:00',
     3,
-    '-'
+    'praline-paste'
   ),
   (
     119,
@@ -1212,7 +1212,7 @@ values
     79,
     '2020-11-03 00:00:00',
     5,
-    '-'
+    'flour-fast-rapid'
   ),
   (
     120,
@@ -1222,7 +1222,7 @@ values
     44,
     '2020-06-22 00:00:00',
     6,
-    '-'
+    'sausage-meat'
   ),
   (
     121,
@@ -1232,7 +1232,7 @@ values
     84,
     '2021-01-11 00:00:00',
     4,
-    '-'
+    'wine-vovray-sec-domaine-huet'
   ),
   (
     122,
@@ -1242,7 +1242,7 @@ values
     96,
     '2020-09-17 00:00:00',
     4,
-    '-'
+    'ecolab-hand-soap-form-antibac-122'
   ),
   (
     123,
@@ -1252,7 +1252,7 @@ values
     55,
     '2021-04-24 00:00:00',
     4,
-    '-'
+    'melon-honey-dew'
   ),
   (
     124,
@@ -1262,7 +1262,7 @@ values
     72,
     '2020-11-11 00:00:00',
     6,
-    '-'
+    'dill-primerba-paste'
   ),
   (
     125,
@@ -1272,7 +1272,7 @@ values
     74,
     '2021-03-06 00:00:00',
     3,
-    '-'
+    'pork-ham-virginia-125'
   ),
   (
     126,
@@ -1282,7 +1282,7 @@ values
     5,
     '2021-01-20 00:00:00',
     3,
-    '-'
+    'pasta-cannelloni-sheets-fresh'
   ),
   (
     127,
@@ -1292,7 +1292,7 @@ values
     45,
     '2021-01-07 00:00:00',
     6,
-    '-'
+    'apple-macintosh'
   ),
   (
     128,
@@ -1302,7 +1302,7 @@ values
     74,
     '2021-04-19 00:00:00',
     6,
-    '-'
+    'vodka-moskovskaya'
   ),
   (
     129,
@@ -1312,7 +1312,7 @@ values
     42,
     '2021-01-30 00:00:00',
     4,
-    '-'
+    'curry-powder'
   ),
   (
     130,
@@ -1322,7 +1322,7 @@ values
     27,
     '2020-07-20 00:00:00',
     6,
-    '-'
+    'sauce-vodka-blush'
   ),
   (
     131,
@@ -1332,7 +1332,7 @@ values
     26,
     '2021-05-13 00:00:00',
     4,
-    '-'
+    'venison-ground'
   ),
   (
     132,
@@ -1342,7 +1342,7 @@ values
     79,
     '2020-09-09 00:00:00',
     6,
-    '-'
+    'doilies-8-paper-132'
   ),
   (
     133,
@@ -1352,7 +1352,7 @@ values
     15,
     '2021-01-08 00:00:00',
     6,
-    '-'
+    'vaccum-bag-14x20-133'
   ),
   (
     134,
@@ -1362,7 +1362,7 @@ values
     94,
     '2020-08-20 00:00:00',
     3,
-    '-'
+    'gherkin-134'
   ),
   (
     135,
@@ -1372,7 +1372,7 @@ values
     17,
     '2021-05-13 00:00:00',
     3,
-    '-'
+    'water-mineral-natural-135'
   ),
   (
     136,
@@ -1382,7 +1382,7 @@ values
     71,
     '2021-03-22 00:00:00',
     5,
-    '-'
+    'ecolab-solid-fusion-136'
   ),
   (
     137,
@@ -1392,7 +1392,7 @@ values
     46,
     '2020-07-03 00:00:00',
     3,
-    '-'
+    'bar-sweet-and-salty-chocolate-137'
   ),
   (
     138,
@@ -1402,7 +1402,7 @@ values
     58,
     '2020-12-29 00:00:00',
     4,
-    '-'
+    'spice-peppercorn-melange-138'
   ),
   (
     139,
@@ -1412,7 +1412,7 @@ values
     31,
     '2020-06-21 00:00:00',
     5,
-    '-'
+    'chicken-breast-wing-on'
   ),
   (
     140,
@@ -1422,7 +1422,7 @@ values
     35,
     '2021-01-13 00:00:00',
     5,
-    '-'
+    'sauce-roasted-red-pepper'
   ),
   (
     141,
@@ -1432,7 +1432,7 @@ values
     98,
     '2021-02-08 00:00:00',
     3,
-    '-'
+    'mackerel-whole-fresh'
   ),
   (
     142,
@@ -1442,7 +1442,7 @@ values
     97,
     '2020-08-11 00:00:00',
     6,
-    '-'
+    'glass-clear-8-oz'
   ),
   (
     143,
@@ -1452,7 +1452,7 @@ values
     18,
     '2021-01-03 00:00:00',
     3,
-    '-'
+    'soup-campbells-spinach-crm-143'
   ),
   (
     144,
@@ -1462,7 +1462,7 @@ values
     50,
     '2021-04-14 00:00:00',
     6,
-    '-'
+    'pork-salted-bellies'
   ),
   (
     145,
@@ -1472,7 +1472,7 @@ values
     31,
     '2020-09-08 00:00:00',
     4,
-    '-'
+    'juice-pineapple-48-oz'
   ),
   (
     146,
@@ -1482,7 +1482,7 @@ values
     65,
     '2020-11-27 00:00:00',
     6,
-    '-'
+    'cheese-comtomme'
   ),
   (
     147,
@@ -1492,7 +1492,7 @@ values
     71,
     '2020-07-14 00:00:00',
     5,
-    '-'
+    'cookie-dough-peanut-butter'
   ),
   (
     148,
@@ -1502,7 +1502,7 @@ values
     49,
     '2020-10-17 00:00:00',
     3,
-    '-'
+    'paste-black-olive'
   ),
   (
     149,
@@ -1512,7 +1512,7 @@ values
     92,
     '2020-08-21 00:00:00',
     3,
-    '-'
+    'lettuce-treviso'
   ),
   (
     150,
@@ -1522,7 +1522,7 @@ values
     10,
     '2020-09-16 00:00:00',
     3,
-    '-'
+    'tea-lemon-green-tea'
   ),
   (
     151,
@@ -1532,7 +1532,7 @@ values
     27,
     '2021-04-19 00:00:00',
     5,
-    '-'
+    'lettuce-curly-endive-151'
   ),
   (
     152,
@@ -1542,7 +1542,7 @@ values
     15,
     '2020-07-17 00:00:00',
     6,
-    '-'
+    'vinegar-balsamic'
   ),
   (
     153,
@@ -1552,7 +1552,7 @@ values
     69,
     '2021-06-07 00:00:00',
     4,
-    '-'
+    'cheese-brie-roitelet'
   ),
   (
     154,
@@ -1562,7 +1562,7 @@ values
     41,
     '2020-07-31 00:00:00',
     4,
-    '-'
+    'tomatoes-diced-canned'
   ),
   (
     155,
@@ -1572,7 +1572,7 @@ values
     56,
     '2020-09-05 00:00:00',
     3,
-    '-'
+    'muffin-mix-morning-glory'
   ),
   (
     156,
@@ -1582,7 +1582,7 @@ values
     86,
     '2020-08-18 00:00:00',
     6,
-    '-'
+    'yogurt-cherry-175-gr-156'
   ),
   (
     157,
@@ -1592,7 +1592,7 @@ values
     29,
     '2020-09-25 00:00:00',
     4,
-    '-'
+    'food-colouring-green-157'
   ),
   (
     158,
@@ -1602,7 +1602,7 @@ values
     28,
     '2021-02-06 00:00:00',
     5,
-    '-'
+    'eel-fresh'
   ),
   (
     159,
@@ -1612,7 +1612,7 @@ values
     7,
     '2020-10-02 00:00:00',
     6,
-    '-'
+    'lemonade-strawberry-591-ml'
   ),
   (
     160,
@@ -1622,7 +1622,7 @@ values
     91,
     '2021-01-25 00:00:00',
     4,
-    '-'
+    'cod-salted-boneless-160'
   ),
   (
     161,
@@ -1632,7 +1632,7 @@ values
     10,
     '2020-08-10 00:00:00',
     3,
-    '-'
+    'jam-strawberry-20-ml-jar'
   ),
   (
     162,
@@ -1642,7 +1642,7 @@ values
     85,
     '2021-05-19 00:00:00',
     6,
-    '-'
+    'veal-inside-round-top-lean'
   ),
   (
     163,
@@ -1652,7 +1652,7 @@ values
     8,
     '2021-04-23 00:00:00',
     3,
-    '-'
+    'lemonade-pineapple-passion'
   ),
   (
     164,
@@ -1662,7 +1662,7 @@ values
     51,
     '2021-06-08 00:00:00',
     5,
-    '-'
+    'peach-fresh-164'
   ),
   (
     165,
@@ -1672,7 +1672,7 @@ values
     64,
     '2021-01-18 00:00:00',
     4,
-    '-'
+    'garlic'
   ),
   (
     166,
@@ -1682,7 +1682,7 @@ values
     100,
     '2020-09-27 00:00:00',
     6,
-    '-'
+    'artichoke-fresh'
   ),
   (
     167,
@@ -1692,7 +1692,7 @@ values
     64,
     '2021-03-02 00:00:00',
     3,
-    '-'
+    'sauce-thousand-island-167'
   ),
   (
     168,
@@ -1702,7 +1702,7 @@ values
     45,
     '2020-11-28 00:00:00',
     4,
-    '-'
+    'sparkling-wine-rose-freixenet-168'
   ),
   (
     169,
@@ -1712,7 +1712,7 @@ values
     95,
     '2020-11-09 00:00:00',
     3,
-    '-'
+    'cheese-cheddar-medium-169'
   ),
   (
     170,
@@ -1722,7 +1722,7 @@ values
     39,
     '2020-06-17 00:00:00',
     4,
-    '-'
+    'yeast-dry-fleischman-170'
   ),
   (
     171,
@@ -1732,7 +1732,7 @@ values
     9,
     '2021-03-07 00:00:00',
     4,
-    '-'
+    'chips-potato-jalapeno'
   ),
   (
     172,
@@ -1742,7 +1742,7 @@ values
     87,
     '2021-02-25 00:00:00',
     4,
-    '-'
+    'shallots'
   ),
   (
     173,
@@ -1752,7 +1752,7 @@ values
     52,
     '2020-07-20 00:00:00',
     3,
-    '-'
+    'coke-diet-355-ml'
   ),
   (
     174,
@@ -1762,7 +1762,7 @@ values
     78,
     '2021-05-24 00:00:00',
     5,
-    '-'
+    'pernod'
   ),
   (
     175,
@@ -1772,7 +1772,7 @@ values
     3,
     '2021-05-06 00:00:00',
     6,
-    '-'
+    'pate-cognac'
   ),
   (
     176,
@@ -1782,7 +1782,7 @@ values
     34,
     '2020-08-03 00:00:00',
     5,
-    '-'
+    'wine-penfolds-koonuga-hill-176'
   ),
   (
     177,
@@ -1792,7 +1792,7 @@ values
     4,
     '2020-07-23 00:00:00',
     3,
-    '-'
+    'shrimp-tiger-2125-177'
   ),
   (
     178,
@@ -1802,7 +1802,7 @@ values
     94,
     '2021-04-14 00:00:00',
     4,
-    '-'
+    'watercress'
   ),
   (
     179,
@@ -1812,7 +1812,7 @@ values
     20,
     '2021-05-25 00:00:00',
     6,
-    '-'
+    'flour-chickpea'
   ),
   (
     180,
@@ -1822,7 +1822,7 @@ values
     92,
     '2021-03-14 00:00:00',
     4,
-    '-'
+    'tea-leaves-oolong'
   ),
   (
     181,
@@ -1832,7 +1832,7 @@ values
     69,
     '2020-12-29 00:00:00',
     3,
-    '-'
+    'wine-hardys-bankside-shiraz-181'
   ),
   (
     182,
@@ -1842,7 +1842,7 @@ values
     65,
     '2021-04-24 00:00:00',
     5,
-    '-'
+    'magnotta-bel-paese-white'
   ),
   (
     183,
@@ -1852,7 +1852,7 @@ values
     68,
     '2021-02-25 00:00:00',
     5,
-    '-'
+    'beef-montreal-smoked-brisket-183'
   ),
   (
     184,
@@ -1862,7 +1862,7 @@ values
     9,
     '2021-05-09 00:00:00',
     4,
-    '-'
+    'doilies-7-paper'
   ),
   (
     185,
@@ -1872,7 +1872,7 @@ values
     88,
     '2021-02-20 00:00:00',
     6,
-    '-'
+    'venison-striploin'
   ),
   (
     186,
@@ -1882,7 +1882,7 @@ values
     67,
     '2021-02-06 00:00:00',
     6,
-    '-'
+    'turnip-mini-186'
   ),
   (
     187,
@@ -1892,7 +1892,7 @@ values
     76,
     '2021-01-01 00:00:00',
     3,
-    '-'
+    'peach-halves'
   ),
   (
     188,
@@ -1902,7 +1902,7 @@ values
     1,
     '2020-11-12 00:00:00',
     3,
-    '-'
+    'glaze-clear'
   ),
   (
     189,
@@ -1912,7 +1912,7 @@ values
     24,
     '2020-11-01 00:00:00',
     5,
-    '-'
+    'wine-red-concha-y-toro'
   ),
   (
     190,
@@ -1922,7 +1922,7 @@ values
     6,
     '2021-02-17 00:00:00',
     4,
-    '-'
+    'wine-ej-gallo-sonoma'
   ),
   (
     191,
@@ -1932,7 +1932,7 @@ values
     18,
     '2020-12-12 00:00:00',
     3,
-    '-'
+    'pickles-gherkins'
   ),
   (
     192,
@@ -1942,7 +1942,7 @@ values
     72,
     '2020-10-04 00:00:00',
     6,
-    '-'
+    'butter-sweet'
   ),
   (
     193,
@@ -1952,7 +1952,7 @@ values
     51,
     '2021-05-31 00:00:00',
     3,
-    '-'
+    'onions-red-pearl-193'
   ),
   (
     194,
@@ -1962,7 +1962,7 @@ values
     51,
     '2020-11-29 00:00:00',
     5,
-    '-'
+    'seedlings-mix-organic'
   ),
   (
     195,
@@ -1972,7 +1972,7 @@ values
     43,
     '2020-07-18 00:00:00',
     3,
-    '-'
+    'bread-calabrese-baguette-195'
   ),
   (
     196,
@@ -1982,7 +1982,7 @@ values
     2,
     '2020-08-07 00:00:00',
     5,
-    '-'
+    'lamb-loin-chops-196'
   ),
   (
     197,
@@ -1992,7 +1992,7 @@ values
     93,
     '2021-06-07 00:00:00',
     5,
-    '-'
+    'peas-snow'
   ),
   (
     198,
@@ -2002,7 +2002,7 @@ values
     11,
     '2021-06-06 00:00:00',
     5,
-    '-'
+    'blueberries'
   ),
   (
     199,
@@ -2012,7 +2012,7 @@ values
     79,
     '2021-04-17 00:00:00',
     4,
-    '-'
+    'cookie-dough-variety'
   ),
   (
     200,
@@ -2022,7 +2022,7 @@ values
     86,
     '2021-02-14 00:00:00',
     5,
-    '-'
+    'extract-almond'
   ),
   (
     201,
@@ -2032,7 +2032,7 @@ values
     98,
     '2021-03-05 00:00:00',
     4,
-    '-'
+    'pastry-banana-muffin-mini-201'
   ),
   (
     202,
@@ -2042,7 +2042,7 @@ values
     20,
     '2021-01-31 00:00:00',
     5,
-    '-'
+    'food-colouring-orange'
   ),
   (
     203,
@@ -2052,7 +2052,7 @@ values
     77,
     '2020-08-02 00:00:00',
     4,
-    '-'
+    'split-peas-green-dry'
   ),
   (
     204,
@@ -2062,7 +2062,7 @@ values
     71,
     '2020-08-27 00:00:00',
     3,
-    '-'
+    'lid-coffee-cup-8oz-blk-204'
   ),
   (
     205,
@@ -2072,7 +2072,7 @@ values
     38,
     '2021-01-20 00:00:00',
     3,
-    '-'
+    'truffle-cups-green'
   ),
   (
     206,
@@ -2082,7 +2082,7 @@ values
     87,
     '2020-11-21 00:00:00',
     3,
-    '-'
+    'cheese-sheep-milk'
   ),
   (
     207,
@@ -2092,7 +2092,7 @@ values
     78,
     '2021-06-09 00:00:00',
     6,
-    '-'
+    'oil-shortening-all-purpose-207'
   ),
   (
     208,
@@ -2102,7 +2102,7 @@ values
     77,
     '2020-11-08 00:00:00',
     5,
-    '-'
+    'pepper-chillies-crushed'
   ),
   (
     209,
@@ -2112,7 +2112,7 @@ values
     9,
     '2021-05-06 00:00:00',
     5,
-    '-'
+    'chicken-whole-roasting-209'
   ),
   (
     210,
@@ -2122,7 +2122,7 @@ values
     6,
     '2021-04-09 00:00:00',
     6,
-    '-'
+    'wiberg-cure'
   ),
   (
     211,
@@ -2132,7 +2132,7 @@ values
     95,
     '2020-09-06 00:00:00',
     6,
-    '-'
+    'cleaner-lime-away-211'
   ),
   (
     212,
@@ -2142,7 +2142,7 @@ values
     80,
     '2020-09-11 00:00:00',
     4,
-    '-'
+    'puree-kiwi'
   ),
   (
     213,
@@ -2152,7 +2152,7 @@ values
     23,
     '2020-07-19 00:00:00',
     3,
-    '-'
+    'pineapple-canned-rings-213'
   ),
   (
     214,
@@ -2162,7 +2162,7 @@ values
     10,
     '2021-03-31 00:00:00',
     3,
-    '-'
+    'turkey-oven-roast-breast'
   ),
   (
     215,
@@ -2172,7 +2172,7 @@ values
     54,
     '2020-09-25 00:00:00',
     4,
-    '-'
+    'hand-towel'
   ),
   (
     216,
@@ -2182,7 +2182,7 @@ values
     25,
     '2020-10-31 00:00:00',
     3,
-    '-'
+    'pork-sausage-medium-216'
   ),
   (
     217,
@@ -2192,7 +2192,7 @@ values
     52,
     '2020-12-31 00:00:00',
     3,
-    '-'
+    'cheese-cloth-no-100'
   ),
   (
     218,
@@ -2202,7 +2202,7 @@ values
     34,
     '2021-04-07 00:00:00',
     6,
-    '-'
+    'sobe-tropical-energy'
   ),
   (
     219,
@@ -2212,7 +2212,7 @@ values
     41,
     '2020-10-28 00:00:00',
     5,
-    '-'
+    'beef-rib-roast-capless-219'
   ),
   (
     220,
@@ -2222,7 +2222,7 @@ values
     30,
     '2020-09-23 00:00:00',
     6,
-    '-'
+    'beans-turtle-black-dry'
   ),
   (
     221,
@@ -2232,7 +2232,7 @@ values
     33,
     '2021-03-08 00:00:00',
     4,
-    '-'
+    'cookie-oatmeal'
   ),
   (
     222,
@@ -2242,7 +2242,7 @@ values
     46,
     '2020-11-13 00:00:00',
     5,
-    '-'
+    'lettuce-escarole'
   ),
   (
     223,
@@ -2252,7 +2252,7 @@ values
     30,
     '2021-04-14 00:00:00',
     3,
-    '-'
+    'bread-bistro-white'
   ),
   (
     224,
@@ -2262,7 +2262,7 @@ values
     46,
     '2021-05-24 00:00:00',
     6,
-    '-'
+    'english-muffin'
   ),
   (
     225,
@@ -2272,7 +2272,7 @@ values
     54,
     '2021-03-19 00:00:00',
     3,
-    '-'
+    'table-cloth-54x54-white'
   ),
   (
     226,
@@ -2282,7 +2282,7 @@ values
     26,
     '2021-05-15 00:00:00',
     3,
-    '-'
+    'melon-watermelon-seedless'
   ),
   (
     227,
@@ -2292,7 +2292,7 @@ values
     40,
     '2020-10-26 00:00:00',
     3,
-    '-'
+    'dill-weed-dry-227'
   ),
   (
     228,
@@ -2302,7 +2302,7 @@ values
     45,
     '2021-02-14 00:00:00',
     5,
-    '-'
+    'pepper-squash'
   ),
   (
     229,
@@ -2312,7 +2312,7 @@ values
     95,
     '2021-04-06 00:00:00',
     5,
-    '-'
+    'flavouring-orange'
   ),
   (
     230,
@@ -2322,7 +2322,7 @@ values
     49,
     '2021-05-13 00:00:00',
     5,
-    '-'
+    'spice-peppercorn-melange-230'
   ),
   (
     231,
@@ -2332,7 +2332,7 @@ values
     67,
     '2021-01-14 00:00:00',
     4,
-    '-'
+    'sprouts-onion-231'
   ),
   (
     232,
@@ -2342,7 +2342,7 @@ values
     50,
     '2020-11-21 00:00:00',
     4,
-    '-'
+    'wine-magnotta-cab-franc-232'
   ),
   (
     233,
@@ -2352,7 +2352,7 @@ values
     97,
     '2021-04-02 00:00:00',
     6,
-    '-'
+    'cup-6oz-foam-233'
   ),
   (
     234,
@@ -2362,7 +2362,7 @@ values
     54,
     '2021-02-01 00:00:00',
     3,
-    '-'
+    'cake-dulce-de-leche'
   ),
   (
     235,
@@ -2372,7 +2372,7 @@ values
     74,
     '2020-11-28 00:00:00',
     3,
-    '-'
+    'greens-mustard'
   ),
   (
     236,
@@ -2382,7 +2382,7 @@ values
     13,
     '2020-10-22 00:00:00',
     6,
-    '-'
+    'kiwano'
   ),
   (
     237,
@@ -2392,7 +2392,7 @@ values
     22,
     '2020-12-24 00:00:00',
     6,
-    '-'
+    'carbonated-water-wildberry'
   ),
   (
     238,
@@ -2402,7 +2402,7 @@ values
     98,
     '2020-08-11 00:00:00',
     3,
-    '-'
+    'cheese-st-paulin'
   ),
   (
     239,
@@ -2412,7 +2412,7 @@ values
     48,
     '2020-07-13 00:00:00',
     5,
-    '-'
+    'wine-jaboulet-cotes-du-rhone-239'
   ),
   (
     240,
@@ -2422,7 +2422,7 @@ values
     94,
     '2021-03-30 00:00:00',
     4,
-    '-'
+    'pie-box-cello-window-25-240'
   ),
   (
     241,
@@ -2432,7 +2432,7 @@ values
     96,
     '2020-09-08 00:00:00',
     4,
-    '-'
+    'brandy-bar'
   ),
   (
     242,
@@ -2442,7 +2442,7 @@ values
     69,
     '2020-11-07 00:00:00',
     3,
-    '-'
+    'veal-slab-bacon'
   ),
   (
     243,
@@ -2452,7 +2452,7 @@ values
     73,
     '2021-05-16 00:00:00',
     4,
-    '-'
+    'duck-whole'
   ),
   (
     244,
@@ -2462,7 +2462,7 @@ values
     92,
     '2020-08-28 00:00:00',
     4,
-    '-'
+    'bagelers-244'
   ),
   (
     245,
@@ -2472,7 +2472,7 @@ values
     71,
     '2021-04-19 00:00:00',
     6,
-    '-'
+    'pepper-pablano'
   ),
   (
     246,
@@ -2482,7 +2482,7 @@ values
     65,
     '2021-02-08 00:00:00',
     4,
-    '-'
+    'mustard-seed-246'
   ),
   (
     247,
@@ -2492,7 +2492,7 @@ values
     97,
     '2020-11-12 00:00:00',
     3,
-    '-'
+    'strawberries'
   ),
   (
     248,
@@ -2502,7 +2502,7 @@ values
     78,
     '2021-02-11 00:00:00',
     6,
-    '-'
+    'cup-translucent-7-oz-clear'
   ),
   (
     249,
@@ -2512,7 +2512,7 @@ values
     54,
     '2021-02-17 00:00:00',
     4,
-    '-'
+    'jameson-irish-whiskey-249'
   ),
   (
     250,
@@ -2522,7 +2522,7 @@ values
     7,
     '2020-10-22 00:00:00',
     3,
-    '-'
+    'beef-eye-of-round'
   ),
   (
     251,
@@ -2532,7 +2532,7 @@ values
     5,
     '2021-04-01 00:00:00',
     6,
-    '-'
+    'the-pop-shoppe-grape'
   ),
   (
     252,
@@ -2542,7 +2542,7 @@ values
     85,
     '2020-06-10 00:00:00',
     3,
-    '-'
+    'cheese-cheddar-medium-252'
   ),
   (
     253,
@@ -2552,7 +2552,7 @@ values
     0,
     '2021-02-08 00:00:00',
     3,
-    '-'
+    'tomatoes-tear-drop-yellow'
   ),
   (
     254,
@@ -2562,7 +2562,7 @@ values
     87,
     '2021-01-22 00:00:00',
     6,
-    '-'
+    'extract-vanilla-pure'
   ),
   (
     255,
@@ -2572,7 +2572,7 @@ values
     93,
     '2020-12-29 00:00:00',
     3,
-    '-'
+    'ham-smoked-bone-in'
   ),
   (
     256,
@@ -2582,7 +2582,7 @@ values
     44,
     '2020-10-09 00:00:00',
     3,
-    '-'
+    'burger-veggie'
   ),
   (
     257,
@@ -2592,7 +2592,7 @@ values
     84,
     '2021-01-14 00:00:00',
     5,
-    '-'
+    'appetizer-sausage-rolls-257'
   ),
   (
     258,
@@ -2602,7 +2602,7 @@ values
     2,
     '2021-02-17 00:00:00',
     4,
-    '-'
+    'wine-magnotta-pinot-gris-sr'
   ),
   (
     259,
@@ -2612,7 +2612,7 @@ values
     15,
     '2021-04-09 00:00:00',
     6,
-    '-'
+    'melon-watermelon-yellow'
   ),
   (
     260,
@@ -2622,7 +2622,7 @@ values
     88,
     '2021-05-25 00:00:00',
     4,
-    '-'
+    'cheese-brie-triple-creme-260'
   ),
   (
     261,
@@ -2632,7 +2632,7 @@ values
     48,
     '2020-07-07 00:00:00',
     4,
-    '-'
+    'table-cloth-54x72-white'
   ),
   (
     262,
@@ -2642,7 +2642,7 @@ values
     99,
     '2020-07-16 00:00:00',
     5,
-    '-'
+    'chocolate-bar-oh-henry'
   ),
   (
     263,
@@ -2652,7 +2652,7 @@ values
     27,
     '2021-01-20 00:00:00',
     5,
-    '-'
+    'cheese-camembert'
   ),
   (
     264,
@@ -2662,7 +2662,7 @@ values
     100,
     '2021-05-13 00:00:00',
     3,
-    '-'
+    'soup-campbells-spinach-crm-264'
   ),
   (
     265,
@@ -2672,7 +2672,7 @@ values
     86,
     '2021-03-03 00:00:00',
     5,
-    '-'
+    'tea-herbal-orange-spice-265'
   ),
   (
     266,
@@ -2682,7 +2682,7 @@ values
     5,
     '2021-05-21 00:00:00',
     4,
-    '-'
+    'berry-brulee'
   ),
   (
     267,
@@ -2692,7 +2692,7 @@ values
     26,
     '2020-12-21 00:00:00',
     5,
-    '-'
+    'bar-sweet-and-salty-chocolate-267'
   ),
   (
     268,
@@ -2702,7 +2702,7 @@ values
     86,
     '2021-04-16 00:00:00',
     4,
-    '-'
+    'gherkin-268'
   ),
   (
     269,
@@ -2712,7 +2712,7 @@ values
     59,
     '2020-08-07 00:00:00',
     5,
-    '-'
+    'lady-fingers'
   ),
   (
     270,
@@ -2722,7 +2722,7 @@ values
     56,
     '2020-12-07 00:00:00',
     5,
-    '-'
+    'beer-upper-canada-light-270'
   ),
   (
     271,
@@ -2732,7 +2732,7 @@ values
     84,
     '2021-05-01 00:00:00',
     4,
-    '-'
+    'cocoa-powder-dutched'
   ),
   (
     272,
@@ -2742,7 +2742,7 @@ values
     81,
     '2020-11-29 00:00:00',
     5,
-    '-'
+    'spice-montreal-steak-spice-272'
   ),
   (
     273,
@@ -2752,7 +2752,7 @@ values
     92,
     '2021-03-29 00:00:00',
     4,
-    '-'
+    'jicama'
   ),
   (
     274,
@@ -2762,7 +2762,7 @@ values
     80,
     '2020-10-10 00:00:00',
     6,
-    '-'
+    'bar-mix-lime'
   ),
   (
     275,
@@ -2772,7 +2772,7 @@ values
     50,
     '2021-05-23 00:00:00',
     5,
-    '-'
+    'macaroons-two-bite-choc-275'
   ),
   (
     276,
@@ -2782,7 +2782,7 @@ values
     93,
     '2021-05-15 00:00:00',
     6,
-    '-'
+    'bandage-fexible-1x3'
   ),
   (
     277,
@@ -2792,7 +2792,7 @@ values
     70,
     '2020-12-29 00:00:00',
     6,
-    '-'
+    'v8-tropical-blend'
   ),
   (
     278,
@@ -2802,7 +2802,7 @@ values
     16,
     '2020-08-03 00:00:00',
     4,
-    '-'
+    'yoplait-drink-278'
   ),
   (
     279,
@@ -2812,7 +2812,7 @@ values
     87,
     '2020-06-28 00:00:00',
     5,
-    '-'
+    'sugar-invert-279'
   ),
   (
     280,
@@ -2822,7 +2822,7 @@ values
     24,
     '2021-05-08 00:00:00',
     4,
-    '-'
+    'doilies-10-paper'
   ),
   (
     281,
@@ -2832,7 +2832,7 @@ values
     34,
     '2020-08-29 00:00:00',
     3,
-    '-'
+    'shrimp-dried-small-lb'
   ),
   (
     282,
@@ -2842,7 +2842,7 @@ values
     63,
     '2021-05-17 00:00:00',
     5,
-    '-'
+    'vinegar-tarragon-282'
   ),
   (
     283,
@@ -2852,7 +2852,7 @@ values
     81,
     '2021-01-31 00:00:00',
     3,
-    '-'
+    'cheese-la-sauvagine-283'
   ),
   (
     284,
@@ -2862,7 +2862,7 @@ values
     67,
     '2020-10-19 00:00:00',
     4,
-    '-'
+    'yucca-284'
   ),
   (
     285,
@@ -2872,7 +2872,7 @@ values
     25,
     '2020-11-03 00:00:00',
     4,
-    '-'
+    'beef-shank-285'
   ),
   (
     286,
@@ -2882,7 +2882,7 @@ values
     13,
     '2020-12-24 00:00:00',
     5,
-    '-'
+    'potatoes-mini-white-3-oz'
   ),
   (
     287,
@@ -2892,7 +2892,7 @@ values
     38,
     '2021-01-11 00:00:00',
     5,
-    '-'
+    'cup-6oz-foam-287'
   ),
   (
     288,
@@ -2902,7 +2902,7 @@ values
     71,
     '2021-04-05 00:00:00',
     4,
-    '-'
+    'allspice-jamaican'
   ),
   (
     289,
@@ -2912,7 +2912,7 @@ values
     8,
     '2021-02-24 00:00:00',
     5,
-    '-'
+    'spice-peppercorn-melange-289'
   ),
   (
     290,
@@ -2922,7 +2922,7 @@ values
     68,
     '2020-12-13 00:00:00',
     6,
-    '-'
+    'ham-black-forest-290'
   ),
   (
     291,
@@ -2932,7 +2932,7 @@ values
     95,
     '2020-08-11 00:00:00',
     5,
-    '-'
+    'chocolate-chips-compound-291'
   ),
   (
     292,
@@ -2942,7 +2942,7 @@ values
     91,
     '2021-05-30 00:00:00',
     3,
-    '-'
+    'lamb-shanks-292'
   ),
   (
     293,
@@ -2952,7 +2952,7 @@ values
     82,
     '2021-01-20 00:00:00',
     6,
-    '-'
+    'wine-chianti-classico-riserva'
   ),
   (
     294,
@@ -2962,7 +2962,7 @@ values
     48,
     '2020-08-15 00:00:00',
     3,
-    '-'
+    'coffee-colombian-portioned-294'
   ),
   (
     295,
@@ -2972,7 +2972,7 @@ values
     16,
     '2020-06-12 00:00:00',
     6,
-    '-'
+    'pasta-fettuccine-egg-fresh'
   ),
   (
     296,
@@ -2982,7 +2982,7 @@ values
     28,
     '2020-12-03 00:00:00',
     3,
-    '-'
+    'tequila-rose-cream-liquor'
   ),
   (
     297,
@@ -2992,7 +2992,7 @@ values
     80,
     '2021-02-24 00:00:00',
     5,
-    '-'
+    'eggwhite-frozen'
   ),
   (
     298,
@@ -3002,7 +3002,7 @@ values
     86,
     '2021-03-26 00:00:00',
     4,
-    '-'
+    'pate-liver'
   ),
   (
     299,
@@ -3012,7 +3012,7 @@ values
     80,
     '2020-10-30 00:00:00',
     5,
-    '-'
+    'thyme-fresh'
   ),
   (
     300,
@@ -3022,7 +3022,7 @@ values
     75,
     '2020-11-13 00:00:00',
     6,
-    '-'
+    'ice-cream-strawberry-300'
   ),
   (
     301,
@@ -3032,7 +3032,7 @@ values
     95,
     '2020-07-30 00:00:00',
     4,
-    '-'
+    'steampan-lid-for-half-size'
   ),
   (
     302,
@@ -3042,7 +3042,7 @@ values
     100,
     '2020-08-02 00:00:00',
     3,
-    '-'
+    'oats-large-flake-302'
   ),
   (
     303,
@@ -3052,7 +3052,7 @@ values
     42,
     '2020-08-22 00:00:00',
     5,
-    '-'
+    'mcguinness-blue-curacao-303'
   ),
   (
     304,
@@ -3062,7 +3062,7 @@ values
     24,
     '2020-12-09 00:00:00',
     5,
-    '-'
+    'sauce-salsa-304'
   ),
   (
     305,
@@ -3072,7 +3072,7 @@ values
     20,
     '2021-04-12 00:00:00',
     5,
-    '-'
+    'frangelico-305'
   ),
   (
     306,
@@ -3082,7 +3082,7 @@ values
     65,
     '2020-07-17 00:00:00',
     4,
-    '-'
+    'wine-blue-nun-qualitatswein'
   ),
   (
     307,
@@ -3092,7 +3092,7 @@ values
     5,
     '2020-11-04 00:00:00',
     5,
-    '-'
+    'bread-calabrese-baguette-307'
   ),
   (
     308,
@@ -3102,7 +3102,7 @@ values
     81,
     '2021-05-08 00:00:00',
     4,
-    '-'
+    'soup-campbells-308'
   ),
   (
     309,
@@ -3112,7 +3112,7 @@ values
     80,
     '2021-04-30 00:00:00',
     4,
-    '-'
+    'doilies-8-paper-309'
   ),
   (
     310,
@@ -3122,7 +3122,7 @@ values
     87,
     '2020-12-12 00:00:00',
     5,
-    '-'
+    'taro-leaves-310'
   ),
   (
     311,
@@ -3132,7 +3132,7 @@ values
     70,
     '2020-07-25 00:00:00',
     6,
-    '-'
+    'tumeric'
   ),
   (
     312,
@@ -3142,7 +3142,7 @@ values
     80,
     '2021-03-02 00:00:00',
     5,
-    '-'
+    'coconut-creamed-pure'
   ),
   (
     313,
@@ -3152,7 +3152,7 @@ values
     61,
     '2021-02-12 00:00:00',
     3,
-    '-'
+    'bread-olive-dinner-roll'
   ),
   (
     314,
@@ -3162,7 +3162,7 @@ values
     14,
     '2020-12-04 00:00:00',
     3,
-    '-'
+    'wine-fat-bastard-merlot'
   ),
   (
     315,
@@ -3172,7 +3172,7 @@ values
     10,
     '2020-08-02 00:00:00',
     3,
-    '-'
+    'beef-tenderloin'
   ),
   (
     316,
@@ -3182,7 +3182,7 @@ values
     48,
     '2021-05-03 00:00:00',
     6,
-    '-'
+    'bread-white-epi-baguette'
   ),
   (
     317,
@@ -3192,7 +3192,7 @@ values
     67,
     '2020-10-20 00:00:00',
     3,
-    '-'
+    'soup-campbells-creamy-317'
   ),
   (
     318,
@@ -3202,7 +3202,7 @@ values
     88,
     '2021-02-18 00:00:00',
     3,
-    '-'
+    'dasheen'
   ),
   (
     319,
@@ -3212,7 +3212,7 @@ values
     11,
     '2021-01-30 00:00:00',
     6,
-    '-'
+    'towel-roll-white'
   ),
   (
     320,
@@ -3222,7 +3222,7 @@ values
     7,
     '2021-02-12 00:00:00',
     3,
-    '-'
+    'juice-orange-189l-320'
   ),
   (
     321,
@@ -3232,7 +3232,7 @@ values
     35,
     '2020-09-13 00:00:00',
     5,
-    '-'
+    'vermouth-white-cinzano'
   ),
   (
     322,
@@ -3242,7 +3242,7 @@ values
     38,
     '2020-08-24 00:00:00',
     5,
-    '-'
+    'bread-french-baquette'
   ),
   (
     323,
@@ -3252,7 +3252,7 @@ values
     6,
     '2021-02-07 00:00:00',
     4,
-    '-'
+    'chinese-foods-plain-fried-rice'
   ),
   (
     324,
@@ -3262,7 +3262,7 @@ values
     62,
     '2021-03-31 00:00:00',
     6,
-    '-'
+    'sausage-chorizo'
   ),
   (
     325,
@@ -3272,7 +3272,7 @@ values
     55,
     '2021-03-12 00:00:00',
     3,
-    '-'
+    'lotus-root'
   ),
   (
     326,
@@ -3282,7 +3282,7 @@ values
     98,
     '2021-03-17 00:00:00',
     5,
-    '-'
+    'ecolab-solid-fusion-326'
   ),
   (
     327,
@@ -3292,7 +3292,7 @@ values
     100,
     '2020-08-15 00:00:00',
     6,
-    '-'
+    'chicken-thigh-bone-in'
   ),
   (
     328,
@@ -3302,7 +3302,7 @@ values
     96,
     '2020-09-12 00:00:00',
     4,
-    '-'
+    'pepper-red-chili'
   ),
   (
     329,
@@ -3312,7 +3312,7 @@ values
     89,
     '2020-10-20 00:00:00',
     6,
-    '-'
+    'soup-beef-base-mix-329'
   ),
   (
     330,
@@ -3322,7 +3322,7 @@ values
     43,
     '2021-05-16 00:00:00',
     6,
-    '-'
+    'wine-magnotta-cab-franc-330'
   ),
   (
     331,
@@ -3332,7 +3332,7 @@ values
     95,
     '2020-07-08 00:00:00',
     6,
-    '-'
+    'red-currant-jelly'
   ),
   (
     332,
@@ -3342,7 +3342,7 @@ values
     54,
     '2021-02-20 00:00:00',
     3,
-    '-'
+    'soup-knorr-country-bean'
   ),
   (
     333,
@@ -3352,7 +3352,7 @@ values
     73,
     '2021-01-27 00:00:00',
     4,
-    '-'
+    'cafe-royale'
   ),
   (
     334,
@@ -3362,7 +3362,7 @@ values
     75,
     '2021-05-24 00:00:00',
     5,
-    '-'
+    'napkin-white'
   ),
   (
     335,
@@ -3372,7 +3372,7 @@ values
     19,
     '2021-02-04 00:00:00',
     3,
-    '-'
+    'cheese-provolone'
   ),
   (
     336,
@@ -3382,7 +3382,7 @@ values
     46,
     '2020-06-10 00:00:00',
     6,
-    '-'
+    'vermacelli-sprinkles-assorted'
   ),
   (
     337,
@@ -3392,7 +3392,7 @@ values
     29,
     '2020-10-29 00:00:00',
     5,
-    '-'
+    'creme-de-cacao-white'
   ),
   (
     338,
@@ -3402,7 +3402,7 @@ values
     29,
     '2021-05-23 00:00:00',
     4,
-    '-'
+    'mushroom-lg-cello'
   ),
   (
     339,
@@ -3412,7 +3412,7 @@ values
     97,
     '2020-06-23 00:00:00',
     6,
-    '-'
+    'assorted-desserts'
   ),
   (
     340,
@@ -3422,7 +3422,7 @@ values
     73,
     '2021-02-17 00:00:00',
     4,
-    '-'
+    'pork-suckling-pig'
   ),
   (
     341,
@@ -3432,7 +3432,7 @@ values
     72,
     '2020-10-04 00:00:00',
     4,
-    '-'
+    'wine-hardys-bankside-shiraz-341'
   ),
   (
     342,
@@ -3442,7 +3442,7 @@ values
     44,
     '2020-08-26 00:00:00',
     3,
-    '-'
+    'tart-shells-savory-3'
   ),
   (
     343,
@@ -3452,7 +3452,7 @@ values
     44,
     '2021-03-11 00:00:00',
     4,
-    '-'
+    'cheese-gouda'
   ),
   (
     344,
@@ -3462,7 +3462,7 @@ values
     9,
     '2020-11-28 00:00:00',
     4,
-    '-'
+    'beef-tenderloin-aa'
   ),
   (
     345,
@@ -3472,7 +3472,7 @@ values
     79,
     '2021-03-01 00:00:00',
     6,
-    '-'
+    'pork-ham-virginia-345'
   ),
   (
     346,
@@ -3482,7 +3482,7 @@ values
     32,
     '2021-01-29 00:00:00',
     6,
-    '-'
+    'lid-tray-16in-dome'
   ),
   (
     347,
@@ -3492,7 +3492,7 @@ values
     84,
     '2020-06-14 00:00:00',
     5,
-    '-'
+    'beer-corona'
   ),
   (
     348,
@@ -3502,7 +3502,7 @@ values
     64,
     '2020-09-23 00:00:00',
     3,
-    '-'
+    'milkettes-2-348'
   ),
   (
     349,
@@ -3512,7 +3512,7 @@ values
     59,
     '2021-05-12 00:00:00',
     4,
-    '-'
+    'five-alive-citrus'
   ),
   (
     350,
@@ -3522,7 +3522,7 @@ values
     19,
     '2020-08-27 00:00:00',
     5,
-    '-'
+    'pasta-canelloni-single-serve'
   ),
   (
     351,
@@ -3532,7 +3532,7 @@ values
     56,
     '2021-05-11 00:00:00',
     5,
-    '-'
+    'juice-cranberry-284ml'
   ),
   (
     352,
@@ -3542,7 +3542,7 @@ values
     71,
     '2021-05-18 00:00:00',
     3,
-    '-'
+    'wine-vineland-estate-semi-dry'
   ),
   (
     353,
@@ -3552,7 +3552,7 @@ values
     56,
     '2020-09-25 00:00:00',
     5,
-    '-'
+    'syrup-monin-passion-fruit-353'
   ),
   (
     354,
@@ -3562,7 +3562,7 @@ values
     80,
     '2021-04-09 00:00:00',
     4,
-    '-'
+    'marsala-sperone-fine-doc-354'
   ),
   (
     355,
@@ -3572,7 +3572,7 @@ values
     33,
     '2020-07-20 00:00:00',
     6,
-    '-'
+    'bowl-12-oz-showcase-92012-355'
   ),
   (
     356,
@@ -3582,7 +3582,7 @@ values
     12,
     '2020-07-28 00:00:00',
     5,
-    '-'
+    'cod-salted-boneless-356'
   ),
   (
     357,
@@ -3592,7 +3592,7 @@ values
     41,
     '2020-10-11 00:00:00',
     5,
-    '-'
+    'lemonade-kiwi-591-ml'
   ),
   (
     358,
@@ -3602,7 +3602,7 @@ values
     32,
     '2020-08-19 00:00:00',
     4,
-    '-'
+    'yeast-dry-fleischman-358'
   ),
   (
     359,
@@ -3612,7 +3612,7 @@ values
     95,
     '2021-05-13 00:00:00',
     4,
-    '-'
+    'beef-striploin'
   ),
   (
     360,
@@ -3622,7 +3622,7 @@ values
     84,
     '2020-08-05 00:00:00',
     5,
-    '-'
+    'plate-pie-foil'
   ),
   (
     361,
@@ -3632,7 +3632,7 @@ values
     89,
     '2020-11-30 00:00:00',
     4,
-    '-'
+    'madeira'
   ),
   (
     362,
@@ -3642,7 +3642,7 @@ values
     93,
     '2020-11-20 00:00:00',
     4,
-    '-'
+    'broccoli-fresh'
   ),
   (
     363,
@@ -3652,7 +3652,7 @@ values
     92,
     '2020-08-10 00:00:00',
     4,
-    '-'
+    'wine-rubyport'
   ),
   (
     364,
@@ -3662,7 +3662,7 @@ values
     28,
     '2021-06-03 00:00:00',
     6,
-    '-'
+    'bread-base-italian'
   ),
   (
     365,
@@ -3672,7 +3672,7 @@ values
     68,
     '2021-04-02 00:00:00',
     5,
-    '-'
+    'flour-corn-fine'
   ),
   (
     366,
@@ -3682,7 +3682,7 @@ values
     76,
     '2020-10-24 00:00:00',
     3,
-    '-'
+    'bread-cranberry-foccacia'
   ),
   (
     367,
@@ -3692,7 +3692,7 @@ values
     31,
     '2021-03-17 00:00:00',
     4,
-    '-'
+    'lettuce-boston-bib-organic'
   ),
   (
     368,
@@ -3702,7 +3702,7 @@ values
     36,
     '2020-09-08 00:00:00',
     5,
-    '-'
+    'beef-tenderlion-center-cut'
   ),
   (
     369,
@@ -3712,7 +3712,7 @@ values
     17,
     '2020-12-27 00:00:00',
     5,
-    '-'
+    'squeeze-bottle'
   ),
   (
     370,
@@ -3722,7 +3722,7 @@ values
     65,
     '2020-07-21 00:00:00',
     6,
-    '-'
+    'muffin-zero-transfat'
   ),
   (
     371,
@@ -3732,7 +3732,7 @@ values
     61,
     '2020-12-06 00:00:00',
     5,
-    '-'
+    'worcestershire-sauce'
   ),
   (
     372,
@@ -3742,7 +3742,7 @@ values
     21,
     '2021-02-18 00:00:00',
     3,
-    '-'
+    'lid-coffee-cup-8oz-blk-372'
   ),
   (
     373,
@@ -3752,7 +3752,7 @@ values
     67,
     '2021-04-18 00:00:00',
     6,
-    '-'
+    'yoplait-drink-373'
   ),
   (
     374,
@@ -3762,7 +3762,7 @@ values
     39,
     '2020-10-20 00:00:00',
     4,
-    '-'
+    'sausage-liver-374'
   ),
   (
     375,
@@ -3772,7 +3772,7 @@ values
     43,
     '2020-11-02 00:00:00',
     4,
-    '-'
+    'snapple-lemon-tea-375'
   ),
   (
     376,
@@ -3782,7 +3782,7 @@ values
     15,
     '2020-10-31 00:00:00',
     3,
-    '-'
+    'salmon-atlantic-no-skin-376'
   ),
   (
     377,
@@ -3792,7 +3792,7 @@ values
     63,
     '2020-09-21 00:00:00',
     4,
-    '-'
+    'black-currants-377'
   ),
   (
     378,
@@ -3802,7 +3802,7 @@ values
     87,
     '2020-08-17 00:00:00',
     4,
-    '-'
+    'food-colouring-red'
   ),
   (
     379,
@@ -3812,7 +3812,7 @@ values
     69,
     '2021-04-02 00:00:00',
     4,
-    '-'
+    'chocolate-white'
   ),
   (
     380,
@@ -3822,7 +3822,7 @@ values
     76,
     '2020-08-03 00:00:00',
     5,
-    '-'
+    'calaloo'
   ),
   (
     381,
@@ -3832,7 +3832,7 @@ values
     45,
     '2020-09-04 00:00:00',
     3,
-    '-'
+    'cherries-fresh'
   ),
   (
     382,
@@ -3842,7 +3842,7 @@ values
     13,
     '2020-07-09 00:00:00',
     3,
-    '-'
+    'muffin-orange-individual'
   ),
   (
     383,
@@ -3852,7 +3852,7 @@ values
     85,
     '2021-04-17 00:00:00',
     4,
-    '-'
+    'soup-french-can-pea'
   ),
   (
     384,
@@ -3862,7 +3862,7 @@ values
     30,
     '2020-10-26 00:00:00',
     4,
-    '-'
+    'nectarines-384'
   ),
   (
     385,
@@ -3872,7 +3872,7 @@ values
     65,
     '2020-11-14 00:00:00',
     5,
-    '-'
+    'shrimp-2125-peel-and-deviened-385'
   ),
   (
     386,
@@ -3882,7 +3882,7 @@ values
     100,
     '2021-03-27 00:00:00',
     3,
-    '-'
+    'salmon-smoked-sliced-386'
   ),
   (
     387,
@@ -3892,7 +3892,7 @@ values
     97,
     '2020-08-19 00:00:00',
     4,
-    '-'
+    'quail-jumbo-boneless'
   ),
   (
     388,
@@ -3902,7 +3902,7 @@ values
     75,
     '2021-02-04 00:00:00',
     4,
-    '-'
+    'water-spring-water-355-ml'
   ),
   (
     389,
@@ -3912,7 +3912,7 @@ values
     11,
     '2020-12-27 00:00:00',
     3,
-    '-'
+    'pastry-choclate-baked-389'
   ),
   (
     390,
@@ -3922,7 +3922,7 @@ values
     36,
     '2020-12-24 00:00:00',
     5,
-    '-'
+    'banana-turning-390'
   ),
   (
     391,
@@ -3932,7 +3932,7 @@ values
     59,
     '2021-01-21 00:00:00',
     3,
-    '-'
+    'flavouring-vanilla-artificial'
   ),
   (
     392,
@@ -3942,7 +3942,7 @@ values
     8,
     '2021-05-06 00:00:00',
     5,
-    '-'
+    'lotus-rootlets-canned'
   ),
   (
     393,
@@ -3952,7 +3952,7 @@ values
     51,
     '2021-04-10 00:00:00',
     4,
-    '-'
+    'filter-coffee'
   ),
   (
     394,
@@ -3962,7 +3962,7 @@ values
     11,
     '2020-11-08 00:00:00',
     5,
-    '-'
+    'appetizer-smoked-salmon-dill'
   ),
   (
     395,
@@ -3972,7 +3972,7 @@ values
     19,
     '2020-08-08 00:00:00',
     3,
-    '-'
+    'macaroons-two-bite-choc-395'
   ),
   (
     396,
@@ -3982,7 +3982,7 @@ values
     24,
     '2021-05-13 00:00:00',
     6,
-    '-'
+    'lamb-bones-396'
   ),
   (
     397,
@@ -3992,7 +3992,7 @@ values
     91,
     '2020-08-03 00:00:00',
     3,
-    '-'
+    'mousse-mango'
   ),
   (
     398,
@@ -4002,7 +4002,7 @@ values
     19,
     '2020-08-17 00:00:00',
     5,
-    '-'
+    'truffle-shells-semi-sweet'
   ),
   (
     399,
@@ -4012,7 +4012,7 @@ values
     8,
     '2020-10-29 00:00:00',
     4,
-    '-'
+    'pork-tenderloin-frozen'
   ),
   (
     400,
@@ -4022,7 +4022,7 @@ values
     3,
     '2021-03-12 00:00:00',
     3,
-    '-'
+    'chilli-paste-ginger-garlic'
   ),
   (
     401,
@@ -4032,7 +4032,7 @@ values
     49,
     '2021-01-05 00:00:00',
     5,
-    '-'
+    'creme-de-menth-white'
   ),
   (
     402,
@@ -4042,7 +4042,7 @@ values
     96,
     '2020-11-26 00:00:00',
     4,
-    '-'
+    'thyme-dried'
   ),
   (
     403,
@@ -4052,7 +4052,7 @@ values
     49,
     '2020-11-12 00:00:00',
     4,
-    '-'
+    'pasta-lasagna-dry'
   ),
   (
     404,
@@ -4062,7 +4062,7 @@ values
     52,
     '2021-05-13 00:00:00',
     5,
-    '-'
+    'eggplant-italian'
   ),
   (
     405,
@@ -4072,7 +4072,7 @@ values
     14,
     '2021-04-16 00:00:00',
     3,
-    '-'
+    'v8-vegetable-cocktail'
   ),
   (
     406,
@@ -4082,7 +4082,7 @@ values
     46,
     '2021-04-09 00:00:00',
     6,
-    '-'
+    'tray-16in-rnd-blk-406'
   ),
   (
     407,
@@ -4092,7 +4092,7 @@ values
     11,
     '2020-11-07 00:00:00',
     4,
-    '-'
+    'juice-peach-nectar-407'
   ),
   (
     408,
@@ -4102,7 +4102,7 @@ values
     14,
     '2021-04-10 00:00:00',
     6,
-    '-'
+    'shrimp-baby-warm-water-408'
   ),
   (
     409,
@@ -4112,7 +4112,7 @@ values
     59,
     '2020-09-25 00:00:00',
     6,
-    '-'
+    'chicken-whole-fryers-409'
   ),
   (
     410,
@@ -4122,7 +4122,7 @@ values
     58,
     '2020-11-18 00:00:00',
     5,
-    '-'
+    'gatorade-orange'
   ),
   (
     411,
@@ -4132,7 +4132,7 @@ values
     91,
     '2020-11-21 00:00:00',
     5,
-    '-'
+    'fib-n9-prague-powder'
   ),
   (
     412,
@@ -4142,7 +4142,7 @@ values
     44,
     '2021-03-23 00:00:00',
     5,
-    '-'
+    'mushroom-enoki-fresh-412'
   ),
   (
     413,
@@ -4152,7 +4152,7 @@ values
     35,
     '2021-01-23 00:00:00',
     4,
-    '-'
+    'sauce-hp'
   ),
   (
     414,
@@ -4162,7 +4162,7 @@ values
     68,
     '2020-12-15 00:00:00',
     3,
-    '-'
+    'beer-paulaner-hefeweisse-414'
   ),
   (
     415,
@@ -4172,7 +4172,7 @@ values
     48,
     '2021-05-16 00:00:00',
     4,
-    '-'
+    'nut-pecan-halves'
   ),
   (
     416,
@@ -4182,7 +4182,7 @@ values
     62,
     '2020-08-07 00:00:00',
     3,
-    '-'
+    'vodka-smirnoff-416'
   ),
   (
     417,
@@ -4192,7 +4192,7 @@ values
     95,
     '2021-04-25 00:00:00',
     6,
-    '-'
+    'wine-port-late-bottled-vintage'
   ),
   (
     418,
@@ -4202,7 +4202,7 @@ values
     92,
     '2020-12-31 00:00:00',
     3,
-    '-'
+    'kiwi-gold-zespri'
   ),
   (
     419,
@@ -4212,7 +4212,7 @@ values
     96,
     '2020-12-04 00:00:00',
     5,
-    '-'
+    'soup-chicken-and-wild-rice-419'
   ),
   (
     420,
@@ -4222,7 +4222,7 @@ values
     42,
     '2021-02-15 00:00:00',
     3,
-    '-'
+    'cream-of-tartar-420'
   ),
   (
     421,
@@ -4232,7 +4232,7 @@ values
     12,
     '2020-10-23 00:00:00',
     3,
-    '-'
+    'pasta-cheese-spinach-bauletti-421'
   ),
   (
     422,
@@ -4242,7 +4242,7 @@ values
     34,
     '2020-09-13 00:00:00',
     4,
-    '-'
+    'yucca-422'
   ),
   (
     423,
@@ -4252,7 +4252,7 @@ values
     83,
     '2020-07-31 00:00:00',
     6,
-    '-'
+    'zucchini-yellow'
   ),
   (
     424,
@@ -4262,7 +4262,7 @@ values
     95,
     '2021-01-26 00:00:00',
     6,
-    '-'
+    'transfer-sheets'
   ),
   (
     425,
@@ -4272,7 +4272,7 @@ values
     65,
     '2021-01-02 00:00:00',
     6,
-    '-'
+    'beef-cooked-corned-425'
   ),
   (
     426,
@@ -4282,7 +4282,7 @@ values
     30,
     '2021-04-14 00:00:00',
     6,
-    '-'
+    'bar-bran-honey-nut'
   ),
   (
     427,
@@ -4292,7 +4292,7 @@ values
     30,
     '2021-01-11 00:00:00',
     6,
-    '-'
+    'quail-whole-bone-in'
   ),
   (
     428,
@@ -4302,7 +4302,7 @@ values
     65,
     '2021-05-14 00:00:00',
     5,
-    '-'
+    'pepper-julienne-frozen'
   ),
   (
     429,
@@ -4312,7 +4312,7 @@ values
     79,
     '2020-12-09 00:00:00',
     5,
-    '-'
+    'radish-pickled'
   ),
   (
     430,
@@ -4322,7 +4322,7 @@ values
     30,
     '2021-05-11 00:00:00',
     5,
-    '-'
+    'chocolate-eclairs'
   ),
   (
     431,
@@ -4332,7 +4332,7 @@ values
     73,
     '2020-09-08 00:00:00',
     5,
-    '-'
+    'godiva-white-chocolate'
   ),
   (
     432,
@@ -4342,7 +4342,7 @@ values
     48,
     '2021-04-24 00:00:00',
     6,
-    '-'
+    'sauce-soya-light'
   ),
   (
     433,
@@ -4352,7 +4352,7 @@ values
     9,
     '2020-12-18 00:00:00',
     5,
-    '-'
+    'sherry-dry-433'
   ),
   (
     434,
@@ -4362,7 +4362,7 @@ values
     76,
     '2021-02-02 00:00:00',
     6,
-    '-'
+    'potatoes-peeled'
   ),
   (
     435,
@@ -4372,7 +4372,7 @@ values
     86,
     '2020-10-16 00:00:00',
     4,
-    '-'
+    'wine-two-oceans-cabernet'
   ),
   (
     436,
@@ -4382,7 +4382,7 @@ values
     77,
     '2021-04-27 00:00:00',
     4,
-    '-'
+    'appetizer-southwestern'
   ),
   (
     437,
@@ -4392,7 +4392,7 @@ values
     11,
     '2021-01-22 00:00:00',
     5,
-    '-'
+    'wine-penfolds-koonuga-hill-437'
   ),
   (
     438,
@@ -4402,7 +4402,7 @@ values
     30,
     '2020-12-04 00:00:00',
     4,
-    '-'
+    'appetizer-shrimp-puff'
   ),
   (
     439,
@@ -4412,7 +4412,7 @@ values
     93,
     '2020-09-06 00:00:00',
     5,
-    '-'
+    'isomalt'
   ),
   (
     440,
@@ -4422,7 +4422,7 @@ values
     29,
     '2021-05-20 00:00:00',
     4,
-    '-'
+    'beans-soya-bean'
   ),
   (
     441,
@@ -4432,7 +4432,7 @@ values
     99,
     '2020-10-19 00:00:00',
     3,
-    '-'
+    'beef-shank-441'
   ),
   (
     442,
@@ -4442,7 +4442,7 @@ values
     51,
     '2021-01-27 00:00:00',
     3,
-    '-'
+    'oil-shortening-all-purpose-442'
   ),
   (
     443,
@@ -4452,7 +4452,7 @@ values
     35,
     '2020-10-03 00:00:00',
     6,
-    '-'
+    'pepper-chilli-seeds-mild'
   ),
   (
     444,
@@ -4462,7 +4462,7 @@ values
     19,
     '2020-11-17 00:00:00',
     3,
-    '-'
+    'pasta-fusili-dry'
   ),
   (
     445,
@@ -4472,7 +4472,7 @@ values
     83,
     '2021-01-24 00:00:00',
     5,
-    '-'
+    'flower-leather-leaf-fern-445'
   ),
   (
     446,
@@ -4482,7 +4482,7 @@ values
     8,
     '2020-07-28 00:00:00',
     6,
-    '-'
+    'black-currants-446'
   ),
   (
     447,
@@ -4492,7 +4492,7 @@ values
     16,
     '2021-01-21 00:00:00',
     5,
-    '-'
+    'sword-pick-asst-447'
   ),
   (
     448,
@@ -4502,7 +4502,7 @@ values
     76,
     '2021-01-27 00:00:00',
     5,
-    '-'
+    'soup-campbells-lentil'
   ),
   (
     449,
@@ -4512,7 +4512,7 @@ values
     65,
     '2021-04-04 00:00:00',
     4,
-    '-'
+    'roe-lump-fish-red'
   ),
   (
     450,
@@ -4522,7 +4522,7 @@ values
     90,
     '2020-09-09 00:00:00',
     4,
-    '-'
+    'sauce-demi-glace'
   ),
   (
     451,
@@ -4532,7 +4532,7 @@ values
     71,
     '2021-02-15 00:00:00',
     6,
-    '-'
+    'coffee-cup-8oz-5338cd'
   ),
   (
     452,
@@ -4542,7 +4542,7 @@ values
     11,
     '2020-10-09 00:00:00',
     4,
-    '-'
+    'salmon-smoked-sliced-452'
   ),
   (
     453,
@@ -4552,7 +4552,7 @@ values
     23,
     '2020-10-31 00:00:00',
     4,
-    '-'
+    'veal-osso-bucco-453'
   ),
   (
     454,
@@ -4562,7 +4562,7 @@ values
     29,
     '2021-06-05 00:00:00',
     6,
-    '-'
+    'sole-dover-whole-fresh-454'
   ),
   (
     455,
@@ -4572,7 +4572,7 @@ values
     92,
     '2021-03-26 00:00:00',
     3,
-    '-'
+    'vaccum-bag-14x20-455'
   ),
   (
     456,
@@ -4582,7 +4582,7 @@ values
     25,
     '2020-08-01 00:00:00',
     6,
-    '-'
+    'sausage-liver-456'
   ),
   (
     457,
@@ -4592,7 +4592,7 @@ values
     34,
     '2021-01-30 00:00:00',
     5,
-    '-'
+    'wine-magnotta-white'
   ),
   (
     458,
@@ -4602,7 +4602,7 @@ values
     87,
     '2021-04-08 00:00:00',
     4,
-    '-'
+    'ham-virginia'
   ),
   (
     459,
@@ -4612,7 +4612,7 @@ values
     5,
     '2020-09-24 00:00:00',
     4,
-    '-'
+    'onion-dried'
   ),
   (
     460,
@@ -4622,7 +4622,7 @@ values
     32,
     '2020-09-29 00:00:00',
     3,
-    '-'
+    'coffee-decafenated-460'
   ),
   (
     461,
@@ -4632,7 +4632,7 @@ values
     35,
     '2020-07-03 00:00:00',
     4,
-    '-'
+    'sauce-plum-461'
   ),
   (
     462,
@@ -4642,7 +4642,7 @@ values
     100,
     '2020-12-08 00:00:00',
     4,
-    '-'
+    'yogurt-raspberry-175-gr-462'
   ),
   (
     463,
@@ -4652,7 +4652,7 @@ values
     85,
     '2020-06-19 00:00:00',
     5,
-    '-'
+    'orange-tangerine'
   ),
   (
     464,
@@ -4662,7 +4662,7 @@ values
     55,
     '2020-08-20 00:00:00',
     4,
-    '-'
+    'chicken-soup-base'
   ),
   (
     465,
@@ -4672,7 +4672,7 @@ values
     93,
     '2021-05-27 00:00:00',
     3,
-    '-'
+    'ecolab-lime-a-way-44-l'
   ),
   (
     466,
@@ -4682,7 +4682,7 @@ values
     82,
     '2020-08-17 00:00:00',
     3,
-    '-'
+    'cheese-parmigiano-reggiano'
   ),
   (
     467,
@@ -4692,7 +4692,7 @@ values
     22,
     '2020-10-21 00:00:00',
     5,
-    '-'
+    'beef-chuck-boneless'
   ),
   (
     468,
@@ -4702,7 +4702,7 @@ values
     51,
     '2020-12-04 00:00:00',
     4,
-    '-'
+    'raisin-golden-468'
   ),
   (
     469,
@@ -4712,7 +4712,7 @@ values
     8,
     '2021-02-25 00:00:00',
     3,
-    '-'
+    'molasses-fancy'
   ),
   (
     470,
@@ -4722,7 +4722,7 @@ values
     34,
     '2020-07-19 00:00:00',
     6,
-    '-'
+    'pork-ground'
   ),
   (
     471,
@@ -4732,7 +4732,7 @@ values
     51,
     '2021-01-17 00:00:00',
     4,
-    '-'
+    'bread-white-unsliced'
   ),
   (
     472,
@@ -4742,7 +4742,7 @@ values
     81,
     '2020-07-13 00:00:00',
     5,
-    '-'
+    'versatainer-nc-8288'
   ),
   (
     473,
@@ -4752,7 +4752,7 @@ values
     70,
     '2020-06-16 00:00:00',
     6,
-    '-'
+    'lambcasing-473'
   ),
   (
     474,
@@ -4762,7 +4762,7 @@ values
     79,
     '2020-11-05 00:00:00',
     4,
-    '-'
+    'beef-ox-tongue'
   ),
   (
     475,
@@ -4772,7 +4772,7 @@ values
     61,
     '2021-01-13 00:00:00',
     6,
-    '-'
+    'pepper-green-chili'
   ),
   (
     476,
@@ -4782,7 +4782,7 @@ values
     16,
     '2020-12-14 00:00:00',
     3,
-    '-'
+    'beer-tetleys'
   ),
   (
     477,
@@ -4792,7 +4792,7 @@ values
     80,
     '2020-08-05 00:00:00',
     3,
-    '-'
+    'yogurt-cherry-175-gr-477'
   ),
   (
     478,
@@ -4802,7 +4802,7 @@ values
     35,
     '2021-04-26 00:00:00',
     5,
-    '-'
+    'sole-fillet'
   ),
   (
     479,
@@ -4812,7 +4812,7 @@ values
     25,
     '2021-02-09 00:00:00',
     5,
-    '-'
+    'turnip-white-organic-479'
   ),
   (
     480,
@@ -4822,7 +4822,7 @@ values
     41,
     '2020-08-11 00:00:00',
     6,
-    '-'
+    'dip-tapenade-480'
   ),
   (
     481,
@@ -4832,7 +4832,7 @@ values
     93,
     '2021-05-01 00:00:00',
     4,
-    '-'
+    'coffee-10oz-cup-92961-481'
   ),
   (
     482,
@@ -4842,7 +4842,7 @@ values
     87,
     '2021-04-08 00:00:00',
     6,
-    '-'
+    'pasta-elbows-macaroni-dry'
   ),
   (
     483,
@@ -4852,7 +4852,7 @@ values
     42,
     '2020-06-24 00:00:00',
     4,
-    '-'
+    'wine-white-colubia-cresh'
   ),
   (
     484,
@@ -4862,7 +4862,7 @@ values
     75,
     '2021-01-05 00:00:00',
     4,
-    '-'
+    'soup-beef-conomme-dry-484'
   ),
   (
     485,
@@ -4872,7 +4872,7 @@ values
     17,
     '2020-09-27 00:00:00',
     4,
-    '-'
+    'soup-campbells-mushroom'
   ),
   (
     486,
@@ -4882,7 +4882,7 @@ values
     21,
     '2021-03-14 00:00:00',
     5,
-    '-'
+    'potatoes-mini-red'
   ),
   (
     487,
@@ -4892,7 +4892,7 @@ values
     75,
     '2020-12-06 00:00:00',
     6,
-    '-'
+    'cheese-havarti-salsa'
   ),
   (
     488,
@@ -4902,7 +4902,7 @@ values
     20,
     '2020-07-09 00:00:00',
     4,
-    '-'
+    'shrimp-2125-peel-and-deviened-488'
   ),
   (
     489,
@@ -4912,7 +4912,7 @@ values
     18,
     '2020-08-03 00:00:00',
     4,
-    '-'
+    'propel-sport-drink'
   ),
   (
     490,
@@ -4922,7 +4922,7 @@ values
     64,
     '2020-12-23 00:00:00',
     6,
-    '-'
+    'chicken-white-meat-with-tender-490'
   ),
   (
     491,
@@ -4932,7 +4932,7 @@ values
     43,
     '2020-11-04 00:00:00',
     5,
-    '-'
+    'guinea-fowl-491'
   ),
   (
     492,
@@ -4942,7 +4942,7 @@ values
     13,
     '2021-02-04 00:00:00',
     4,
-    '-'
+    'bowl-12-oz-showcase-92012-492'
   ),
   (
     493,
@@ -4952,7 +4952,7 @@ values
     86,
     '2021-05-11 00:00:00',
     3,
-    '-'
+    'yeast-dry-fermipan'
   ),
   (
     494,
@@ -4962,7 +4962,7 @@ values
     39,
     '2020-09-12 00:00:00',
     5,
-    '-'
+    'mushroom-chantrelle-fresh'
   ),
   (
     495,
@@ -4972,7 +4972,7 @@ values
     82,
     '2021-03-12 00:00:00',
     4,
-    '-'
+    'beer-steamwhistle-495'
   ),
   (
     496,
@@ -4982,7 +4982,7 @@ values
     59,
     '2020-09-30 00:00:00',
     3,
-    '-'
+    'lettuce-belgian-endive'
   ),
   (
     497,
@@ -4992,7 +4992,7 @@ values
     97,
     '2021-02-22 00:00:00',
     5,
-    '-'
+    'jello-assorted'
   ),
   (
     498,
@@ -5002,7 +5002,7 @@ values
     3,
     '2020-08-27 00:00:00',
     6,
-    '-'
+    'garlic-powder'
   ),
   (
     499,
@@ -5012,7 +5012,7 @@ values
     77,
     '2020-09-20 00:00:00',
     6,
-    '-'
+    'pickle-dill'
   ),
   (
     500,
@@ -5022,7 +5022,7 @@ values
     75,
     '2020-10-22 00:00:00',
     5,
-    '-'
+    'flour-dark-rye-500'
   ),
   (
     501,
@@ -5032,7 +5032,7 @@ values
     51,
     '2021-06-07 00:00:00',
     6,
-    '-'
+    'compound-pear'
   ),
   (
     502,
@@ -5042,7 +5042,7 @@ values
     29,
     '2020-07-25 00:00:00',
     3,
-    '-'
+    'cookie-chocolate-chip-with'
   ),
   (
     503,
@@ -5052,7 +5052,7 @@ values
     15,
     '2020-11-08 00:00:00',
     5,
-    '-'
+    'cloves-ground'
   ),
   (
     504,
@@ -5062,7 +5062,7 @@ values
     46,
     '2020-09-27 00:00:00',
     4,
-    '-'
+    'sauce-thousand-island-504'
   ),
   (
     505,
@@ -5072,7 +5072,7 @@ values
     67,
     '2020-07-25 00:00:00',
     3,
-    '-'
+    'yogurt-assorted-pack'
   ),
   (
     506,
@@ -5082,7 +5082,7 @@ values
     52,
     '2021-05-26 00:00:00',
     6,
-    '-'
+    'dooleys-toffee'
   ),
   (
     507,
@@ -5092,7 +5092,7 @@ values
     58,
     '2021-03-25 00:00:00',
     3,
-    '-'
+    'marzipan-5050'
   ),
   (
     508,
@@ -5102,7 +5102,7 @@ values
     40,
     '2021-02-28 00:00:00',
     6,
-    '-'
+    'flavouring-raspberry'
   ),
   (
     509,
@@ -5112,7 +5112,7 @@ values
     80,
     '2021-04-09 00:00:00',
     5,
-    '-'
+    'lamb-bones-509'
   ),
   (
     510,
@@ -5122,7 +5122,7 @@ values
     77,
     '2021-04-04 00:00:00',
     3,
-    '-'
+    'pineapple-canned-rings-510'
   ),
   (
     511,
@@ -5132,7 +5132,7 @@ values
     44,
     '2021-02-10 00:00:00',
     4,
-    '-'
+    'chicken-whole-roasting-511'
   ),
   (
     512,
@@ -5142,7 +5142,7 @@ values
     100,
     '2021-04-25 00:00:00',
     4,
-    '-'
+    'scallops-u-10'
   ),
   (
     513,
@@ -5152,7 +5152,7 @@ values
     30,
     '2021-03-04 00:00:00',
     6,
-    '-'
+    'container-clear-32-oz'
   ),
   (
     514,
@@ -5162,7 +5162,7 @@ values
     65,
     '2020-10-04 00:00:00',
     4,
-    '-'
+    'juice-orange-189l-514'
   ),
   (
     515,
@@ -5172,7 +5172,7 @@ values
     44,
     '2020-12-24 00:00:00',
     3,
-    '-'
+    'sparkling-wine-rose-freixenet-515'
   ),
   (
     516,
@@ -5182,7 +5182,7 @@ values
     64,
     '2020-08-27 00:00:00',
     3,
-    '-'
+    'sultanas-516'
   ),
   (
     517,
@@ -5192,7 +5192,7 @@ values
     21,
     '2021-03-28 00:00:00',
     4,
-    '-'
+    'pasta-cheese-spinach-bauletti-517'
   ),
   (
     518,
@@ -5202,7 +5202,7 @@ values
     43,
     '2021-04-23 00:00:00',
     4,
-    '-'
+    'tart-pecan-butter-squares-518'
   ),
   (
     519,
@@ -5212,7 +5212,7 @@ values
     87,
     '2021-04-21 00:00:00',
     6,
-    '-'
+    'tarts-assorted-519'
   ),
   (
     520,
@@ -5222,7 +5222,7 @@ values
     47,
     '2021-03-15 00:00:00',
     6,
-    '-'
+    'appetizer-asian-shrimp-roll'
   ),
   (
     521,
@@ -5232,7 +5232,7 @@ values
     1,
     '2021-05-13 00:00:00',
     5,
-    '-'
+    'pork-smoked-back-bacon'
   ),
   (
     522,
@@ -5242,7 +5242,7 @@ values
     38,
     '2020-09-15 00:00:00',
     4,
-    '-'
+    'vodka-smirnoff-522'
   ),
   (
     523,
@@ -5252,7 +5252,7 @@ values
     37,
     '2020-11-19 00:00:00',
     6,
-    '-'
+    'cake-miini-cheesecake-cherry-523'
   ),
   (
     524,
@@ -5262,7 +5262,7 @@ values
     82,
     '2021-01-29 00:00:00',
     6,
-    '-'
+    'tia-maria-524'
   ),
   (
     525,
@@ -5272,7 +5272,7 @@ values
     64,
     '2020-07-10 00:00:00',
     6,
-    '-'
+    'banana-turning-525'
   ),
   (
     526,
@@ -5282,7 +5282,7 @@ values
     54,
     '2020-10-04 00:00:00',
     5,
-    '-'
+    'rice-brown-526'
   ),
   (
     527,
@@ -5292,7 +5292,7 @@ values
     89,
     '2021-02-07 00:00:00',
     6,
-    '-'
+    'potatoes-fingerling-4-oz'
   ),
   (
     528,
@@ -5302,7 +5302,7 @@ values
     71,
     '2021-03-27 00:00:00',
     6,
-    '-'
+    'shrimp-tiger-2125-528'
   ),
   (
     529,
@@ -5312,7 +5312,7 @@ values
     29,
     '2020-07-01 00:00:00',
     6,
-    '-'
+    'lamb-shanks-529'
   ),
   (
     530,
@@ -5322,7 +5322,7 @@ values
     57,
     '2020-12-11 00:00:00',
     4,
-    '-'
+    'wine-red-cabernet-merlot'
   ),
   (
     531,
@@ -5332,7 +5332,7 @@ values
     6,
     '2021-05-04 00:00:00',
     3,
-    '-'
+    'bread-sour-batard'
   ),
   (
     532,
@@ -5342,7 +5342,7 @@ values
     88,
     '2020-08-25 00:00:00',
     3,
-    '-'
+    'ginger-crystalized'
   ),
   (
     533,
@@ -5352,7 +5352,7 @@ values
     69,
     '2020-12-26 00:00:00',
     3,
-    '-'
+    'eggplant-asian'
   ),
   (
     534,
@@ -5362,7 +5362,7 @@ values
     61,
     '2020-11-10 00:00:00',
     5,
-    '-'
+    'wine-malbec-trapiche-reserve'
   ),
   (
     535,
@@ -5372,7 +5372,7 @@ values
     82,
     '2021-02-04 00:00:00',
     6,
-    '-'
+    'coffee-cup-16oz-foam'
   ),
   (
     536,
@@ -5382,7 +5382,7 @@ values
     90,
     '2020-11-09 00:00:00',
     6,
-    '-'
+    'coconut-milk-unsweetened-536'
   ),
   (
     537,
@@ -5392,7 +5392,7 @@ values
     65,
     '2020-06-20 00:00:00',
     3,
-    '-'
+    'squid-ink'
   ),
   (
     538,
@@ -5402,7 +5402,7 @@ values
     70,
     '2020-06-24 00:00:00',
     6,
-    '-'
+    'wine-bouchard-la-vignee-pinot'
   ),
   (
     539,
@@ -5412,7 +5412,7 @@ values
     97,
     '2020-08-02 00:00:00',
     3,
-    '-'
+    'guinea-fowl-539'
   ),
   (
     540,
@@ -5422,7 +5422,7 @@ values
     41,
     '2021-04-05 00:00:00',
     6,
-    '-'
+    'remy-red'
   ),
   (
     541,
@@ -5432,7 +5432,7 @@ values
     11,
     '2020-09-09 00:00:00',
     3,
-    '-'
+    'cookie-dough-chocolate-chip'
   ),
   (
     542,
@@ -5442,7 +5442,7 @@ values
     15,
     '2021-01-15 00:00:00',
     4,
-    '-'
+    'fennel'
   ),
   (
     543,
@@ -5452,7 +5452,7 @@ values
     97,
     '2021-04-09 00:00:00',
     6,
-    '-'
+    'nacho-chips-543'
   ),
   (
     544,
@@ -5462,7 +5462,7 @@ values
     77,
     '2020-12-25 00:00:00',
     6,
-    '-'
+    'sugar-invert-544'
   ),
   (
     545,
@@ -5472,7 +5472,7 @@ values
     51,
     '2020-11-02 00:00:00',
     3,
-    '-'
+    'tarts-assorted-545'
   ),
   (
     546,
@@ -5482,7 +5482,7 @@ values
     52,
     '2020-10-21 00:00:00',
     3,
-    '-'
+    'mushroom-morel-fresh'
   ),
   (
     547,
@@ -5492,7 +5492,7 @@ values
     23,
     '2020-12-19 00:00:00',
     6,
-    '-'
+    'hersey-shakes-547'
   ),
   (
     548,
@@ -5502,7 +5502,7 @@ values
     84,
     '2021-01-14 00:00:00',
     5,
-    '-'
+    'tomatoes-heirloom'
   ),
   (
     549,
@@ -5512,7 +5512,7 @@ values
     1,
     '2021-04-13 00:00:00',
     3,
-    '-'
+    'tea-herbal-orange-spice-549'
   ),
   (
     550,
@@ -5522,7 +5522,7 @@ values
     94,
     '2020-09-04 00:00:00',
     6,
-    '-'
+    'pork-bacon-cooked-slcd'
   ),
   (
     551,
@@ -5532,7 +5532,7 @@ values
     45,
     '2020-10-01 00:00:00',
     5,
-    '-'
+    'mint-fresh'
   ),
   (
     552,
@@ -5542,7 +5542,7 @@ values
     69,
     '2021-01-13 00:00:00',
     3,
-    '-'
+    'bread-bistro-sour'
   ),
   (
     553,
@@ -5552,7 +5552,7 @@ values
     71,
     '2021-02-14 00:00:00',
     5,
-    '-'
+    'wine-magnotta-red-baco'
   ),
   (
     554,
@@ -5562,7 +5562,7 @@ values
     2,
     '2021-06-02 00:00:00',
     4,
-    '-'
+    'chicken-leg-fresh'
   ),
   (
     555,
@@ -5572,7 +5572,7 @@ values
     37,
     '2021-01-24 00:00:00',
     6,
-    '-'
+    'soup-french-onion-dry'
   ),
   (
     556,
@@ -5582,7 +5582,7 @@ values
     81,
     '2021-03-21 00:00:00',
     3,
-    '-'
+    'sachet'
   ),
   (
     557,
@@ -5592,7 +5592,7 @@ values
     48,
     '2021-06-02 00:00:00',
     5,
-    '-'
+    'carrots-purple-organic'
   ),
   (
     558,
@@ -5602,7 +5602,7 @@ values
     32,
     '2021-05-07 00:00:00',
     6,
-    '-'
+    'yogurt-raspberry-175-gr-558'
   ),
   (
     559,
@@ -5612,7 +5612,7 @@ values
     13,
     '2020-11-17 00:00:00',
     4,
-    '-'
+    'chocolate-chips-compound-559'
   ),
   (
     560,
@@ -5622,7 +5622,7 @@ values
     75,
     '2020-07-28 00:00:00',
     4,
-    '-'
+    'sponge-cake-mix-chocolate-560'
   ),
   (
     561,
@@ -5632,7 +5632,7 @@ values
     82,
     '2020-09-22 00:00:00',
     5,
-    '-'
+    'flower-potmums'
   ),
   (
     562,
@@ -5642,7 +5642,7 @@ values
     97,
     '2020-11-03 00:00:00',
     4,
-    '-'
+    'glass-clear-7-oz-xl-562'
   ),
   (
     563,
@@ -5652,7 +5652,7 @@ values
     15,
     '2020-08-01 00:00:00',
     6,
-    '-'
+    'flour-strong-pizza-563'
   ),
   (
     564,
@@ -5662,7 +5662,7 @@ values
     85,
     '2020-09-28 00:00:00',
     5,
-    '-'
+    'glass-clear-7-oz-xl-564'
   ),
   (
     565,
@@ -5672,7 +5672,7 @@ values
     58,
     '2020-12-01 00:00:00',
     3,
-    '-'
+    'taro-leaves-565'
   ),
   (
     566,
@@ -5682,7 +5682,7 @@ values
     77,
     '2021-04-04 00:00:00',
     5,
-    '-'
+    'bread-bowl-plain'
   ),
   (
     567,
@@ -5692,7 +5692,7 @@ values
     44,
     '2020-07-02 00:00:00',
     6,
-    '-'
+    'cheese-cambozola-567'
   ),
   (
     568,
@@ -5702,7 +5702,7 @@ values
     50,
     '2020-08-29 00:00:00',
     5,
-    '-'
+    'lettuce-spring-mix'
   ),
   (
     569,
@@ -5712,7 +5712,7 @@ values
     78,
     '2021-02-22 00:00:00',
     3,
-    '-'
+    'crab-claws-26-30'
   ),
   (
     570,
@@ -5722,7 +5722,7 @@ values
     24,
     '2021-04-15 00:00:00',
     6,
-    '-'
+    'stock-chicken-white'
   ),
   (
     571,
@@ -5732,7 +5732,7 @@ values
     44,
     '2021-01-19 00:00:00',
     3,
-    '-'
+    'latex-rubber-gloves-size-9'
   ),
   (
     572,
@@ -5742,7 +5742,7 @@ values
     27,
     '2020-12-06 00:00:00',
     6,
-    '-'
+    'wine-white-cab-sauvon'
   ),
   (
     573,
@@ -5752,7 +5752,7 @@ values
     32,
     '2020-06-12 00:00:00',
     5,
-    '-'
+    'cheese-brie-cups-125g'
   ),
   (
     574,
@@ -5762,7 +5762,7 @@ values
     41,
     '2021-03-28 00:00:00',
     4,
-    '-'
+    'flour-all-purpose'
   ),
   (
     575,
@@ -5772,7 +5772,7 @@ values
     64,
     '2021-04-24 00:00:00',
     3,
-    '-'
+    'lemon-balm-fresh-575'
   ),
   (
     576,
@@ -5782,7 +5782,7 @@ values
     89,
     '2020-07-05 00:00:00',
     4,
-    '-'
+    'tomatoes-roma-576'
   ),
   (
     577,
@@ -5792,7 +5792,7 @@ values
     48,
     '2020-12-10 00:00:00',
     5,
-    '-'
+    'soup-campbells-classic-chix'
   ),
   (
     578,
@@ -5802,7 +5802,7 @@ values
     66,
     '2020-10-11 00:00:00',
     4,
-    '-'
+    'beer-upper-canada-light-578'
   ),
   (
     579,
@@ -5812,7 +5812,7 @@ values
     74,
     '2020-09-16 00:00:00',
     5,
-    '-'
+    'hersey-shakes-579'
   ),
   (
     580,
@@ -5822,7 +5822,7 @@ values
     62,
     '2021-03-02 00:00:00',
     3,
-    '-'
+    'extract-rum'
   ),
   (
     581,
@@ -5832,7 +5832,7 @@ values
     40,
     '2020-10-05 00:00:00',
     4,
-    '-'
+    'yams'
   ),
   (
     582,
@@ -5842,7 +5842,7 @@ values
     49,
     '2021-03-18 00:00:00',
     4,
-    '-'
+    'water-spring-15lit'
   ),
   (
     583,
@@ -5852,7 +5852,7 @@ values
     7,
     '2021-03-20 00:00:00',
     5,
-    '-'
+    'skirt-24-foot'
   ),
   (
     584,
@@ -5862,7 +5862,7 @@ values
     69,
     '2020-08-17 00:00:00',
     6,
-    '-'
+    'flour-dark-rye-584'
   ),
   (
     585,
@@ -5872,7 +5872,7 @@ values
     82,
     '2020-09-17 00:00:00',
     4,
-    '-'
+    'coffee-almond-amaretto'
   ),
   (
     586,
@@ -5882,7 +5882,7 @@ values
     76,
     '2021-02-01 00:00:00',
     4,
-    '-'
+    'bread-rolls-rye'
   ),
   (
     587,
@@ -5892,7 +5892,7 @@ values
     8,
     '2021-03-12 00:00:00',
     3,
-    '-'
+    'salmon-fillets'
   ),
   (
     588,
@@ -5902,7 +5902,7 @@ values
     63,
     '2020-07-31 00:00:00',
     6,
-    '-'
+    'cheese-brick-with-onion-588'
   ),
   (
     589,
@@ -5912,7 +5912,7 @@ values
     89,
     '2021-04-15 00:00:00',
     5,
-    '-'
+    'tray-16in-rnd-blk-589'
   ),
   (
     590,
@@ -5922,7 +5922,7 @@ values
     5,
     '2021-01-12 00:00:00',
     3,
-    '-'
+    'pike-frozen-fillet'
   ),
   (
     591,
@@ -5932,7 +5932,7 @@ values
     44,
     '2021-03-09 00:00:00',
     6,
-    '-'
+    'kirsch-schloss'
   ),
   (
     592,
@@ -5942,7 +5942,7 @@ values
     56,
     '2020-08-29 00:00:00',
     5,
-    '-'
+    'ham-procutinni'
   ),
   (
     593,
@@ -5952,7 +5952,7 @@ values
     74,
     '2020-10-14 00:00:00',
     4,
-    '-'
+    'lettuce-curly-endive-593'
   ),
   (
     594,
@@ -5962,7 +5962,7 @@ values
     52,
     '2021-05-24 00:00:00',
     6,
-    '-'
+    'black-currants-594'
   ),
   (
     595,
@@ -5972,7 +5972,7 @@ values
     86,
     '2020-07-15 00:00:00',
     6,
-    '-'
+    'doilies-5-paper'
   ),
   (
     596,
@@ -5982,7 +5982,7 @@ values
     100,
     '2020-08-11 00:00:00',
     6,
-    '-'
+    'gelatine-powder'
   ),
   (
     597,
@@ -5992,7 +5992,7 @@ values
     49,
     '2021-03-02 00:00:00',
     5,
-    '-'
+    'noodles-steamed-chow-mein'
   ),
   (
     598,
@@ -6002,7 +6002,7 @@ values
     35,
     '2020-09-23 00:00:00',
     4,
-    '-'
+    'yogurt-raspberry-175-gr-598'
   ),
   (
     599,
@@ -6012,7 +6012,7 @@ values
     27,
     '2020-09-04 00:00:00',
     4,
-    '-'
+    'tarts-assorted-599'
   ),
   (
     600,
@@ -6022,7 +6022,7 @@ values
     96,
     '2020-11-30 00:00:00',
     3,
-    '-'
+    'icecream-dstk-super-cone'
   ),
   (
     601,
@@ -6032,7 +6032,7 @@ values
     17,
     '2021-04-27 00:00:00',
     3,
-    '-'
+    'wine-rhine-riesling-wolf-blass'
   ),
   (
     602,
@@ -6042,7 +6042,7 @@ values
     84,
     '2021-01-09 00:00:00',
     4,
-    '-'
+    'beans-fine'
   ),
   (
     603,
@@ -6052,7 +6052,7 @@ values
     48,
     '2020-12-12 00:00:00',
     4,
-    '-'
+    'wine-cousino-macul-antiguas'
   ),
   (
     604,
@@ -6062,7 +6062,7 @@ values
     13,
     '2020-06-18 00:00:00',
     6,
-    '-'
+    'appetizer-sausage-rolls-604'
   ),
   (
     605,
@@ -6072,7 +6072,7 @@ values
     49,
     '2020-08-25 00:00:00',
     6,
-    '-'
+    'russian-prince'
   ),
   (
     606,
@@ -6082,7 +6082,7 @@ values
     2,
     '2021-04-13 00:00:00',
     4,
-    '-'
+    'cabbage-nappa'
   ),
   (
     607,
@@ -6092,7 +6092,7 @@ values
     55,
     '2020-06-10 00:00:00',
     4,
-    '-'
+    'syrup-monin-passion-fruit-607'
   ),
   (
     608,
@@ -6102,7 +6102,7 @@ values
     30,
     '2020-10-25 00:00:00',
     4,
-    '-'
+    'jack-daniels'
   ),
   (
     609,
@@ -6112,7 +6112,7 @@ values
     35,
     '2021-04-12 00:00:00',
     6,
-    '-'
+    'beef-ground-extra-lean-fresh'
   ),
   (
     610,
@@ -6122,7 +6122,7 @@ values
     81,
     '2020-11-13 00:00:00',
     3,
-    '-'
+    'icecream-dstk-cml-and-fdg'
   ),
   (
     611,
@@ -6132,7 +6132,7 @@ values
     10,
     '2021-02-15 00:00:00',
     5,
-    '-'
+    'beer-muskoka-cream-ale'
   ),
   (
     612,
@@ -6142,7 +6142,7 @@ values
     7,
     '2020-10-04 00:00:00',
     6,
-    '-'
+    'wine-acient-coast-caberne'
   ),
   (
     613,
@@ -6152,7 +6152,7 @@ values
     33,
     '2020-07-26 00:00:00',
     5,
-    '-'
+    'shrimp-baby-warm-water-613'
   ),
   (
     614,
@@ -6162,7 +6162,7 @@ values
     57,
     '2021-05-03 00:00:00',
     6,
-    '-'
+    'quiche-assorted'
   ),
   (
     615,
@@ -6172,7 +6172,7 @@ values
     94,
     '2021-04-02 00:00:00',
     4,
-    '-'
+    'appetizer-sausage-rolls-615'
   ),
   (
     616,
@@ -6182,7 +6182,7 @@ values
     79,
     '2020-12-05 00:00:00',
     6,
-    '-'
+    'ecolab-ster-bac'
   ),
   (
     617,
@@ -6192,7 +6192,7 @@ values
     76,
     '2021-06-04 00:00:00',
     3,
-    '-'
+    'olives-black-pitted'
   ),
   (
     618,
@@ -6202,7 +6202,7 @@ values
     36,
     '2020-11-27 00:00:00',
     4,
-    '-'
+    'napkin-beverge-white-2-ply'
   ),
   (
     619,
@@ -6212,7 +6212,7 @@ values
     33,
     '2020-09-02 00:00:00',
     5,
-    '-'
+    'wine-charddonnay-errazuriz'
   ),
   (
     620,
@@ -6222,7 +6222,7 @@ values
     95,
     '2021-06-08 00:00:00',
     4,
-    '-'
+    'oil-safflower'
   ),
   (
     621,
@@ -6232,7 +6232,7 @@ values
     77,
     '2021-05-31 00:00:00',
     6,
-    '-'
+    'bread-dark-rye'
   ),
   (
     622,
@@ -6242,7 +6242,7 @@ values
     14,
     '2020-07-12 00:00:00',
     3,
-    '-'
+    'ginger-ground'
   ),
   (
     623,
@@ -6252,7 +6252,7 @@ values
     68,
     '2021-01-19 00:00:00',
     5,
-    '-'
+    'cucumber-english'
   ),
   (
     624,
@@ -6262,7 +6262,7 @@ values
     48,
     '2021-01-20 00:00:00',
     4,
-    '-'
+    'sterno-chafing-dish-fuel'
   ),
   (
     625,
@@ -6272,7 +6272,7 @@ values
     30,
     '2021-04-23 00:00:00',
     3,
-    '-'
+    'soup-knorr-chicken-noodle'
   ),
   (
     626,
@@ -6282,7 +6282,7 @@ values
     52,
     '2020-11-17 00:00:00',
     5,
-    '-'
+    'rum-light-captain-morgan'
   ),
   (
     627,
@@ -6292,7 +6292,7 @@ values
     38,
     '2020-07-04 00:00:00',
     4,
-    '-'
+    'wine-zinfandel-california-2002'
   ),
   (
     628,
@@ -6302,7 +6302,7 @@ values
     35,
     '2020-09-30 00:00:00',
     4,
-    '-'
+    'pasta-linguini-dry'
   ),
   (
     629,
@@ -6312,7 +6312,7 @@ values
     66,
     '2020-06-21 00:00:00',
     3,
-    '-'
+    'juice-peach-nectar-629'
   ),
   (
     630,
@@ -6322,7 +6322,7 @@ values
     13,
     '2021-02-13 00:00:00',
     4,
-    '-'
+    'beef-roasted-cooked'
   ),
   (
     631,
@@ -6332,7 +6332,7 @@ values
     89,
     '2020-09-14 00:00:00',
     5,
-    '-'
+    'icecream-cone-areo-chocolate'
   ),
   (
     632,
@@ -6342,7 +6342,7 @@ values
     92,
     '2020-06-14 00:00:00',
     3,
-    '-'
+    'wine-maipo-valle-cabernet'
   ),
   (
     633,
@@ -6352,7 +6352,7 @@ values
     12,
     '2021-01-07 00:00:00',
     4,
-    '-'
+    'lamb-rack-frenched-australian'
   ),
   (
     634,
@@ -6362,7 +6362,7 @@ values
     30,
     '2021-02-06 00:00:00',
     5,
-    '-'
+    'wine-spumante-bambino-white'
   ),
   (
     635,
@@ -6372,7 +6372,7 @@ values
     54,
     '2021-05-22 00:00:00',
     3,
-    '-'
+    'sauce-white-mix'
   ),
   (
     636,
@@ -6382,7 +6382,7 @@ values
     42,
     '2021-01-12 00:00:00',
     5,
-    '-'
+    'calypso-black-cherry-lemonade'
   ),
   (
     637,
@@ -6392,7 +6392,7 @@ values
     85,
     '2021-04-15 00:00:00',
     6,
-    '-'
+    'flour-strong-pizza-637'
   ),
   (
     638,
@@ -6402,7 +6402,7 @@ values
     74,
     '2021-05-31 00:00:00',
     4,
-    '-'
+    'ecolab-hand-soap-form-antibac-638'
   ),
   (
     639,
@@ -6412,7 +6412,7 @@ values
     91,
     '2021-03-05 00:00:00',
     6,
-    '-'
+    'nori-sea-weed'
   ),
   (
     640,
@@ -6422,7 +6422,7 @@ values
     43,
     '2020-10-03 00:00:00',
     5,
-    '-'
+    'bread-calabrese-baguette-640'
   ),
   (
     641,
@@ -6432,7 +6432,7 @@ values
     31,
     '2020-09-13 00:00:00',
     3,
-    '-'
+    'tea-earl-grey'
   ),
   (
     642,
@@ -6442,7 +6442,7 @@ values
     55,
     '2020-06-27 00:00:00',
     3,
-    '-'
+    'capicola-hot'
   ),
   (
     643,
@@ -6452,7 +6452,7 @@ values
     76,
     '2020-12-19 00:00:00',
     6,
-    '-'
+    'chinese-foods-chicken'
   ),
   (
     644,
@@ -6462,7 +6462,7 @@ values
     21,
     '2021-04-02 00:00:00',
     5,
-    '-'
+    'bread-french-stick-644'
   ),
   (
     645,
@@ -6472,7 +6472,7 @@ values
     64,
     '2020-07-06 00:00:00',
     5,
-    '-'
+    'sprouts-onion-645'
   ),
   (
     646,
@@ -6482,7 +6482,7 @@ values
     42,
     '2020-10-31 00:00:00',
     6,
-    '-'
+    'pastry-french-mini-assorted'
   ),
   (
     647,
@@ -6492,7 +6492,7 @@ values
     78,
     '2020-06-13 00:00:00',
     5,
-    '-'
+    'star-anise-whole'
   ),
   (
     648,
@@ -6502,7 +6502,7 @@ values
     82,
     '2020-07-16 00:00:00',
     5,
-    '-'
+    '7up-diet-355-ml'
   ),
   (
     649,
@@ -6512,7 +6512,7 @@ values
     69,
     '2021-02-08 00:00:00',
     4,
-    '-'
+    'rabbit-saddles'
   ),
   (
     650,
@@ -6522,7 +6522,7 @@ values
     89,
     '2021-01-11 00:00:00',
     6,
-    '-'
+    'sour-puss-tangerine-650'
   ),
   (
     651,
@@ -6532,7 +6532,7 @@ values
     82,
     '2021-02-12 00:00:00',
     4,
-    '-'
+    'potato-sweet-651'
   ),
   (
     652,
@@ -6542,7 +6542,7 @@ values
     98,
     '2020-09-07 00:00:00',
     6,
-    '-'
+    'nantucket-kiwi-berry-cktl'
   ),
   (
     653,
@@ -6552,7 +6552,7 @@ values
     21,
     '2021-02-16 00:00:00',
     5,
-    '-'
+    'wine-ej-gallo-sierra-valley'
   ),
   (
     654,
@@ -6562,7 +6562,7 @@ values
     93,
     '2021-05-01 00:00:00',
     5,
-    '-'
+    'onions-red-pearl-654'
   ),
   (
     655,
@@ -6572,7 +6572,7 @@ values
     14,
     '2020-08-07 00:00:00',
     4,
-    '-'
+    'soy-protein'
   ),
   (
     656,
@@ -6582,7 +6582,7 @@ values
     14,
     '2020-11-06 00:00:00',
     4,
-    '-'
+    'sauce-marinara'
   ),
   (
     657,
@@ -6592,7 +6592,7 @@ values
     95,
     '2020-11-25 00:00:00',
     3,
-    '-'
+    'salt-sea'
   ),
   (
     658,
@@ -6602,7 +6602,7 @@ values
     21,
     '2020-10-09 00:00:00',
     4,
-    '-'
+    'wine-jafflin-bourgongone'
   ),
   (
     659,
@@ -6612,7 +6612,7 @@ values
     76,
     '2020-09-06 00:00:00',
     4,
-    '-'
+    'hot-choc-vending-659'
   ),
   (
     660,
@@ -6622,7 +6622,7 @@ values
     57,
     '2020-06-19 00:00:00',
     4,
-    '-'
+    'amaretto'
   ),
   (
     661,
@@ -6632,7 +6632,7 @@ values
     31,
     '2020-09-19 00:00:00',
     4,
-    '-'
+    'garlic-primerba-paste-661'
   ),
   (
     662,
@@ -6642,7 +6642,7 @@ values
     83,
     '2020-08-01 00:00:00',
     3,
-    '-'
+    'ecolab-silver-fusion'
   ),
   (
     663,
@@ -6652,7 +6652,7 @@ values
     97,
     '2020-08-25 00:00:00',
     5,
-    '-'
+    'raisin-golden-663'
   ),
   (
     664,
@@ -6662,7 +6662,7 @@ values
     8,
     '2020-09-12 00:00:00',
     5,
-    '-'
+    'lettuce-sea-sea-asparagus'
   ),
   (
     665,
@@ -6672,7 +6672,7 @@ values
     23,
     '2020-06-18 00:00:00',
     3,
-    '-'
+    'wine-red-gamay-noir'
   ),
   (
     666,
@@ -6682,7 +6682,7 @@ values
     74,
     '2020-07-09 00:00:00',
     5,
-    '-'
+    'coffee-decafenated-666'
   ),
   (
     667,
@@ -6692,7 +6692,7 @@ values
     53,
     '2021-06-08 00:00:00',
     6,
-    '-'
+    'mix-cocktail-strawberry-daiquiri'
   ),
   (
     668,
@@ -6702,7 +6702,7 @@ values
     44,
     '2021-05-27 00:00:00',
     3,
-    '-'
+    'carbonated-water-strawberry'
   ),
   (
     669,
@@ -6712,7 +6712,7 @@ values
     41,
     '2020-07-12 00:00:00',
     6,
-    '-'
+    'pepper-red-bell'
   ),
   (
     670,
@@ -6722,7 +6722,7 @@ values
     56,
     '2021-05-19 00:00:00',
     3,
-    '-'
+    'ham-black-forest-670'
   ),
   (
     671,
@@ -6732,7 +6732,7 @@ values
     79,
     '2020-08-03 00:00:00',
     5,
-    '-'
+    'cakes-assorted'
   ),
   (
     672,
@@ -6742,7 +6742,7 @@ values
     31,
     '2021-05-23 00:00:00',
     3,
-    '-'
+    'wine-domaine-boyar-royal-672'
   ),
   (
     673,
@@ -6752,7 +6752,7 @@ values
     42,
     '2020-12-13 00:00:00',
     6,
-    '-'
+    'cheese-briedanish'
   ),
   (
     674,
@@ -6762,7 +6762,7 @@ values
     60,
     '2021-02-09 00:00:00',
     6,
-    '-'
+    'bread-kimel-stick-poly'
   ),
   (
     675,
@@ -6772,7 +6772,7 @@ values
     18,
     '2020-10-01 00:00:00',
     4,
-    '-'
+    'tomato-green'
   ),
   (
     676,
@@ -6782,7 +6782,7 @@ values
     5,
     '2021-05-04 00:00:00',
     6,
-    '-'
+    'extract-lemon'
   ),
   (
     677,
@@ -6792,7 +6792,7 @@ values
     5,
     '2021-04-09 00:00:00',
     6,
-    '-'
+    'tea-orange-pekoe-677'
   ),
   (
     678,
@@ -6802,7 +6802,7 @@ values
     24,
     '2020-12-08 00:00:00',
     6,
-    '-'
+    'langers-mango-nectar'
   ),
   (
     679,
@@ -6812,7 +6812,7 @@ values
     58,
     '2020-06-20 00:00:00',
     6,
-    '-'
+    'apple-delicious-red'
   ),
   (
     680,
@@ -6822,7 +6822,7 @@ values
     88,
     '2021-04-28 00:00:00',
     5,
-    '-'
+    'cleaner-bleach'
   ),
   (
     681,
@@ -6832,7 +6832,7 @@ values
     13,
     '2021-06-06 00:00:00',
     3,
-    '-'
+    'spinach-packaged'
   ),
   (
     682,
@@ -6842,7 +6842,7 @@ values
     97,
     '2021-05-29 00:00:00',
     6,
-    '-'
+    'bacardi-breezer-strawberry'
   ),
   (
     683,
@@ -6852,7 +6852,7 @@ values
     13,
     '2020-08-29 00:00:00',
     5,
-    '-'
+    'sobe-green-tea'
   ),
   (
     684,
@@ -6862,7 +6862,7 @@ values
     68,
     '2021-05-04 00:00:00',
     6,
-    '-'
+    'butter-salted-micro'
   ),
   (
     685,
@@ -6872,7 +6872,7 @@ values
     77,
     '2021-01-19 00:00:00',
     5,
-    '-'
+    'spic-and-span-all-purpose'
   ),
   (
     686,
@@ -6882,7 +6882,7 @@ values
     32,
     '2021-06-06 00:00:00',
     6,
-    '-'
+    'milkettes-2-686'
   ),
   (
     687,
@@ -6892,7 +6892,7 @@ values
     82,
     '2020-12-07 00:00:00',
     6,
-    '-'
+    'quail-eggs-canned'
   ),
   (
     688,
@@ -6902,7 +6902,7 @@ values
     0,
     '2021-04-12 00:00:00',
     4,
-    '-'
+    'soap-pine-sol-floor-cleaner'
   ),
   (
     689,
@@ -6912,7 +6912,7 @@ values
     49,
     '2020-08-17 00:00:00',
     3,
-    '-'
+    'pail-15l-white-with-handle'
   ),
   (
     690,
@@ -6922,7 +6922,7 @@ values
     23,
     '2020-11-28 00:00:00',
     4,
-    '-'
+    'flounder-fresh'
   ),
   (
     691,
@@ -6932,7 +6932,7 @@ values
     52,
     '2020-06-11 00:00:00',
     3,
-    '-'
+    'vol-au-vents-691'
   ),
   (
     692,
@@ -6942,7 +6942,7 @@ values
     93,
     '2021-03-28 00:00:00',
     3,
-    '-'
+    'tea-honey-green-tea-692'
   ),
   (
     693,
@@ -6952,7 +6952,7 @@ values
     11,
     '2021-05-23 00:00:00',
     6,
-    '-'
+    'nectarines-693'
   ),
   (
     694,
@@ -6962,7 +6962,7 @@ values
     52,
     '2020-07-28 00:00:00',
     5,
-    '-'
+    'bagels-poppyseed-694'
   ),
   (
     695,
@@ -6972,7 +6972,7 @@ values
     67,
     '2021-01-03 00:00:00',
     3,
-    '-'
+    'table-cloth-53x69-white'
   ),
   (
     696,
@@ -6982,7 +6982,7 @@ values
     47,
     '2020-10-24 00:00:00',
     4,
-    '-'
+    'wine-balbach-riverside'
   ),
   (
     697,
@@ -6992,7 +6992,7 @@ values
     46,
     '2020-07-07 00:00:00',
     3,
-    '-'
+    'bread-country-roll'
   ),
   (
     698,
@@ -7002,7 +7002,7 @@ values
     75,
     '2020-11-02 00:00:00',
     5,
-    '-'
+    'wine-tio-pepe-sherry-fino-698'
   ),
   (
     699,
@@ -7012,7 +7012,7 @@ values
     14,
     '2020-07-15 00:00:00',
     6,
-    '-'
+    'curry-paste-madras'
   ),
   (
     700,
@@ -7022,7 +7022,7 @@ values
     98,
     '2020-07-20 00:00:00',
     5,
-    '-'
+    'lime-cordial-roses'
   ),
   (
     701,
@@ -7032,7 +7032,7 @@ values
     44,
     '2020-11-18 00:00:00',
     4,
-    '-'
+    'fish-halibut-cold-smoked'
   ),
   (
     702,
@@ -7042,7 +7042,7 @@ values
     36,
     '2020-09-10 00:00:00',
     5,
-    '-'
+    'veal-ground'
   ),
   (
     703,
@@ -7052,7 +7052,7 @@ values
     94,
     '2020-11-26 00:00:00',
     3,
-    '-'
+    'marsala-sperone-fine-doc-703'
   ),
   (
     704,
@@ -7062,7 +7062,7 @@ values
     76,
     '2020-12-17 00:00:00',
     3,
-    '-'
+    'tabasco-sauce-2-oz'
   ),
   (
     705,
@@ -7072,7 +7072,7 @@ values
     4,
     '2020-09-14 00:00:00',
     5,
-    '-'
+    'uniform-linen-charge'
   ),
   (
     706,
@@ -7082,7 +7082,7 @@ values
     41,
     '2020-08-26 00:00:00',
     4,
-    '-'
+    'soup-campbells-beef-noodle'
   ),
   (
     707,
@@ -7092,7 +7092,7 @@ values
     44,
     '2020-11-26 00:00:00',
     3,
-    '-'
+    'salmon-atlantic-no-skin-707'
   ),
   (
     708,
@@ -7102,7 +7102,7 @@ values
     58,
     '2020-09-15 00:00:00',
     6,
-    '-'
+    'rice-jasmine-sented'
   ),
   (
     709,
@@ -7112,7 +7112,7 @@ values
     28,
     '2020-11-02 00:00:00',
     6,
-    '-'
+    'wine-la-vielle-ferme-cote-du'
   ),
   (
     710,
@@ -7122,7 +7122,7 @@ values
     35,
     '2020-07-18 00:00:00',
     4,
-    '-'
+    'juice-apple-341-ml'
   ),
   (
     711,
@@ -7132,7 +7132,7 @@ values
     68,
     '2020-09-04 00:00:00',
     6,
-    '-'
+    'lemon-balm-fresh-711'
   ),
   (
     712,
@@ -7142,7 +7142,7 @@ values
     89,
     '2020-07-08 00:00:00',
     5,
-    '-'
+    'garlic-primerba-paste-712'
   ),
   (
     713,
@@ -7152,7 +7152,7 @@ values
     75,
     '2020-07-17 00:00:00',
     6,
-    '-'
+    'chocolate-milk-callets'
   ),
   (
     714,
@@ -7162,7 +7162,7 @@ values
     72,
     '2021-01-26 00:00:00',
     3,
-    '-'
+    'dill-weed-dry-714'
   ),
   (
     715,
@@ -7172,7 +7172,7 @@ values
     7,
     '2020-11-05 00:00:00',
     5,
-    '-'
+    'beef-montreal-smoked-brisket-715'
   ),
   (
     716,
@@ -7182,7 +7182,7 @@ values
     17,
     '2021-04-13 00:00:00',
     6,
-    '-'
+    'vaccum-bag-14x20-716'
   ),
   (
     717,
@@ -7192,7 +7192,7 @@ values
     4,
     '2020-07-29 00:00:00',
     6,
-    '-'
+    'soap-mrclean-floor-soap-717'
   ),
   (
     718,
@@ -7202,7 +7202,7 @@ values
     12,
     '2020-12-27 00:00:00',
     4,
-    '-'
+    'sauce-apple-unsweetened'
   ),
   (
     719,
@@ -7212,7 +7212,7 @@ values
     49,
     '2020-12-14 00:00:00',
     4,
-    '-'
+    'crush-grape-355-ml'
   ),
   (
     720,
@@ -7222,7 +7222,7 @@ values
     4,
     '2020-08-26 00:00:00',
     3,
-    '-'
+    'cornstarch'
   ),
   (
     721,
@@ -7232,7 +7232,7 @@ values
     91,
     '2021-02-22 00:00:00',
     6,
-    '-'
+    'dip-tapenade-721'
   ),
   (
     722,
@@ -7242,7 +7242,7 @@ values
     44,
     '2021-03-26 00:00:00',
     4,
-    '-'
+    'chicken-livers'
   ),
   (
     723,
@@ -7252,7 +7252,7 @@ values
     17,
     '2021-04-06 00:00:00',
     4,
-    '-'
+    'wine-casillero-deldiablo'
   ),
   (
     724,
@@ -7262,7 +7262,7 @@ values
     76,
     '2020-10-27 00:00:00',
     6,
-    '-'
+    'lambcasing-724'
   ),
   (
     725,
@@ -7272,7 +7272,7 @@ values
     21,
     '2020-09-10 00:00:00',
     6,
-    '-'
+    'salmon-steak-cohoe-8-oz-725'
   ),
   (
     726,
@@ -7282,7 +7282,7 @@ values
     85,
     '2021-03-25 00:00:00',
     4,
-    '-'
+    'cheese-fontina'
   ),
   (
     727,
@@ -7292,7 +7292,7 @@ values
     52,
     '2020-10-04 00:00:00',
     5,
-    '-'
+    'pails-with-lids'
   ),
   (
     728,
@@ -7302,7 +7302,7 @@ values
     4,
     '2021-01-18 00:00:00',
     3,
-    '-'
+    'pork-smoked-kassler'
   ),
   (
     729,
@@ -7312,7 +7312,7 @@ values
     48,
     '2020-12-19 00:00:00',
     5,
-    '-'
+    'juice-cranberry-341-ml'
   ),
   (
     730,
@@ -7322,7 +7322,7 @@ values
     39,
     '2021-02-25 00:00:00',
     4,
-    '-'
+    'lettuce-red-leaf'
   ),
   (
     731,
@@ -7332,7 +7332,7 @@ values
     83,
     '2020-12-30 00:00:00',
     3,
-    '-'
+    'garbag-bags-black'
   ),
   (
     732,
@@ -7342,7 +7342,7 @@ values
     82,
     '2020-08-09 00:00:00',
     6,
-    '-'
+    'mustard-individual-pkg-732'
   ),
   (
     733,
@@ -7352,7 +7352,7 @@ values
     38,
     '2020-09-15 00:00:00',
     4,
-    '-'
+    'wine-white-gewurtzraminer'
   ),
   (
     734,
@@ -7362,7 +7362,7 @@ values
     82,
     '2021-03-25 00:00:00',
     5,
-    '-'
+    'tea-black-currant'
   ),
   (
     735,
@@ -7372,7 +7372,7 @@ values
     44,
     '2020-08-23 00:00:00',
     6,
-    '-'
+    'chicken-whole-fryers-735'
   ),
   (
     736,
@@ -7382,7 +7382,7 @@ values
     93,
     '2020-11-11 00:00:00',
     6,
-    '-'
+    'iced-tea-lemon-460-ml-736'
   ),
   (
     737,
@@ -7392,7 +7392,7 @@ values
     73,
     '2021-03-02 00:00:00',
     6,
-    '-'
+    'anchovy-paste-56-g-tube'
   ),
   (
     738,
@@ -7402,7 +7402,7 @@ values
     46,
     '2021-01-15 00:00:00',
     5,
-    '-'
+    'spice-chili-powder-mexican-738'
   ),
   (
     739,
@@ -7412,7 +7412,7 @@ values
     46,
     '2020-07-09 00:00:00',
     4,
-    '-'
+    'milk-buttermilk'
   ),
   (
     740,
@@ -7422,7 +7422,7 @@ values
     6,
     '2021-01-19 00:00:00',
     6,
-    '-'
+    'teriyaki-sauce'
   ),
   (
     741,
@@ -7432,7 +7432,7 @@ values
     8,
     '2021-04-25 00:00:00',
     6,
-    '-'
+    'mcgillicuddy-vanilla-schnap'
   ),
   (
     742,
@@ -7442,7 +7442,7 @@ values
     0,
     '2020-10-24 00:00:00',
     5,
-    '-'
+    'syrup-monin-blue-curacao'
   ),
   (
     743,
@@ -7452,7 +7452,7 @@ values
     46,
     '2020-07-05 00:00:00',
     6,
-    '-'
+    'bagels-poppyseed-743'
   ),
   (
     744,
@@ -7462,7 +7462,7 @@ values
     63,
     '2020-10-21 00:00:00',
     5,
-    '-'
+    'bread-focaccia-quarter'
   ),
   (
     745,
@@ -7472,7 +7472,7 @@ values
     75,
     '2020-06-20 00:00:00',
     4,
-    '-'
+    'quinoa'
   ),
   (
     746,
@@ -7482,7 +7482,7 @@ values
     26,
     '2020-12-02 00:00:00',
     6,
-    '-'
+    'eggplant-regular'
   ),
   (
     747,
@@ -7492,7 +7492,7 @@ values
     22,
     '2020-08-26 00:00:00',
     6,
-    '-'
+    'bagels-poppyseed-747'
   ),
   (
     748,
@@ -7502,7 +7502,7 @@ values
     93,
     '2020-09-13 00:00:00',
     6,
-    '-'
+    'bread-hamburger-buns-748'
   ),
   (
     749,
@@ -7512,7 +7512,7 @@ values
     49,
     '2021-04-09 00:00:00',
     5,
-    '-'
+    'bread-roll-calabrese'
   ),
   (
     750,
@@ -7522,7 +7522,7 @@ values
     81,
     '2021-02-06 00:00:00',
     3,
-    '-'
+    'apricots-dried'
   ),
   (
     751,
@@ -7532,7 +7532,7 @@ values
     17,
     '2020-12-27 00:00:00',
     3,
-    '-'
+    'tea-mint'
   ),
   (
     752,
@@ -7542,7 +7542,7 @@ values
     24,
     '2021-04-20 00:00:00',
     4,
-    '-'
+    'beef-shank-752'
   ),
   (
     753,
@@ -7552,7 +7552,7 @@ values
     81,
     '2020-11-25 00:00:00',
     4,
-    '-'
+    'soup-beef-base-mix-753'
   ),
   (
     754,
@@ -7562,7 +7562,7 @@ values
     3,
     '2020-07-23 00:00:00',
     5,
-    '-'
+    'horseradish-prepared'
   ),
   (
     755,
@@ -7572,7 +7572,7 @@ values
     53,
     '2020-12-12 00:00:00',
     5,
-    '-'
+    'snapple-raspberry-tea'
   ),
   (
     756,
@@ -7582,7 +7582,7 @@ values
     93,
     '2021-05-06 00:00:00',
     3,
-    '-'
+    'pastry-apple-muffins-mini'
   ),
   (
     757,
@@ -7592,7 +7592,7 @@ values
     78,
     '2020-08-03 00:00:00',
     6,
-    '-'
+    'cheese-cheddar-old-white'
   ),
   (
     758,
@@ -7602,7 +7602,7 @@ values
     3,
     '2020-10-04 00:00:00',
     5,
-    '-'
+    'syrup-monin-granny-smith'
   ),
   (
     759,
@@ -7612,7 +7612,7 @@ values
     78,
     '2021-02-19 00:00:00',
     4,
-    '-'
+    'cinnamon-rolls'
   ),
   (
     760,
@@ -7622,7 +7622,7 @@ values
     32,
     '2020-06-25 00:00:00',
     5,
-    '-'
+    'sparkling-wine-rose-freixenet-760'
   ),
   (
     761,
@@ -7632,7 +7632,7 @@ values
     1,
     '2020-10-26 00:00:00',
     6,
-    '-'
+    'sultanas-761'
   ),
   (
     762,
@@ -7642,7 +7642,7 @@ values
     5,
     '2021-04-24 00:00:00',
     3,
-    '-'
+    'pepper-green'
   ),
   (
     763,
@@ -7652,7 +7652,7 @@ values
     35,
     '2021-01-27 00:00:00',
     4,
-    '-'
+    'cheese-ricotta'
   ),
   (
     764,
@@ -7662,7 +7662,7 @@ values
     74,
     '2021-06-01 00:00:00',
     6,
-    '-'
+    'hot-choc-vending-764'
   ),
   (
     765,
@@ -7672,7 +7672,7 @@ values
     34,
     '2020-11-17 00:00:00',
     3,
-    '-'
+    'tomato-tricolor-cherry'
   ),
   (
     766,
@@ -7682,7 +7682,7 @@ values
     90,
     '2021-05-26 00:00:00',
     4,
-    '-'
+    'cookie-double-choco'
   ),
   (
     767,
@@ -7692,7 +7692,7 @@ values
     81,
     '2021-05-18 00:00:00',
     4,
-    '-'
+    'frangelico-767'
   ),
   (
     768,
@@ -7702,7 +7702,7 @@ values
     89,
     '2020-07-21 00:00:00',
     5,
-    '-'
+    'wine-muscadet-sur-lie'
   ),
   (
     769,
@@ -7712,7 +7712,7 @@ values
     55,
     '2021-01-27 00:00:00',
     5,
-    '-'
+    'steel-wool'
   ),
   (
     770,
@@ -7722,7 +7722,7 @@ values
     10,
     '2021-02-28 00:00:00',
     4,
-    '-'
+    'olives-morracan-dired'
   ),
   (
     771,
@@ -7732,7 +7732,7 @@ values
     37,
     '2020-10-27 00:00:00',
     3,
-    '-'
+    'tomato-puree-771'
   ),
   (
     772,
@@ -7742,7 +7742,7 @@ values
     80,
     '2021-01-08 00:00:00',
     5,
-    '-'
+    'sobe-orange-carrot'
   ),
   (
     773,
@@ -7752,7 +7752,7 @@ values
     18,
     '2020-08-09 00:00:00',
     4,
-    '-'
+    'beef-wellington'
   ),
   (
     774,
@@ -7762,7 +7762,7 @@ values
     12,
     '2021-01-13 00:00:00',
     3,
-    '-'
+    'table-cloth-90x90-colour'
   ),
   (
     775,
@@ -7772,7 +7772,7 @@ values
     63,
     '2020-12-07 00:00:00',
     6,
-    '-'
+    'flour-semolina-775'
   ),
   (
     776,
@@ -7782,7 +7782,7 @@ values
     70,
     '2021-01-10 00:00:00',
     4,
-    '-'
+    'sobe-berry-energy'
   ),
   (
     777,
@@ -7792,7 +7792,7 @@ values
     60,
     '2020-06-13 00:00:00',
     4,
-    '-'
+    'mcguinness-blue-curacao-777'
   ),
   (
     778,
@@ -7802,7 +7802,7 @@ values
     22,
     '2021-01-18 00:00:00',
     4,
-    '-'
+    'bag-stand'
   ),
   (
     779,
@@ -7812,7 +7812,7 @@ values
     18,
     '2020-12-13 00:00:00',
     3,
-    '-'
+    'waffle-stix'
   ),
   (
     780,
@@ -7822,7 +7822,7 @@ values
     2,
     '2020-12-25 00:00:00',
     6,
-    '-'
+    'bread-frozen-basket-variety'
   ),
   (
     781,
@@ -7832,7 +7832,7 @@ values
     47,
     '2021-01-16 00:00:00',
     6,
-    '-'
+    'wine-shiraz-south-eastern'
   ),
   (
     782,
@@ -7842,7 +7842,7 @@ values
     43,
     '2021-06-07 00:00:00',
     5,
-    '-'
+    'wine-jaboulet-cotes-du-rhone-782'
   ),
   (
     783,
@@ -7852,7 +7852,7 @@ values
     64,
     '2021-03-20 00:00:00',
     4,
-    '-'
+    'bandage-finger-cots'
   ),
   (
     784,
@@ -7862,7 +7862,7 @@ values
     71,
     '2020-11-28 00:00:00',
     5,
-    '-'
+    'bread-ww-cluster-784'
   ),
   (
     785,
@@ -7872,7 +7872,7 @@ values
     26,
     '2020-10-15 00:00:00',
     5,
-    '-'
+    'sauce-plum-785'
   ),
   (
     786,
@@ -7882,7 +7882,7 @@ values
     57,
     '2020-11-03 00:00:00',
     4,
-    '-'
+    'salmon-atlantic-skin-on'
   ),
   (
     787,
@@ -7892,7 +7892,7 @@ values
     87,
     '2020-11-30 00:00:00',
     5,
-    '-'
+    'tea-decaf-lipton'
   ),
   (
     788,
@@ -7902,7 +7902,7 @@ values
     63,
     '2021-05-25 00:00:00',
     6,
-    '-'
+    'cake-cake-sheet-macaroon'
   ),
   (
     789,
@@ -7912,7 +7912,7 @@ values
     61,
     '2021-04-21 00:00:00',
     4,
-    '-'
+    'wine-magnotta-merlot-sr-vqa'
   ),
   (
     790,
@@ -7922,7 +7922,7 @@ values
     47,
     '2020-09-02 00:00:00',
     6,
-    '-'
+    'apples-spartan-790'
   ),
   (
     791,
@@ -7932,7 +7932,7 @@ values
     68,
     '2020-09-12 00:00:00',
     3,
-    '-'
+    'pie-box-cello-window-25-791'
   ),
   (
     792,
@@ -7942,7 +7942,7 @@ values
     53,
     '2021-04-23 00:00:00',
     6,
-    '-'
+    'spice-peppercorn-melange-792'
   ),
   (
     793,
@@ -7952,7 +7952,7 @@ values
     74,
     '2021-05-20 00:00:00',
     6,
-    '-'
+    'cherries-bing-canned'
   ),
   (
     794,
@@ -7962,7 +7962,7 @@ values
     70,
     '2020-09-26 00:00:00',
     6,
-    '-'
+    'bread-english-muffin'
   ),
   (
     795,
@@ -7972,7 +7972,7 @@ values
     81,
     '2021-04-24 00:00:00',
     3,
-    '-'
+    'trueblue-blueberry'
   ),
   (
     796,
@@ -7982,7 +7982,7 @@ values
     53,
     '2020-10-24 00:00:00',
     5,
-    '-'
+    'longos-penne-with-pesto'
   ),
   (
     797,
@@ -7992,7 +7992,7 @@ values
     97,
     '2020-09-04 00:00:00',
     6,
-    '-'
+    'lamb-loin-trimmed-boneless'
   ),
   (
     798,
@@ -8002,7 +8002,7 @@ values
     84,
     '2021-02-17 00:00:00',
     3,
-    '-'
+    'wine-rioja-campo-viejo'
   ),
   (
     799,
@@ -8012,7 +8012,7 @@ values
     66,
     '2020-09-15 00:00:00',
     3,
-    '-'
+    'loquat'
   ),
   (
     800,
@@ -8022,7 +8022,7 @@ values
     89,
     '2020-10-28 00:00:00',
     3,
-    '-'
+    'hold-up-tool-storage-rack'
   ),
   (
     801,
@@ -8032,7 +8032,7 @@ values
     61,
     '2020-07-25 00:00:00',
     4,
-    '-'
+    'parsley-dried'
   ),
   (
     802,
@@ -8042,7 +8042,7 @@ values
     58,
     '2020-12-23 00:00:00',
     6,
-    '-'
+    'plasticforkblack'
   ),
   (
     803,
@@ -8052,7 +8052,7 @@ values
     59,
     '2020-12-09 00:00:00',
     4,
-    '-'
+    'potato-sweet-803'
   ),
   (
     804,
@@ -8062,7 +8062,7 @@ values
     91,
     '2021-01-02 00:00:00',
     6,
-    '-'
+    'coffee-cafe-moreno'
   ),
   (
     805,
@@ -8072,7 +8072,7 @@ values
     59,
     '2021-03-23 00:00:00',
     3,
-    '-'
+    'wine-red-colio-cabernet'
   ),
   (
     806,
@@ -8082,7 +8082,7 @@ values
     23,
     '2020-11-23 00:00:00',
     4,
-    '-'
+    'ostrich-fan-fillet'
   ),
   (
     807,
@@ -8092,7 +8092,7 @@ values
     90,
     '2021-05-04 00:00:00',
     3,
-    '-'
+    'green-tea-refresher'
   ),
   (
     808,
@@ -8102,7 +8102,7 @@ values
     18,
     '2021-02-03 00:00:00',
     6,
-    '-'
+    'flour-rye'
   ),
   (
     809,
@@ -8112,7 +8112,7 @@ values
     81,
     '2020-09-11 00:00:00',
     6,
-    '-'
+    'sugar-thermometer'
   ),
   (
     810,
@@ -8122,7 +8122,7 @@ values
     67,
     '2021-02-20 00:00:00',
     3,
-    '-'
+    'wine-tio-pepe-sherry-fino-810'
   ),
   (
     811,
@@ -8132,7 +8132,7 @@ values
     96,
     '2021-01-17 00:00:00',
     3,
-    '-'
+    'cassis'
   ),
   (
     812,
@@ -8142,7 +8142,7 @@ values
     84,
     '2021-01-19 00:00:00',
     6,
-    '-'
+    'ice-cream-super-sandwich'
   ),
   (
     813,
@@ -8152,7 +8152,7 @@ values
     73,
     '2021-05-26 00:00:00',
     3,
-    '-'
+    'sauce-salsa-813'
   ),
   (
     814,
@@ -8162,7 +8162,7 @@ values
     87,
     '2021-03-05 00:00:00',
     3,
-    '-'
+    'jerusalem-artichoke'
   ),
   (
     815,
@@ -8172,7 +8172,7 @@ values
     45,
     '2020-06-22 00:00:00',
     6,
-    '-'
+    'juice-prune'
   ),
   (
     816,
@@ -8182,7 +8182,7 @@ values
     89,
     '2020-09-05 00:00:00',
     5,
-    '-'
+    'lamb-sausage-casings'
   ),
   (
     817,
@@ -8192,7 +8192,7 @@ values
     39,
     '2021-02-14 00:00:00',
     4,
-    '-'
+    'cleaner-lime-away-817'
   ),
   (
     818,
@@ -8202,7 +8202,7 @@ values
     93,
     '2020-08-20 00:00:00',
     4,
-    '-'
+    'flour-dark-rye-818'
   ),
   (
     819,
@@ -8212,7 +8212,7 @@ values
     55,
     '2021-01-16 00:00:00',
     3,
-    '-'
+    'chef-hat-20cm'
   ),
   (
     820,
@@ -8222,7 +8222,7 @@ values
     26,
     '2021-02-25 00:00:00',
     4,
-    '-'
+    'pork-sausage-medium-820'
   ),
   (
     821,
@@ -8232,7 +8232,7 @@ values
     68,
     '2021-03-20 00:00:00',
     5,
-    '-'
+    'iced-tea-lemon-460-ml-821'
   ),
   (
     822,
@@ -8242,7 +8242,7 @@ values
     27,
     '2021-01-28 00:00:00',
     5,
-    '-'
+    'lobak'
   ),
   (
     823,
@@ -8252,7 +8252,7 @@ values
     50,
     '2021-04-02 00:00:00',
     3,
-    '-'
+    'juice-apple-500-ml-823'
   ),
   (
     824,
@@ -8262,7 +8262,7 @@ values
     61,
     '2021-01-17 00:00:00',
     4,
-    '-'
+    'cheese-la-sauvagine-824'
   ),
   (
     825,
@@ -8272,7 +8272,7 @@ values
     62,
     '2020-07-28 00:00:00',
     5,
-    '-'
+    'plasticknivesblack'
   ),
   (
     826,
@@ -8282,7 +8282,7 @@ values
     65,
     '2020-10-29 00:00:00',
     3,
-    '-'
+    'broom-push'
   ),
   (
     827,
@@ -8292,7 +8292,7 @@ values
     66,
     '2020-06-30 00:00:00',
     6,
-    '-'
+    'cookies-assorted'
   ),
   (
     828,
@@ -8302,7 +8302,7 @@ values
     29,
     '2021-04-27 00:00:00',
     5,
-    '-'
+    'shrimp-150-250'
   ),
   (
     829,
@@ -8312,7 +8312,7 @@ values
     44,
     '2020-11-05 00:00:00',
     6,
-    '-'
+    'toamtoes-6x7-select'
   ),
   (
     830,
@@ -8322,7 +8322,7 @@ values
     100,
     '2020-10-04 00:00:00',
     5,
-    '-'
+    'duck-breast'
   ),
   (
     831,
@@ -8332,7 +8332,7 @@ values
     68,
     '2020-07-25 00:00:00',
     3,
-    '-'
+    'spice-chili-powder-mexican-831'
   ),
   (
     832,
@@ -8342,7 +8342,7 @@ values
     27,
     '2020-10-01 00:00:00',
     5,
-    '-'
+    'mushroom-chanterelle-frozen'
   ),
   (
     833,
@@ -8352,7 +8352,7 @@ values
     31,
     '2021-05-31 00:00:00',
     6,
-    '-'
+    'wine-red-gallo-merlot'
   ),
   (
     834,
@@ -8362,7 +8362,7 @@ values
     10,
     '2020-11-18 00:00:00',
     3,
-    '-'
+    'wine-puligny-montrachet-a'
   ),
   (
     835,
@@ -8372,7 +8372,7 @@ values
     42,
     '2020-07-22 00:00:00',
     5,
-    '-'
+    'sole-dover-whole-fresh-835'
   ),
   (
     836,
@@ -8382,7 +8382,7 @@ values
     15,
     '2021-02-16 00:00:00',
     6,
-    '-'
+    'pork-ham-prager'
   ),
   (
     837,
@@ -8392,7 +8392,7 @@ values
     9,
     '2020-12-17 00:00:00',
     6,
-    '-'
+    'beef-sushi-flat-iron-steak'
   ),
   (
     838,
@@ -8402,7 +8402,7 @@ values
     89,
     '2020-07-24 00:00:00',
     4,
-    '-'
+    'general-purpose-trigger'
   ),
   (
     839,
@@ -8412,7 +8412,7 @@ values
     64,
     '2020-11-13 00:00:00',
     6,
-    '-'
+    'chicken-white-meat-with-tender-839'
   ),
   (
     840,
@@ -8422,7 +8422,7 @@ values
     48,
     '2020-11-23 00:00:00',
     4,
-    '-'
+    'veal-osso-bucco-840'
   ),
   (
     841,
@@ -8432,7 +8432,7 @@ values
     86,
     '2020-07-17 00:00:00',
     5,
-    '-'
+    'soup-beef-conomme-dry-841'
   ),
   (
     842,
@@ -8442,7 +8442,7 @@ values
     43,
     '2021-01-16 00:00:00',
     5,
-    '-'
+    'aromat-spice-seasoning'
   ),
   (
     843,
@@ -8452,7 +8452,7 @@ values
     66,
     '2021-04-07 00:00:00',
     3,
-    '-'
+    'veal-loin'
   ),
   (
     844,
@@ -8462,7 +8462,7 @@ values
     56,
     '2021-04-29 00:00:00',
     5,
-    '-'
+    'beef-cooked-corned-844'
   ),
   (
     845,
@@ -8472,7 +8472,7 @@ values
     26,
     '2020-09-06 00:00:00',
     6,
-    '-'
+    'crawfish'
   ),
   (
     846,
@@ -8482,7 +8482,7 @@ values
     66,
     '2021-01-12 00:00:00',
     3,
-    '-'
+    'pastry-mini-french-pastries'
   ),
   (
     847,
@@ -8492,7 +8492,7 @@ values
     12,
     '2020-12-22 00:00:00',
     3,
-    '-'
+    'food-colouring-green-847'
   ),
   (
     848,
@@ -8502,7 +8502,7 @@ values
     72,
     '2021-03-25 00:00:00',
     6,
-    '-'
+    'chicken-breast-5-7-oz'
   ),
   (
     849,
@@ -8512,7 +8512,7 @@ values
     69,
     '2021-05-03 00:00:00',
     6,
-    '-'
+    'brownies-two-bite-chocolate'
   ),
   (
     850,
@@ -8522,7 +8522,7 @@ values
     11,
     '2020-07-11 00:00:00',
     6,
-    '-'
+    'peppercorns-green'
   ),
   (
     851,
@@ -8532,7 +8532,7 @@ values
     31,
     '2020-11-26 00:00:00',
     5,
-    '-'
+    'beef-dry-aged-tenderloin-aaa'
   ),
   (
     852,
@@ -8542,7 +8542,7 @@ values
     52,
     '2020-10-27 00:00:00',
     4,
-    '-'
+    'soup-cream-of-potato-leek'
   ),
   (
     853,
@@ -8552,7 +8552,7 @@ values
     51,
     '2020-09-02 00:00:00',
     4,
-    '-'
+    'corn-on-the-cob'
   ),
   (
     854,
@@ -8562,7 +8562,7 @@ values
     74,
     '2021-05-03 00:00:00',
     5,
-    '-'
+    'cream-18'
   ),
   (
     855,
@@ -8572,7 +8572,7 @@ values
     91,
     '2021-04-03 00:00:00',
     6,
-    '-'
+    'lobster-cooked'
   ),
   (
     856,
@@ -8582,7 +8582,7 @@ values
     26,
     '2021-06-07 00:00:00',
     3,
-    '-'
+    'pork-hock-and-feet-attached'
   ),
   (
     857,
@@ -8592,7 +8592,7 @@ values
     77,
     '2021-04-02 00:00:00',
     3,
-    '-'
+    'wine-red-marechal-foch'
   ),
   (
     858,
@@ -8602,7 +8602,7 @@ values
     98,
     '2021-05-23 00:00:00',
     6,
-    '-'
+    'salmon-steak-cohoe-8-oz-858'
   ),
   (
     859,
@@ -8612,7 +8612,7 @@ values
     11,
     '2021-03-24 00:00:00',
     4,
-    '-'
+    'salmon-steak-cohoe-8-oz-859'
   ),
   (
     860,
@@ -8622,7 +8622,7 @@ values
     24,
     '2020-07-21 00:00:00',
     6,
-    '-'
+    'onions-vidalia'
   ),
   (
     861,
@@ -8632,7 +8632,7 @@ values
     12,
     '2020-08-29 00:00:00',
     3,
-    '-'
+    'cheese-brick-with-onion-861'
   ),
   (
     862,
@@ -8642,7 +8642,7 @@ values
     41,
     '2020-06-20 00:00:00',
     6,
-    '-'
+    'juice-apple-500-ml-862'
   ),
   (
     863,
@@ -8652,7 +8652,7 @@ values
     60,
     '2021-04-28 00:00:00',
     6,
-    '-'
+    'coffee-cup-12oz-5342cd'
   ),
   (
     864,
@@ -8662,7 +8662,7 @@ values
     94,
     '2021-04-30 00:00:00',
     5,
-    '-'
+    'appetizer-crab-and-brie'
   ),
   (
     865,
@@ -8672,7 +8672,7 @@ values
     6,
     '2020-07-25 00:00:00',
     6,
-    '-'
+    'heavy-duty-dust-pan'
   ),
   (
     866,
@@ -8682,7 +8682,7 @@ values
     6,
     '2021-01-04 00:00:00',
     4,
-    '-'
+    'devonshire-cream'
   ),
   (
     867,
@@ -8692,7 +8692,7 @@ values
     74,
     '2020-07-29 00:00:00',
     5,
-    '-'
+    'soup-chicken-and-wild-rice-867'
   ),
   (
     868,
@@ -8702,7 +8702,7 @@ values
     34,
     '2021-05-09 00:00:00',
     5,
-    '-'
+    'lamb-ground-868'
   ),
   (
     869,
@@ -8712,7 +8712,7 @@ values
     63,
     '2021-02-24 00:00:00',
     4,
-    '-'
+    'nut-walnut-pieces'
   ),
   (
     870,
@@ -8722,7 +8722,7 @@ values
     96,
     '2020-10-12 00:00:00',
     4,
-    '-'
+    'pail-with-metal-handle-16l-white'
   ),
   (
     871,
@@ -8732,7 +8732,7 @@ values
     84,
     '2021-05-24 00:00:00',
     3,
-    '-'
+    'cheese-stilton'
   ),
   (
     872,
@@ -8742,7 +8742,7 @@ values
     50,
     '2020-12-08 00:00:00',
     3,
-    '-'
+    'edible-flower-mixed'
   ),
   (
     873,
@@ -8752,7 +8752,7 @@ values
     60,
     '2021-01-25 00:00:00',
     4,
-    '-'
+    'vinegar-rice'
   ),
   (
     874,
@@ -8762,7 +8762,7 @@ values
     42,
     '2021-04-23 00:00:00',
     4,
-    '-'
+    'jameson-irish-whiskey-874'
   ),
   (
     875,
@@ -8772,7 +8772,7 @@ values
     57,
     '2020-06-30 00:00:00',
     3,
-    '-'
+    'milk-condensed'
   ),
   (
     876,
@@ -8782,7 +8782,7 @@ values
     31,
     '2021-05-06 00:00:00',
     5,
-    '-'
+    'coffee-beans-whole'
   ),
   (
     877,
@@ -8792,7 +8792,7 @@ values
     59,
     '2020-07-15 00:00:00',
     4,
-    '-'
+    'tea-honey-green-tea-877'
   ),
   (
     878,
@@ -8802,7 +8802,7 @@ values
     78,
     '2020-06-18 00:00:00',
     3,
-    '-'
+    'mountain-dew'
   ),
   (
     879,
@@ -8812,7 +8812,7 @@ values
     42,
     '2020-11-24 00:00:00',
     4,
-    '-'
+    'dehydrated-kelp-kombo'
   ),
   (
     880,
@@ -8822,7 +8822,7 @@ values
     36,
     '2020-09-03 00:00:00',
     4,
-    '-'
+    'ham-cooked-italian'
   ),
   (
     881,
@@ -8832,7 +8832,7 @@ values
     14,
     '2020-07-24 00:00:00',
     3,
-    '-'
+    'pasta-penne-rigate-dry'
   ),
   (
     882,
@@ -8842,7 +8842,7 @@ values
     95,
     '2021-01-02 00:00:00',
     4,
-    '-'
+    'vinegar-white-wine'
   ),
   (
     883,
@@ -8852,7 +8852,7 @@ values
     8,
     '2020-12-06 00:00:00',
     3,
-    '-'
+    'chicken-leg-back-attach-883'
   ),
   (
     884,
@@ -8862,7 +8862,7 @@ values
     88,
     '2020-12-31 00:00:00',
     3,
-    '-'
+    'dc-hikiage-hira-huba'
   ),
   (
     885,
@@ -8872,7 +8872,7 @@ values
     79,
     '2020-09-19 00:00:00',
     5,
-    '-'
+    'beets'
   ),
   (
     886,
@@ -8882,7 +8882,7 @@ values
     81,
     '2020-09-06 00:00:00',
     4,
-    '-'
+    'cinnamon-buns-sticky'
   ),
   (
     887,
@@ -8892,7 +8892,7 @@ values
     32,
     '2021-03-19 00:00:00',
     6,
-    '-'
+    'bagels-poppyseed-887'
   ),
   (
     888,
@@ -8902,7 +8902,7 @@ values
     31,
     '2021-01-31 00:00:00',
     3,
-    '-'
+    'pork-loin-boneless'
   ),
   (
     889,
@@ -8912,7 +8912,7 @@ values
     63,
     '2020-07-16 00:00:00',
     5,
-    '-'
+    'broom-and-broom-rack-white'
   ),
   (
     890,
@@ -8922,7 +8922,7 @@ values
     8,
     '2021-01-31 00:00:00',
     4,
-    '-'
+    'filo-dough'
   ),
   (
     891,
@@ -8932,7 +8932,7 @@ values
     99,
     '2021-05-05 00:00:00',
     5,
-    '-'
+    'mushroom-morels-dry'
   ),
   (
     892,
@@ -8942,7 +8942,7 @@ values
     27,
     '2021-01-25 00:00:00',
     6,
-    '-'
+    'milkettes-2-892'
   ),
   (
     893,
@@ -8952,7 +8952,7 @@ values
     73,
     '2021-02-23 00:00:00',
     5,
-    '-'
+    'flour-buckwheat-dark'
   ),
   (
     894,
@@ -8962,7 +8962,7 @@ values
     17,
     '2020-07-29 00:00:00',
     5,
-    '-'
+    'lemonade-island-tea-591-ml'
   ),
   (
     895,
@@ -8972,7 +8972,7 @@ values
     51,
     '2021-03-24 00:00:00',
     5,
-    '-'
+    'cup-8oz-coffee-perforated'
   ),
   (
     896,
@@ -8982,7 +8982,7 @@ values
     60,
     '2021-01-09 00:00:00',
     5,
-    '-'
+    'wine-periguita-fonseca'
   ),
   (
     897,
@@ -8992,7 +8992,7 @@ values
     23,
     '2021-03-14 00:00:00',
     4,
-    '-'
+    'sour-puss-tangerine-897'
   ),
   (
     898,
@@ -9002,7 +9002,7 @@ values
     5,
     '2020-07-03 00:00:00',
     4,
-    '-'
+    'pie-shells-10'
   ),
   (
     899,
@@ -9012,7 +9012,7 @@ values
     70,
     '2020-09-23 00:00:00',
     6,
-    '-'
+    'steampan-lid'
   ),
   (
     900,
@@ -9022,7 +9022,7 @@ values
     40,
     '2020-11-21 00:00:00',
     4,
-    '-'
+    'flower-leather-leaf-fern-900'
   ),
   (
     901,
@@ -9032,7 +9032,7 @@ values
     40,
     '2021-03-10 00:00:00',
     5,
-    '-'
+    'tea-grapefruit-green-tea'
   ),
   (
     902,
@@ -9042,7 +9042,7 @@ values
     22,
     '2020-12-20 00:00:00',
     5,
-    '-'
+    'nacho-chips-902'
   ),
   (
     903,
@@ -9052,7 +9052,7 @@ values
     93,
     '2021-02-24 00:00:00',
     3,
-    '-'
+    'apples-spartan-903'
   ),
   (
     904,
@@ -9062,7 +9062,7 @@ values
     97,
     '2020-07-16 00:00:00',
     4,
-    '-'
+    'salami-genova'
   ),
   (
     905,
@@ -9072,7 +9072,7 @@ values
     32,
     '2020-10-23 00:00:00',
     4,
-    '-'
+    'absolut-citron'
   ),
   (
     906,
@@ -9082,7 +9082,7 @@ values
     62,
     '2020-07-17 00:00:00',
     5,
-    '-'
+    'lumpfish-black'
   ),
   (
     907,
@@ -9092,7 +9092,7 @@ values
     39,
     '2020-11-10 00:00:00',
     5,
-    '-'
+    'lamb-whole-frozen'
   ),
   (
     908,
@@ -9102,7 +9102,7 @@ values
     78,
     '2020-12-13 00:00:00',
     4,
-    '-'
+    'soup-campbells-908'
   ),
   (
     909,
@@ -9112,7 +9112,7 @@ values
     56,
     '2021-05-10 00:00:00',
     4,
-    '-'
+    'bread-mini-hamburger-bun'
   ),
   (
     910,
@@ -9122,7 +9122,7 @@ values
     93,
     '2020-10-23 00:00:00',
     5,
-    '-'
+    'beef-top-butt-aaa'
   ),
   (
     911,
@@ -9132,7 +9132,7 @@ values
     97,
     '2020-11-28 00:00:00',
     3,
-    '-'
+    'the-pop-shoppe-root-beer'
   ),
   (
     912,
@@ -9142,7 +9142,7 @@ values
     87,
     '2021-03-31 00:00:00',
     6,
-    '-'
+    'wine-niagara-peninsula-vqa'
   ),
   (
     913,
@@ -9152,7 +9152,7 @@ values
     32,
     '2020-12-05 00:00:00',
     5,
-    '-'
+    'wine-red-mouton-cadet'
   ),
   (
     914,
@@ -9162,7 +9162,7 @@ values
     90,
     '2020-06-21 00:00:00',
     4,
-    '-'
+    'longos-chicken-cordon-bleu-914'
   ),
   (
     915,
@@ -9172,7 +9172,7 @@ values
     92,
     '2020-11-07 00:00:00',
     3,
-    '-'
+    'lamb-ground-915'
   ),
   (
     916,
@@ -9182,7 +9182,7 @@ values
     1,
     '2021-05-21 00:00:00',
     4,
-    '-'
+    'sour-puss-sour-apple'
   ),
   (
     917,
@@ -9192,7 +9192,7 @@ values
     96,
     '2020-12-21 00:00:00',
     4,
-    '-'
+    'gingerale-diet-schweppes'
   ),
   (
     918,
@@ -9202,7 +9202,7 @@ values
     45,
     '2020-08-03 00:00:00',
     4,
-    '-'
+    'soup-base-broth-chix'
   ),
   (
     919,
@@ -9212,7 +9212,7 @@ values
     73,
     '2020-09-18 00:00:00',
     4,
-    '-'
+    'bread-french-stick-919'
   ),
   (
     920,
@@ -9222,7 +9222,7 @@ values
     63,
     '2021-05-30 00:00:00',
     5,
-    '-'
+    'turnip-white-organic-920'
   ),
   (
     921,
@@ -9232,7 +9232,7 @@ values
     16,
     '2020-12-17 00:00:00',
     5,
-    '-'
+    'flour-semolina-921'
   ),
   (
     922,
@@ -9242,7 +9242,7 @@ values
     49,
     '2020-12-06 00:00:00',
     6,
-    '-'
+    'snapple-lemon-tea-922'
   ),
   (
     923,
@@ -9252,7 +9252,7 @@ values
     46,
     '2020-11-12 00:00:00',
     3,
-    '-'
+    'chocolate-semi-sweet'
   ),
   (
     924,
@@ -9262,7 +9262,7 @@ values
     22,
     '2020-12-08 00:00:00',
     6,
-    '-'
+    'apple-fuji-924'
   ),
   (
     925,
@@ -9272,7 +9272,7 @@ values
     87,
     '2020-09-05 00:00:00',
     5,
-    '-'
+    'oil-grapeseed-oil'
   ),
   (
     926,
@@ -9282,7 +9282,7 @@ values
     16,
     '2021-02-10 00:00:00',
     4,
-    '-'
+    'ham-cooked'
   ),
   (
     927,
@@ -9292,7 +9292,7 @@ values
     17,
     '2020-07-21 00:00:00',
     4,
-    '-'
+    'blackberries'
   ),
   (
     928,
@@ -9302,7 +9302,7 @@ values
     15,
     '2021-06-09 00:00:00',
     3,
-    '-'
+    'onions-spanish'
   ),
   (
     929,
@@ -9312,7 +9312,7 @@ values
     28,
     '2020-08-18 00:00:00',
     5,
-    '-'
+    'wheat-soft-kernal-of-wheat'
   ),
   (
     930,
@@ -9322,7 +9322,7 @@ values
     7,
     '2021-04-03 00:00:00',
     4,
-    '-'
+    'tandoori-curry-paste'
   ),
   (
     931,
@@ -9332,7 +9332,7 @@ values
     43,
     '2020-09-09 00:00:00',
     4,
-    '-'
+    'ice-cream-bar-oreo-sandwich'
   ),
   (
     932,
@@ -9342,7 +9342,7 @@ values
     26,
     '2021-03-16 00:00:00',
     4,
-    '-'
+    'instant-coffee'
   ),
   (
     933,
@@ -9352,7 +9352,7 @@ values
     8,
     '2020-09-07 00:00:00',
     5,
-    '-'
+    'yogurt-blueberry-175-gr'
   ),
   (
     934,
@@ -9362,7 +9362,7 @@ values
     63,
     '2020-07-20 00:00:00',
     4,
-    '-'
+    'juice-orange-189l-934'
   ),
   (
     935,
@@ -9372,7 +9372,7 @@ values
     45,
     '2020-08-19 00:00:00',
     4,
-    '-'
+    'clams-littleneck-whole'
   ),
   (
     936,
@@ -9382,7 +9382,7 @@ values
     59,
     '2021-01-09 00:00:00',
     3,
-    '-'
+    'chicken-whole-fryers-936'
   ),
   (
     937,
@@ -9392,7 +9392,7 @@ values
     88,
     '2020-10-06 00:00:00',
     6,
-    '-'
+    'tart-lemon'
   ),
   (
     938,
@@ -9402,7 +9402,7 @@ values
     27,
     '2021-01-16 00:00:00',
     6,
-    '-'
+    'pesto-primerba-paste'
   ),
   (
     939,
@@ -9412,7 +9412,7 @@ values
     68,
     '2020-09-30 00:00:00',
     4,
-    '-'
+    'apple-granny-smith'
   ),
   (
     940,
@@ -9422,7 +9422,7 @@ values
     87,
     '2020-08-14 00:00:00',
     5,
-    '-'
+    'cranberries-dry'
   ),
   (
     941,
@@ -9432,7 +9432,7 @@ values
     84,
     '2021-03-04 00:00:00',
     5,
-    '-'
+    'sponge-cake-mix-chocolate-941'
   ),
   (
     942,
@@ -9442,7 +9442,7 @@ values
     47,
     '2021-05-30 00:00:00',
     6,
-    '-'
+    'daikon-radish'
   ),
   (
     943,
@@ -9452,7 +9452,7 @@ values
     95,
     '2020-09-05 00:00:00',
     6,
-    '-'
+    'bread-roll-whole-wheat'
   ),
   (
     944,
@@ -9462,7 +9462,7 @@ values
     88,
     '2021-01-06 00:00:00',
     3,
-    '-'
+    'wine-white-french-cross'
   ),
   (
     945,
@@ -9472,7 +9472,7 @@ values
     7,
     '2020-12-22 00:00:00',
     3,
-    '-'
+    'numi-assorted-teas'
   ),
   (
     946,
@@ -9482,7 +9482,7 @@ values
     46,
     '2021-05-26 00:00:00',
     5,
-    '-'
+    'longos-chicken-cordon-bleu-946'
   ),
   (
     947,
@@ -9492,7 +9492,7 @@ values
     100,
     '2020-08-29 00:00:00',
     4,
-    '-'
+    'spice-pepper-portions'
   ),
   (
     948,
@@ -9502,7 +9502,7 @@ values
     3,
     '2020-08-19 00:00:00',
     3,
-    '-'
+    'pastry-cheese-baked-scones'
   ),
   (
     949,
@@ -9512,7 +9512,7 @@ values
     82,
     '2021-02-02 00:00:00',
     3,
-    '-'
+    'sprouts-pea'
   ),
   (
     950,
@@ -9522,7 +9522,7 @@ values
     34,
     '2020-10-01 00:00:00',
     4,
-    '-'
+    'yoghurt-tubes'
   ),
   (
     951,
@@ -9532,7 +9532,7 @@ values
     56,
     '2020-06-28 00:00:00',
     4,
-    '-'
+    'ginger-pickled'
   ),
   (
     952,
@@ -9542,7 +9542,7 @@ values
     35,
     '2020-06-18 00:00:00',
     3,
-    '-'
+    'salmon-steak-cohoe-6-oz'
   ),
   (
     953,
@@ -9552,7 +9552,7 @@ values
     85,
     '2020-08-29 00:00:00',
     5,
-    '-'
+    'loaf-pan-2-lb-foil'
   ),
   (
     954,
@@ -9562,7 +9562,7 @@ values
     65,
     '2021-02-08 00:00:00',
     3,
-    '-'
+    'pastry-choclate-baked-954'
   ),
   (
     955,
@@ -9572,7 +9572,7 @@ values
     7,
     '2021-03-09 00:00:00',
     4,
-    '-'
+    'mustard-seed-955'
   ),
   (
     956,
@@ -9582,7 +9582,7 @@ values
     36,
     '2021-06-03 00:00:00',
     6,
-    '-'
+    'mushroom-enoki-fresh-956'
   ),
   (
     957,
@@ -9592,7 +9592,7 @@ values
     88,
     '2020-11-29 00:00:00',
     4,
-    '-'
+    'coffee-colombian-portioned-957'
   ),
   (
     958,
@@ -9602,7 +9602,7 @@ values
     93,
     '2020-06-14 00:00:00',
     6,
-    '-'
+    'juice-ocean-spray-cranberry'
   ),
   (
     959,
@@ -9612,7 +9612,7 @@ values
     46,
     '2020-07-29 00:00:00',
     4,
-    '-'
+    'tomato-puree-959'
   ),
   (
     960,
@@ -9622,7 +9622,7 @@ values
     45,
     '2021-05-28 00:00:00',
     3,
-    '-'
+    'wine-rosso-del-veronese-igt'
   ),
   (
     961,
@@ -9632,7 +9632,7 @@ values
     46,
     '2020-10-25 00:00:00',
     4,
-    '-'
+    'wine-fume-blanc-fetzer'
   ),
   (
     962,
@@ -9642,7 +9642,7 @@ values
     91,
     '2021-03-16 00:00:00',
     4,
-    '-'
+    'goldschalger'
   ),
   (
     963,
@@ -9652,7 +9652,7 @@ values
     53,
     '2021-04-20 00:00:00',
     4,
-    '-'
+    'wine-manischewitz-concord'
   ),
   (
     964,
@@ -9662,7 +9662,7 @@ values
     72,
     '2020-09-11 00:00:00',
     5,
-    '-'
+    'beets-golden'
   ),
   (
     965,
@@ -9672,7 +9672,7 @@ values
     0,
     '2021-04-29 00:00:00',
     3,
-    '-'
+    'oysters-smoked'
   ),
   (
     966,
@@ -9682,7 +9682,7 @@ values
     74,
     '2021-01-03 00:00:00',
     6,
-    '-'
+    'salmon-atlwhole-8-10-lb'
   ),
   (
     967,
@@ -9692,7 +9692,7 @@ values
     62,
     '2020-09-07 00:00:00',
     4,
-    '-'
+    'rolled-oats'
   ),
   (
     968,
@@ -9702,7 +9702,7 @@ values
     98,
     '2020-10-16 00:00:00',
     6,
-    '-'
+    'monkfish-fresh'
   ),
   (
     969,
@@ -9712,7 +9712,7 @@ values
     94,
     '2021-04-21 00:00:00',
     5,
-    '-'
+    'carbonated-water-blackcherry'
   ),
   (
     970,
@@ -9722,7 +9722,7 @@ values
     28,
     '2020-08-21 00:00:00',
     3,
-    '-'
+    'pur-source'
   ),
   (
     971,
@@ -9732,7 +9732,7 @@ values
     46,
     '2020-12-01 00:00:00',
     5,
-    '-'
+    'pie-filling-pumpkin'
   ),
   (
     972,
@@ -9742,7 +9742,7 @@ values
     19,
     '2020-09-26 00:00:00',
     3,
-    '-'
+    'wonton-wrappers'
   ),
   (
     973,
@@ -9752,7 +9752,7 @@ values
     3,
     '2021-03-24 00:00:00',
     4,
-    '-'
+    'straw-regular-973'
   ),
   (
     974,
@@ -9762,7 +9762,7 @@ values
     66,
     '2020-08-07 00:00:00',
     3,
-    '-'
+    'sparkling-wine-rose-freixenet-974'
   ),
   (
     975,
@@ -9772,7 +9772,7 @@ values
     90,
     '2021-01-29 00:00:00',
     5,
-    '-'
+    'galliano'
   ),
   (
     976,
@@ -9782,7 +9782,7 @@ values
     35,
     '2020-11-27 00:00:00',
     4,
-    '-'
+    'passion-fruit'
   ),
   (
     977,
@@ -9792,7 +9792,7 @@ values
     100,
     '2020-07-14 00:00:00',
     6,
-    '-'
+    'neckerchief-blck'
   ),
   (
     978,
@@ -9802,7 +9802,7 @@ values
     0,
     '2021-02-17 00:00:00',
     6,
-    '-'
+    'sugar-crumb-978'
   ),
   (
     979,
@@ -9812,7 +9812,7 @@ values
     82,
     '2020-09-17 00:00:00',
     3,
-    '-'
+    'oats-large-flake-979'
   ),
   (
     980,
@@ -9822,7 +9822,7 @@ values
     91,
     '2020-11-19 00:00:00',
     5,
-    '-'
+    'gelatine-leaves-envelopes'
   ),
   (
     981,
@@ -9832,7 +9832,7 @@ values
     65,
     '2020-08-12 00:00:00',
     3,
-    '-'
+    'chicken-leg-back-attach-981'
   ),
   (
     982,
@@ -9842,7 +9842,7 @@ values
     42,
     '2020-09-08 00:00:00',
     3,
-    '-'
+    'cheese-comte'
   ),
   (
     983,
@@ -9852,7 +9852,7 @@ values
     81,
     '2020-06-20 00:00:00',
     5,
-    '-'
+    'vinegar-champagne'
   ),
   (
     984,
@@ -9862,7 +9862,7 @@ values
     99,
     '2021-02-24 00:00:00',
     6,
-    '-'
+    'kiwi'
   ),
   (
     985,
@@ -9872,7 +9872,7 @@ values
     77,
     '2021-03-12 00:00:00',
     3,
-    '-'
+    'kohlrabi'
   ),
   (
     986,
@@ -9882,7 +9882,7 @@ values
     57,
     '2021-01-20 00:00:00',
     3,
-    '-'
+    'brandy-cherry-mcguinness'
   ),
   (
     987,
@@ -9892,7 +9892,7 @@ values
     1,
     '2020-06-20 00:00:00',
     3,
-    '-'
+    'sultanas-987'
   ),
   (
     988,
@@ -9902,7 +9902,7 @@ values
     64,
     '2020-07-16 00:00:00',
     5,
-    '-'
+    'v8-berry-blend'
   ),
   (
     989,
@@ -9912,7 +9912,7 @@ values
     30,
     '2021-01-06 00:00:00',
     3,
-    '-'
+    'soup-campbells-creamy-989'
   ),
   (
     990,
@@ -9922,7 +9922,7 @@ values
     53,
     '2021-01-05 00:00:00',
     5,
-    '-'
+    'creamers-10'
   ),
   (
     991,
@@ -9932,7 +9932,7 @@ values
     36,
     '2020-07-08 00:00:00',
     4,
-    '-'
+    'mushroom-porcini-dry'
   ),
   (
     992,
@@ -9942,7 +9942,7 @@ values
     59,
     '2020-10-27 00:00:00',
     6,
-    '-'
+    'cake-miini-cheesecake-cherry-992'
   ),
   (
     993,
@@ -9952,7 +9952,7 @@ values
     51,
     '2021-04-20 00:00:00',
     3,
-    '-'
+    'carbonated-water-raspberry'
   ),
   (
     994,
@@ -9962,7 +9962,7 @@ values
     44,
     '2020-08-31 00:00:00',
     4,
-    '-'
+    'cream-of-tartar-994'
   ),
   (
     995,
@@ -9972,7 +9972,7 @@ values
     61,
     '2021-03-19 00:00:00',
     3,
-    '-'
+    'club-soda-schweppes-355-ml-995'
   ),
   (
     996,
@@ -9982,7 +9982,7 @@ values
     68,
     '2020-06-20 00:00:00',
     6,
-    '-'
+    'beef-rib-roast-capless-996'
   ),
   (
     997,
@@ -9992,7 +9992,7 @@ values
     7,
     '2021-05-02 00:00:00',
     6,
-    '-'
+    'salt-table'
   ),
   (
     998,
@@ -10002,7 +10002,7 @@ values
     98,
     '2020-06-29 00:00:00',
     3,
-    '-'
+    'muffin-hinge-117n'
   ),
   (
     999,
@@ -10012,7 +10012,7 @@ values
     5,
     '2020-08-16 00:00:00',
     6,
-    '-'
+    'chicken-wieners'
   ),
   (
     1000,
@@ -10022,5 +10022,12 @@ values
     39,
     '2020-12-12 00:00:00',
     4,
-    '-'
-  );
\ No newline at end of file
+    'dried-peach'
+  );
+update store_collection
+set
+  products_count = (
+    select count(*)
+    from store_product
+    where store_product.collection_id = store_collection.id
+  );
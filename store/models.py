@@ -1,24 +1,100 @@
+from collections import Counter
+from decimal import Decimal
 from uuid import uuid4
 from django.contrib import admin
-from django.db import models
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import (
+    Count,
+    ExpressionWrapper,
+    F,
+    Func,
+    Max,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce, Greatest, Least, Round
 from django.core.validators import MinValueValidator, FileExtensionValidator
 from django.conf import settings
+from django.utils import timezone
 
+from likes.models import LikedItem
 from store.validators import validate_file_size
+from tags.models import TaggedItem
 
 # Create your models here.
 
 
+def price_total_field():
+    return models.DecimalField(max_digits=12, decimal_places=2)
+
+
+class ToNumeric(Func):
+    template = "CAST(%(expressions)s AS numeric)"
+    output_field = models.DecimalField()
+
+
+def best_discount(product_id):
+    # The SQL twin of store.pricing.load_discounts(): the best
+    # Promotion.discount (a percentage) of the product, 0 without one.
+    discounts = (
+        Product.promotions.through.objects.filter(product_id=product_id)
+        .values("product_id")
+        .annotate(best=Max("promotion__discount"))
+        .values("best")
+    )
+    return Coalesce(Subquery(discounts), Value(0.0))
+
+
+def discounted_price(unit_price, product_id):
+    # store.pricing.effective_price() in SQL.
+    hundred = Value(Decimal(100))
+    discount = Greatest(Least(ToNumeric(best_discount(product_id)), hundred), Value(Decimal(0)))
+    return Round(unit_price * (hundred - discount) / hundred, 2)
+
+
 class Promotion(models.Model):
     description = models.CharField(max_length=255)
     discount = models.FloatField()
 
 
+class CollectionQuerySet(models.QuerySet):
+    def adjust_products_count(self, deltas):
+        for collection_id, delta in deltas.items():
+            if collection_id is not None and delta:
+                self.filter(pk=collection_id).update(
+                    products_count=F("products_count") + delta,
+                    last_update=timezone.now(),
+                )
+
+    def recount_products(self):
+        actual = (
+            Product.objects.filter(collection=OuterRef("pk"))
+            .order_by()
+            .values("collection")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        # Only touch drifted rows so last_update keeps meaning "changed".
+        actual = Coalesce(Subquery(actual), 0)
+        return self.exclude(products_count=actual).update(
+            products_count=actual, last_update=timezone.now()
+        )
+
+
 class Collection(models.Model):
     title = models.CharField(max_length=255)
     featured_product = models.ForeignKey(
         "Product", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
     )
+    products_count = models.IntegerField(default=0, editable=False)
+    last_update = models.DateTimeField(auto_now=True)
+
+    objects = CollectionQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.title
@@ -27,9 +103,78 @@ class Collection(models.Model):
         ordering = ["title"]
 
 
+def for_product(queryset):
+    # By the content type's natural key: get_for_model() may query, and can't
+    # from async code.
+    return queryset.filter(
+        content_type__app_label="store", content_type__model="product", object_id=OuterRef("pk")
+    )
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_discount(self):
+        return self.annotate(discount=best_discount(OuterRef("pk")))
+
+    # Everything a product payload needs besides its images, in the product
+    # rows themselves instead of a query per kind.
+    def for_catalog(self):
+        return self.with_discount().with_tag_labels().with_stored_likes()
+
+    def with_tag_labels(self):
+        # Unordered, like labels_by_object(); the serializers sort them.
+        labels = for_product(TaggedItem.objects).values("tag__label")
+        return self.annotate(tag_labels=ArraySubquery(labels))
+
+    def with_stored_likes(self):
+        # The count as of the last flush, for products the like counters
+        # haven't seen yet, see LikeCounter.counts(). A bare COUNT() rather
+        # than an aggregate, so there's no GROUP BY and no likes count as 0.
+        count = for_product(LikedItem.objects).values(
+            count=Func("id", function="COUNT", output_field=models.IntegerField())
+        )
+        return self.annotate(stored_likes=Subquery(count))
+
+    # bulk_create() and update() skip post_save, so they recount the
+    # collections they touched themselves.
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        collection_ids = {obj.collection_id for obj in objs}
+        Collection.objects.filter(pk__in=collection_ids).recount_products()
+        return objs
+
+    def update(self, **kwargs):
+        # auto_now only applies to save(); bump last_update here too so the
+        # ETag/Last-Modified validators change with the payload.
+        if set(kwargs) - {"search_vector"} and "last_update" not in kwargs:
+            kwargs["last_update"] = timezone.now()
+        if "collection" not in kwargs and "collection_id" not in kwargs:
+            return super().update(**kwargs)
+        new_collection = kwargs.get("collection_id", kwargs.get("collection"))
+        with transaction.atomic(using=self.db):
+            before = Counter(
+                dict(
+                    self.order_by()
+                    .values_list("collection_id")
+                    .annotate(count=Count("id"))
+                )
+            )
+            rows = super().update(**kwargs)
+            if hasattr(new_collection, "resolve_expression"):
+                # e.g. the Case() bulk_update() builds, so recount both sides.
+                after = self.order_by().values_list("collection_id", flat=True).distinct()
+                Collection.objects.using(self.db).filter(
+                    pk__in=set(before) | set(after)
+                ).recount_products()
+                return rows
+            deltas = Counter({collection_id: -count for collection_id, count in before.items()})
+            deltas[getattr(new_collection, "pk", new_collection)] += rows
+            Collection.objects.using(self.db).adjust_products_count(deltas)
+        return rows
+
+
 class Product(models.Model):
     title = models.CharField(max_length=255)
-    slug = models.SlugField(default="-")
+    slug = models.SlugField(unique=True)
     description = models.TextField()
     unit_price = models.DecimalField(
         max_digits=6, decimal_places=2, validators=[MinValueValidator(1)]
@@ -40,10 +185,30 @@ class Product(models.Model):
         Collection, on_delete=models.PROTECT, related_name="products"
     )
     promotions = models.ManyToManyField(Promotion, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.title
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["unit_price", "id"]),
+            models.Index(fields=["last_update", "id"]),
+            GinIndex(fields=["search_vector"], name="product_search_vector_gin"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored collection so signal handlers can tell when a
+        # product moves between collections. A deferred one is read by the
+        # pre_save/pre_delete handler instead.
+        if "collection_id" in instance.__dict__:
+            instance._loaded_collection_id = instance.collection_id
+        return instance
+
 
 class ProductImage(models.Model):
     product = models.ForeignKey(
@@ -56,6 +221,19 @@ class ProductImage(models.Model):
             FileExtensionValidator(allowed_extensions=["jpg"]),
         ],
     )
+    # Storage names of the resized copies, {"thumbnail": {"jpeg": ..., "webp": ...}},
+    # filled in by store.tasks.process_product_image.
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Why the last run couldn't render the variants, e.g. the upload isn't
+    # an image Pillow can read.
+    processing_error = models.CharField(max_length=255, blank=True, editable=False)
+    last_update = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = instance.__dict__.get("image")
+        return instance
 
 
 class Customer(models.Model):
@@ -104,9 +282,14 @@ class Order(models.Model):
         max_length=1, choices=PAYMENT_STATUS_CHOICES, default=PAYMENT_STATUS_PENDING
     )
     customer = models.ForeignKey(Customer, on_delete=models.PROTECT)
+    # Snapshot taken at checkout; null only for orders placed before it existed.
+    total = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, editable=False
+    )
 
     class Meta:
         permissions = [("cancel order", "Can Cancel Order")]
+        indexes = [models.Index(fields=["customer", "id"])]
 
 
 class OrderItem(models.Model):
@@ -126,16 +309,47 @@ class Address(models.Model):
     )
 
 
+class CartQuerySet(models.QuerySet):
+    def with_total_price(self):
+        return self.annotate(
+            total_price=Coalesce(
+                Sum(
+                    F("items__quantity")
+                    * discounted_price(
+                        F("items__product__unit_price"), OuterRef("items__product_id")
+                    ),
+                    output_field=price_total_field(),
+                ),
+                Value(Decimal(0)),
+                output_field=price_total_field(),
+            )
+        )
+
+
 class Cart(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid4)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CartQuerySet.as_manager()
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_total_price(self):
+        return self.annotate(
+            total_price=ExpressionWrapper(
+                F("quantity") * discounted_price(F("product__unit_price"), OuterRef("product_id")),
+                output_field=price_total_field(),
+            )
+        )
+
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveSmallIntegerField(validators=[MinValueValidator(1)])
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         unique_together = [["cart", "product"]]
 
@@ -147,3 +361,6 @@ class Reviews(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
     date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["product", "id"])]
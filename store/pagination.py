@@ -1,5 +1,272 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import connections
+from django.db.models import Count, F, Q, QuerySet, Window
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _get(row, name):
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
 
 
 class DefaultPagination(PageNumberPagination):
     page_size = 10
+
+    # The total comes with the page as COUNT(*) OVER (), so a page is one
+    # query. Only ?page=last and pages past the end run a separate COUNT(*).
+    def paginate_queryset(self, queryset, request, view=None):
+        paginator, page_number, rows = self.start(queryset, request)
+        if rows is not None:
+            rows = list(rows)
+            self.set_count(paginator, page_number, rows)
+        number = self.validate(paginator, page_number)
+        if rows is None:
+            rows = list(self.slice(queryset, paginator, number))
+        return self.set_page(rows, number, paginator, request)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        paginator, page_number, rows = self.start(queryset, request)
+        if rows is not None:
+            rows = [row async for row in rows]
+            self.set_count(paginator, page_number, rows)
+        if "count" not in paginator.__dict__:
+            paginator.count = await queryset.acount()
+        number = self.validate(paginator, page_number)
+        if rows is None:
+            rows = [row async for row in self.slice(queryset, paginator, number)]
+        return self.set_page(rows, number, paginator, request)
+
+    def start(self, queryset, request):
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        page_number = self.get_page_number(request, paginator)
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            return paginator, page_number, None
+        if page_number < 1:
+            return paginator, page_number, None
+        counted = queryset.annotate(page_total=Window(Count("*")))
+        return paginator, page_number, self.slice(counted, paginator, page_number)
+
+    def set_count(self, paginator, page_number, rows):
+        if rows:
+            paginator.count = _get(rows[0], "page_total")
+        elif page_number == 1:
+            paginator.count = 0
+
+    def slice(self, queryset, paginator, number):
+        bottom = (number - 1) * paginator.per_page
+        return queryset[bottom : bottom + paginator.per_page]
+
+    def validate(self, paginator, page_number):
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+        try:
+            return paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+    def set_page(self, rows, number, paginator, request):
+        self.page = Page(rows, number, paginator)
+        self.request = request
+        return rows
+
+    def get_paginated_data(self, data):
+        return self.get_paginated_response(data).data
+
+
+# Admin changelist paginator that takes the planner's row estimate for an
+# unfiltered Postgres table instead of a COUNT(*) over all of it. Small or
+# never analyzed tables, and filtered lists, still get an exact count.
+class EstimatedCountPaginator(Paginator):
+    estimate_above = 10_000
+
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is not None and estimate >= self.estimate_above:
+            return estimate
+        return super().count
+
+    def estimated_count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet) or queryset.query.where:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+
+# Seeks on (ordering field, id) instead of COUNT(*) + OFFSET so every page costs
+# the same. The ordering field comes from OrderingFilter, else `ordering`.
+class KeysetPagination(BasePagination):
+    page_size = 10
+    cursor_query_param = "cursor"
+    ordering = "id"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page([row async for row in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        self.base_url = request.build_absolute_uri()
+        self.field = self.get_ordering(queryset)
+        self.name = self.field.lstrip("-")
+        self.model_field = self.get_field(queryset)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor is not None and self.cursor["r"]
+        descending = self.field.startswith("-") != self.reverse
+
+        if self.name != "id":
+            queryset = queryset.annotate(keyset_value=F(self.name))
+        if self.cursor is not None:
+            queryset = queryset.filter(self.seek(self.cursor, descending))
+        prefix = "-" if descending else ""
+        order_by = dict.fromkeys([prefix + self.name, prefix + "id"])
+        return queryset.order_by(*order_by)[: self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        self.page = rows
+        return rows
+
+    def get_ordering(self, queryset):
+        order_by = queryset.query.order_by
+        if order_by and isinstance(order_by[0], str) and order_by[0] != "?":
+            return order_by[0]
+        return self.ordering
+
+    def get_field(self, queryset):
+        annotation = queryset.query.annotations.get(self.name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(self.name)
+
+    def seek(self, cursor, descending):
+        lookup = "lt" if descending else "gt"
+        after_id = Q(**{f"id__{lookup}": cursor["id"]})
+        if self.name == "id":
+            return after_id
+        value = self.to_python(cursor["v"])
+        return Q(**{f"{self.name}__{lookup}": value}) | (
+            Q(**{self.name: value}) & after_id
+        )
+
+    def to_python(self, value):
+        try:
+            return self.model_field.to_python(value)
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            if cursor["o"] != self.field or (self.name != "id" and "v" not in cursor):
+                raise ValueError
+            cursor["id"] = int(cursor["id"])
+            cursor["r"] = bool(cursor["r"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, row, reverse):
+        cursor = {"o": self.field, "id": self._get(row, "id"), "r": int(reverse)}
+        if self.name != "id":
+            cursor["v"] = str(self._get(row, "keyset_value"))
+        encoded = urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def _get(row, name):
+        return _get(row, name)
+
+
+# Keyset pages are opt-in: a request with ?cursor= (empty for the first page)
+# gets them, any other request keeps the view's default_class pages, or no
+# pagination at all when there is none.
+class OptInKeysetPagination(BasePagination):
+    default_class = None
+
+    def get_delegate(self, request):
+        if KeysetPagination.cursor_query_param in request.query_params:
+            return KeysetPagination()
+        if self.default_class is not None:
+            return self.default_class()
+        return None
+
+    def prepare(self, queryset, request):
+        self.delegate = self.get_delegate(request)
+        if not isinstance(self.delegate, KeysetPagination) and not queryset.ordered:
+            queryset = queryset.order_by("id")
+        return queryset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.prepare(queryset, request)
+        if self.delegate is None:
+            return None
+        return self.delegate.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.prepare(queryset, request)
+        if self.delegate is None:
+            return None
+        return await self.delegate.apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.delegate.get_paginated_response(data)
+
+    def get_paginated_data(self, data):
+        return self.delegate.get_paginated_data(data)
+
+
+class ProductPagination(OptInKeysetPagination):
+    default_class = DefaultPagination
@@ -0,0 +1,75 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Product
+
+TAX_RATE = Decimal(1.1)
+CENT = Decimal("0.01")
+NO_DISCOUNT = 0.0
+
+
+def discount_key(product_id):
+    return f"store:pricing:discount:{product_id}"
+
+
+def load_discounts(product_ids):
+    # Promotion.discount is a percentage and only the best one applies.
+    discounts = dict(
+        Product.promotions.through.objects.filter(product_id__in=product_ids)
+        .values("product_id")
+        .annotate(best=Max("promotion__discount"))
+        .values_list("product_id", "best")
+    )
+    return {product_id: discounts.get(product_id, NO_DISCOUNT) for product_id in product_ids}
+
+
+def get_discounts(product_ids):
+    keys = {product_id: discount_key(product_id) for product_id in set(product_ids)}
+    if not keys:
+        return {}
+    cached = cache.get_many(keys.values())
+    discounts = {product_id: cached[key] for product_id, key in keys.items() if key in cached}
+    missing = [product_id for product_id in keys if product_id not in discounts]
+    if missing:
+        loaded = load_discounts(missing)
+        cache.set_many(
+            {keys[product_id]: discount for product_id, discount in loaded.items()},
+            timeout=settings.CATALOG_CACHE_TIMEOUT,
+        )
+        discounts.update(loaded)
+    return discounts
+
+
+def forget_discounts(product_ids):
+    keys = [discount_key(product_id) for product_id in product_ids]
+    cache.delete_many(keys)
+    # Again after commit, so a reader can't cache the pre-commit promotions.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def effective_price(unit_price, discount):
+    discount = min(max(Decimal(str(discount)), Decimal(0)), Decimal(100))
+    if not discount:
+        return unit_price
+    return (unit_price * (100 - discount) / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def price_with_tax(unit_price, discount):
+    return effective_price(unit_price, discount) * TAX_RATE
+
+
+# Prices for a batch of products, e.g. a page or a cart: the discounts of all
+# of them come from one cache round trip and at most one query.
+class PriceList:
+    def __init__(self, product_ids):
+        self.discounts = get_discounts(product_ids)
+
+    def price(self, product_id, unit_price):
+        return effective_price(unit_price, self.discounts.get(product_id, NO_DISCOUNT))
+
+    def price_with_tax(self, product_id, unit_price):
+        return price_with_tax(unit_price, self.discounts.get(product_id, NO_DISCOUNT))
@@ -0,0 +1,113 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from rest_framework.filters import SearchFilter
+
+SEARCH_CONFIG = "english"
+
+# Postgres gets its GIN index from Product.Meta.indexes; SQLite keeps an FTS5
+# table in step with store_product through triggers.
+SQLITE_INDEX_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS store_product_fts USING fts5("
+    "title, description, content='store_product', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS store_product_fts_ai AFTER INSERT ON store_product BEGIN "
+    "INSERT INTO store_product_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS store_product_fts_ad AFTER DELETE ON store_product BEGIN "
+    "INSERT INTO store_product_fts(store_product_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS store_product_fts_au AFTER UPDATE ON store_product BEGIN "
+    "INSERT INTO store_product_fts(store_product_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO store_product_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+]
+
+
+def product_search_vector():
+    return SearchVector("title", weight="A", config=SEARCH_CONFIG) + SearchVector(
+        "description", weight="B", config=SEARCH_CONFIG
+    )
+
+
+def install_search_index(using="default", **kwargs):
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for sql in SQLITE_INDEX_SQL:
+            cursor.execute(sql)
+
+
+def rebuild_search_index(using="default"):
+    from .models import Product
+
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        return Product.objects.using(using).update(search_vector=product_search_vector())
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO store_product_fts(store_product_fts) VALUES ('rebuild')"
+            )
+        return Product.objects.using(using).count()
+    return 0
+
+
+def sqlite_match_query(search):
+    # Quote every term so user input can't be parsed as FTS5 query syntax.
+    terms = search.replace(",", " ").split()
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def match_products(queryset, search):
+    # Rows matching `search` through the full-text index, unranked.
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        query = SearchQuery(search, search_type="websearch", config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query)
+    if vendor == "sqlite":
+        match = sqlite_match_query(search)
+        if not match:
+            return queryset
+        return queryset.filter(
+            id__in=RawSQL(
+                "SELECT rowid FROM store_product_fts WHERE store_product_fts MATCH %s",
+                [match],
+            )
+        )
+    return queryset.filter(Q(title__icontains=search) | Q(description__icontains=search))
+
+
+# Ranked full-text search: the GIN-indexed search_vector on Postgres, the FTS5
+# table on SQLite and DRF's icontains search on anything else.
+class ProductSearchFilter(SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        search = request.query_params.get(self.search_param, "").strip()
+        if not search:
+            return queryset
+        vendor = connections[queryset.db].vendor
+        if vendor == "postgresql":
+            query = SearchQuery(search, search_type="websearch", config=SEARCH_CONFIG)
+            return (
+                match_products(queryset, search)
+                # ts_rank() is a float4; cast it so keyset cursors round-trip exactly.
+                .annotate(rank=Cast(SearchRank(F("search_vector"), query), FloatField()))
+                .order_by("-rank", "-id")
+            )
+        if vendor == "sqlite":
+            match = sqlite_match_query(search)
+            if not match:
+                return queryset
+            # bm25() is lower-is-better, negate it to keep "-rank" meaning best
+            # first. Column weights mirror the A/B weights used on Postgres.
+            rank = RawSQL(
+                "SELECT -bm25(store_product_fts, 2.5, 1.0) FROM store_product_fts "
+                "WHERE store_product_fts MATCH %s AND rowid = store_product.id",
+                [match],
+                output_field=FloatField(),
+            )
+            return match_products(queryset, search).annotate(rank=rank).order_by("-rank", "-id")
+        return super().filter_queryset(request, queryset, view)
@@ -1,7 +1,13 @@
-from decimal import Decimal
+from collections import defaultdict
 from rest_framework import serializers
 from django.db import transaction
+from django.db.models import Case, F, OuterRef, When
 from rest_framework.exceptions import NotFound
+from tags.models import TaggedItem
+from . import cache as catalog_cache
+from . import pricing
+from .carts import get_cart_store
+from .images import variant_urls
 from .signals import order_created
 from .models import (
     Cart,
@@ -13,9 +19,26 @@ from .models import (
     ProductImage,
     Reviews,
     Order,
+    best_discount,
 )
 
 
+def get_prices(context, product_ids):
+    # List serializers price their whole batch up front; single objects are
+    # priced on their own.
+    prices = context.get("prices")
+    if prices is None:
+        prices = pricing.PriceList(product_ids)
+    return prices
+
+
+def get_tags(context, product_ids):
+    tags = context.get("tags")
+    if tags is None:
+        tags = TaggedItem.objects.labels_by_object(Product, product_ids)
+    return tags
+
+
 class CollectionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Collection
@@ -24,15 +47,45 @@ class CollectionSerializer(serializers.ModelSerializer):
     products_count = serializers.IntegerField(read_only=True)
 
 
+def media_url(name, context):
+    if not name:
+        return None
+    url = ProductImage._meta.get_field("image").storage.url(name)  # type: ignore
+    request = context.get("request")
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
     def create(self, validated_data):
         return ProductImage.objects.create(
             product_id=self.context["product_id"], **validated_data
         )
 
+    def get_variants(self, product_image: ProductImage):
+        return variant_urls(product_image.variants, lambda name: media_url(name, self.context))
+
     class Meta:
         model = ProductImage
-        fields = ["id", "image"]
+        fields = ["id", "image", "variants"]
+
+
+class ProductListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        products = list(data.all() if hasattr(data, "all") else data)
+        product_ids = [product.id for product in products]
+        if "prices" not in self.context and not all(
+            hasattr(product, "discount") for product in products
+        ):
+            self.context["prices"] = pricing.PriceList(product_ids)
+        if "tags" not in self.context and not all(
+            hasattr(product, "tag_labels") for product in products
+        ):
+            self.context["tags"] = TaggedItem.objects.labels_by_object(Product, product_ids)
+        return super().to_representation(products)
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -50,12 +103,105 @@ class ProductSerializer(serializers.ModelSerializer):
             "price_with_tax",
             "collection",
             "images",
+            "tags",
         ]
+        list_serializer_class = ProductListSerializer
 
     price_with_tax = serializers.SerializerMethodField(method_name="calculate_tax")
+    tags = serializers.SerializerMethodField()
 
     def calculate_tax(self, product: Product):
-        return product.unit_price * Decimal(1.1)
+        # Annotated by ProductQuerySet.with_discount(), but not on a product
+        # that was just created or updated.
+        if hasattr(product, "discount"):
+            return pricing.price_with_tax(product.unit_price, product.discount)  # type: ignore
+        prices = get_prices(self.context, [product.id])
+        return prices.price_with_tax(product.id, product.unit_price)
+
+    def get_tags(self, product: Product):
+        # Annotated by ProductQuerySet.with_tag_labels().
+        if hasattr(product, "tag_labels"):
+            return sorted(product.tag_labels)  # type: ignore
+        return get_tags(self.context, [product.id]).get(product.id, [])
+
+
+class ProductRowListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        rows = list(data)
+        image_rows = self.image_rows(rows) if rows else []
+        return self.render(rows, image_rows)
+
+    async def ato_representation(self, data):
+        rows = list(data)
+        image_rows = [image async for image in self.image_rows(rows)] if rows else []
+        return self.render(rows, image_rows)
+
+    def image_rows(self, rows):
+        return ProductImage.objects.filter(
+            product_id__in=[row["id"] for row in rows]
+        ).values_list("product_id", "id", "image", "variants")
+
+    def render(self, rows, image_rows):
+        images = defaultdict(list)
+        for product_id, *image_row in image_rows:
+            images[product_id].append(self.child.image(*image_row))
+        return [self.child.to_representation(row, images[row["id"]]) for row in rows]
+
+
+# Read-only fast path for rows of Product.objects.for_catalog().values(
+# *Meta.fields); renders the same payload as ProductSerializer.
+class ProductRowSerializer(serializers.BaseSerializer):
+    unit_price_field = serializers.DecimalField(max_digits=6, decimal_places=2)
+
+    class Meta:
+        fields = [
+            "id",
+            "title",
+            "description",
+            "slug",
+            "inventory",
+            "unit_price",
+            "collection_id",
+            # Not rendered, feeds the list's ETag/Last-Modified.
+            "last_update",
+            # Annotated by ProductQuerySet.for_catalog(); stored_likes only
+            # feeds the like counters.
+            "discount",
+            "tag_labels",
+            "stored_likes",
+        ]
+        list_serializer_class = ProductRowListSerializer
+
+    def image_url(self, name):
+        return media_url(name, self.context)
+
+    def image(self, image_id, name, variants):
+        return {
+            "id": image_id,
+            "image": self.image_url(name),
+            "variants": variant_urls(variants, self.image_url),
+        }
+
+    def to_representation(self, row, images=None):
+        if images is None:
+            images = [
+                self.image(*image_row)
+                for image_row in ProductImage.objects.filter(
+                    product_id=row["id"]
+                ).values_list("id", "image", "variants")
+            ]
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "description": row["description"],
+            "slug": row["slug"],
+            "inventory": row["inventory"],
+            "unit_price": self.unit_price_field.to_representation(row["unit_price"]),
+            "price_with_tax": pricing.price_with_tax(row["unit_price"], row["discount"]),
+            "collection": row["collection_id"],
+            "images": images,
+            "tags": sorted(row["tag_labels"]),
+        }
 
 
 class SimpleProductSerializer(serializers.ModelSerializer):
@@ -88,7 +234,7 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ["id", "product", "quantity", "total_price"]
 
     def get_total_price(self, cart_item: CartItem):
-        return cart_item.quantity * cart_item.product.unit_price
+        return cart_item.total_price  # type: ignore
 
 
 class CartSerializer(serializers.ModelSerializer):
@@ -101,7 +247,25 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ["id", "items", "total_price"]
 
     def get_total_price(self, cart: Cart):
-        return sum([item.quantity * item.product.unit_price for item in cart.items.all()])  # type: ignore
+        return cart.total_price  # type: ignore
+
+
+class AddCartItemListSerializer(serializers.ListSerializer):
+    def validate(self, attrs):
+        product_ids = {item["product_id"] for item in attrs}
+        found = Product.objects.filter(pk__in=product_ids).values_list("id", flat=True)
+        missing = product_ids - set(found)
+        if missing:
+            raise NotFound(f"products with given ids not found: {sorted(missing)}")
+        return attrs
+
+    def create(self, validated_data):
+        # The last quantity wins when a product is listed twice.
+        quantities = {item["product_id"]: item["quantity"] for item in validated_data}
+        cart_items = get_cart_store().add_items(self.context["cart_id"], quantities)
+        if cart_items is None:
+            raise NotFound("cart with given id not found!")
+        return cart_items
 
 
 class AddCartItemSerializer(serializers.ModelSerializer):
@@ -110,24 +274,26 @@ class AddCartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
         fields = ["id", "product_id", "quantity"]
+        list_serializer_class = AddCartItemListSerializer
 
     def validate_product_id(self, value):
         if value < 1:
             raise NotFound("product with given id not found!")
         return value
 
+    def validate(self, attrs):
+        # Batches check all their products at once in the list serializer.
+        if self.parent is None and not Product.objects.filter(pk=attrs["product_id"]).exists():
+            raise NotFound("product with given id not found!")
+        return attrs
+
     def save(self, **kwargs):
         product_id = self.validated_data["product_id"]  # type: ignore
         quantity = self.validated_data["quantity"]  # type: ignore
         cart_id = self.context["cart_id"]
-        try:
-            cart_item = CartItem.objects.get(cart_id=cart_id, product_id=product_id)
-            cart_item.quantity = quantity
-            cart_item.save()
-            self.instance = cart_item
-        except CartItem.DoesNotExist:
-            cart_item = CartItem.objects.create(cart_id=cart_id, **self.validated_data)  # type: ignore
-            self.instance = cart_item
+        self.instance = get_cart_store().add_item(cart_id, product_id, quantity)
+        if self.instance is None:
+            raise NotFound("cart with given id not found!")
         return self.instance
 
 
@@ -136,6 +302,12 @@ class UpdateCartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = ["quantity"]
 
+    def update(self, instance, validated_data):
+        cart_item = get_cart_store().update_item(instance, validated_data["quantity"])
+        if cart_item is None:
+            raise NotFound("cart with given id not found!")
+        return cart_item
+
 
 class CustomerSerializer(serializers.ModelSerializer):
     user_id = serializers.IntegerField(read_only=True)
@@ -164,35 +336,108 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ["id", "customer", "placed_at", "payment_status", "items"]
+        fields = ["id", "customer", "placed_at", "payment_status", "total", "items"]
+
+
+class OrderSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Order
+        fields = ["id", "customer", "placed_at", "payment_status", "total"]
 
 
 class CreateOrderSerializer(serializers.Serializer):
     cart_id = serializers.UUIDField()
 
-    def validate_cart_id(self, cart_id):
-        if not Cart.objects.filter(pk=cart_id).exists():
-            raise serializers.ValidationError("No cart with given id exist")
-        if CartItem.objects.filter(cart_id=cart_id).count() == 0:
-            raise serializers.ValidationError("The cart is empty")
-        return cart_id
+    def load_cart_items(self, cart_id):
+        # One LEFT JOIN tells a missing cart (no rows) from an empty one (a
+        # single row of NULLs) and loads everything checkout needs.
+        items = list(
+            Cart.objects.filter(pk=cart_id)
+            .annotate(discount=best_discount(OuterRef("items__product_id")))
+            .values_list(
+                "items__product_id",
+                "items__quantity",
+                "items__product__unit_price",
+                "items__product__collection_id",
+                "discount",
+                named=True,
+            )
+        )
+        if not items:
+            raise serializers.ValidationError({"cart_id": "No cart with given id exist"})
+        if items[0].items__product_id is None:
+            raise serializers.ValidationError({"cart_id": "The cart is empty"})
+        return items
+
+    def reserve_inventory(self):
+        items = self.cart_items
+        product_ids = [item.items__product_id for item in items]
+        # Lock the rows in primary key order before writing, so checkouts
+        # that share products queue behind each other instead of deadlocking.
+        inventory = dict(
+            Product.objects.select_for_update()
+            .filter(pk__in=product_ids)
+            .order_by("pk")
+            .values_list("id", "inventory")
+        )
+        short = [
+            item.items__product_id
+            for item in items
+            if inventory.get(item.items__product_id, 0) < item.items__quantity
+        ]
+        if short:
+            raise serializers.ValidationError(
+                {"cart_id": f"Not enough inventory for products: {short}"}
+            )
+        Product.objects.filter(pk__in=product_ids).update(
+            inventory=Case(
+                *[
+                    When(
+                        pk=item.items__product_id,
+                        then=F("inventory") - item.items__quantity,
+                    )
+                    for item in items
+                ]
+            )
+        )
 
     def save(self, **kwargs):
+        cart_id = self.validated_data["cart_id"]  # type: ignore
         with transaction.atomic():
-            cart_id = self.validated_data["cart_id"]  # type: ignore
-            customer = Customer.objects.only("id").get(user_id=self.context["user_id"])
-            order = Order.objects.create(customer_id=customer.id)  # type: ignore
-            cart_items = CartItem.objects.select_related("product").filter(cart_id=self.validated_data["cart_id"])  # type: ignore
-            order_items = [
-                OrderItem(
-                    order=order,
-                    product=item.product,
-                    quantity=item.quantity,
-                    unit_price=item.product.unit_price,
-                )
-                for item in cart_items
+            # Carts kept outside the database are written behind at checkout,
+            # and rolled back with the order if it fails.
+            get_cart_store().persist(cart_id)
+            self.cart_items = self.load_cart_items(cart_id)
+            # Deleting the cart first claims it, so a cart that is checked out
+            # twice concurrently only produces one order.
+            _, deleted = Cart(pk=cart_id).delete()
+            if not deleted.get(Cart._meta.label):
+                raise serializers.ValidationError({"cart_id": "No cart with given id exist"})
+            self.reserve_inventory()
+            unit_prices = [
+                pricing.effective_price(item.items__product__unit_price, item.discount)
+                for item in self.cart_items
             ]
-            OrderItem.objects.bulk_create(order_items)
-            Cart.objects.filter(pk=cart_id).delete()
-            order_created.send_robust(self.__class__, order=Order)
-            return order
+            total = sum(
+                item.items__quantity * unit_price
+                for item, unit_price in zip(self.cart_items, unit_prices)
+            )
+            order = Order.objects.create(customer_id=self.context["customer_id"], total=total)
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(
+                        order=order,
+                        product_id=item.items__product_id,
+                        quantity=item.items__quantity,
+                        unit_price=unit_price,
+                    )
+                    for item, unit_price in zip(self.cart_items, unit_prices)
+                ]
+            )
+        get_cart_store().forget(cart_id)
+        for item in self.cart_items:
+            catalog_cache.invalidate_product(
+                item.items__product_id, item.items__product__collection_id
+            )
+        order_created.send_robust(self.__class__, order=Order)
+        return order
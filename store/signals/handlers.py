@@ -1,10 +1,186 @@
+from collections import Counter
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db import connections, transaction
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
 
-from ..models import Customer
+from .. import cache as catalog_cache
+from .. import pricing
+from ..customers import forget_customer
+from ..images import delete_variants
+from ..models import Collection, Customer, Product, ProductImage, Promotion
+from ..search import product_search_vector
+from ..tasks import process_product_image
+from tags.models import Tag, TaggedItem
 
 @receiver(post_save,sender=settings.AUTH_USER_MODEL)
 def create_customer_for_new_user(sender,**kwargs):
     if kwargs['created']:
-        Customer.objects.create(user=kwargs['instance'])
\ No newline at end of file
+        Customer.objects.create(user=kwargs['instance'])
+
+
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_customer_id(sender, instance, **kwargs):
+    forget_customer(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    catalog_cache.invalidate_product(
+        instance.pk,
+        instance.collection_id,
+        getattr(instance, "_loaded_collection_id", None),
+    )
+
+
+@receiver(pre_save, sender=Product)
+def load_stored_collection(sender, instance, update_fields=None, **kwargs):
+    # The product was loaded with collection_id deferred. Read the stored one
+    # before it is overwritten, or the counters would drift.
+    if instance._state.adding or hasattr(instance, "_loaded_collection_id"):
+        return
+    if update_fields is not None and not {"collection", "collection_id"} & set(update_fields):
+        return
+    instance._loaded_collection_id = (
+        Product.objects.using(instance._state.db)
+        .filter(pk=instance.pk)
+        .values_list("collection_id", flat=True)
+        .first()
+    )
+
+
+@receiver(pre_delete, sender=Product)
+def load_collection_before_delete(sender, instance, **kwargs):
+    # A deferred collection_id can't be loaded once the row is gone.
+    if not hasattr(instance, "_loaded_collection_id"):
+        instance._loaded_collection_id = instance.collection_id
+
+
+@receiver(post_save, sender=Product)
+def update_products_count_on_save(sender, instance, created, **kwargs):
+    deltas = Counter()
+    if created:
+        deltas[instance.collection_id] += 1
+    elif hasattr(instance, "_loaded_collection_id"):
+        loaded = instance._loaded_collection_id
+        if loaded != instance.collection_id:
+            deltas[loaded] -= 1
+            deltas[instance.collection_id] += 1
+    Collection.objects.adjust_products_count(deltas)
+
+
+@receiver(post_delete, sender=Product)
+def update_products_count_on_delete(sender, instance, **kwargs):
+    collection_id = getattr(instance, "_loaded_collection_id", instance.collection_id)
+    Collection.objects.adjust_products_count({collection_id: -1})
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, update_fields=None, using="default", **kwargs):
+    # SQLite keeps its FTS5 table current with triggers.
+    if connections[using].vendor != "postgresql":
+        return
+    if update_fields is not None and not {"title", "description"} & set(update_fields):
+        return
+    Product.objects.using(using).filter(pk=instance.pk).update(
+        search_vector=product_search_vector()
+    )
+
+
+@receiver([post_save, post_delete], sender=Collection)
+def invalidate_collection_cache(sender, instance, **kwargs):
+    catalog_cache.invalidate_collection(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def invalidate_product_image_cache(sender, instance, **kwargs):
+    # Images are part of the product's payload, so they change its validators.
+    Product.objects.filter(pk=instance.product_id).update(last_update=timezone.now())
+    collection_ids = Product.objects.filter(pk=instance.product_id).values_list(
+        "collection_id", flat=True
+    )
+    catalog_cache.invalidate_product(instance.product_id, *collection_ids)
+
+
+def touch_products(product_ids):
+    # For changes to what a product renders outside its own row: bump its
+    # validators and drop its cached responses.
+    products = Product.objects.filter(pk__in=product_ids)
+    rows = list(products.values_list("id", "collection_id"))
+    products.update(last_update=timezone.now())
+    for product_id, collection_id in rows:
+        catalog_cache.invalidate_product(product_id, collection_id)
+
+
+def reprice_products(product_ids):
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    pricing.forget_discounts(product_ids)
+    touch_products(product_ids)
+
+
+# pre_delete: once the promotion is gone its links to products are too.
+@receiver(post_save, sender=Promotion)
+@receiver(pre_delete, sender=Promotion)
+def reprice_promoted_products(sender, instance, **kwargs):
+    reprice_products(instance.product_set.values_list("id", flat=True))
+
+
+@receiver(m2m_changed, sender=Product.promotions.through)
+def reprice_on_promotions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            reprice_products([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        reprice_products(pk_set)
+    elif action == "pre_clear":
+        reprice_products(instance.product_set.values_list("id", flat=True))
+
+
+@receiver([post_save, post_delete], sender=TaggedItem)
+def invalidate_tagged_product(sender, instance, **kwargs):
+    if instance.content_type_id == ContentType.objects.get_for_model(Product).id:
+        touch_products([instance.object_id])
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_relabeled_products(sender, instance, created, **kwargs):
+    if not created:
+        touch_products(
+            TaggedItem.objects.filter(
+                tag=instance, content_type=ContentType.objects.get_for_model(Product)
+            ).values("object_id")
+        )
+
+
+@receiver(post_save, sender=ProductImage)
+def queue_product_image_processing(sender, instance, created, **kwargs):
+    if created or instance.image.name != getattr(instance, "_loaded_image", None):
+        instance._loaded_image = instance.image.name
+        if instance.variants:
+            # The variants belong to the image that was replaced.
+            stale = instance.variants
+            ProductImage.objects.filter(pk=instance.pk).update(variants={})
+            instance.variants = {}
+            transaction.on_commit(lambda: delete_variants(stale, instance.image.storage))
+        # Queue after commit so the worker sees the row and the upload
+        # request doesn't wait for the resizing.
+        transaction.on_commit(lambda: process_product_image.delay(instance.pk))
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_product_image_variants(sender, instance, **kwargs):
+    if instance.variants:
+        variants = instance.variants
+        transaction.on_commit(lambda: delete_variants(variants, instance.image.storage))
+
+
+# Keep this receiver last: the ones above compare against the collection the
+# product had when it was loaded.
+@receiver(post_save, sender=Product)
+def remember_product_collection(sender, instance, **kwargs):
+    if "collection_id" in instance.__dict__:
+        instance._loaded_collection_id = instance.collection_id
@@ -0,0 +1,41 @@
+from celery import shared_task
+from django.utils import timezone
+from PIL import UnidentifiedImageError
+
+from . import bulk
+from . import cache as catalog_cache
+from .images import delete_variants, render_variants
+from .models import Product, ProductImage
+
+
+@shared_task
+def process_product_image(image_id):
+    try:
+        product_image = ProductImage.objects.select_related("product").get(pk=image_id)
+    except ProductImage.DoesNotExist:
+        return
+    field = product_image.image
+    rows = ProductImage.objects.filter(pk=image_id, image=field.name)
+    try:
+        with field.open("rb") as file:
+            variants = render_variants(file, field.name, field.storage)
+    except (UnidentifiedImageError, OSError) as exc:
+        # Retrying won't help; keep the upload and note why on the row.
+        rows.update(processing_error=str(exc)[:255])
+        return
+    # update() so saving the variants doesn't queue another run.
+    now = timezone.now()
+    if not rows.update(variants=variants, processing_error="", last_update=now):
+        # The image was deleted or replaced while its variants were rendered.
+        delete_variants(variants, field.storage)
+        return
+    Product.objects.filter(pk=product_image.product_id).update(last_update=now)
+    catalog_cache.invalidate_product(
+        product_image.product_id, product_image.product.collection_id
+    )
+
+
+@shared_task
+def run_bulk_action(job_id, name, model_label, selection, params):
+    queryset = bulk.rebuild_selection(model_label, selection)
+    return bulk.run(job_id, name, queryset, params)
@@ -1,7 +1,36 @@
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.test import APIClient
+import fakeredis
 import pytest
 
+from storefront.celery import celery
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(settings):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": "redis://127.0.0.1:6379/2",
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "CONNECTION_POOL_KWARGS": {
+                    "connection_class": fakeredis.FakeConnection,
+                    "server": fakeredis.FakeServer(),
+                },
+            },
+        }
+    }
+    # django_redis keeps connection pools per URL across tests, so start clean.
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def celery_eager():
+    # Tasks queued by signal handlers run inline instead of needing a broker.
+    celery.conf.task_always_eager = True
+
 
 @pytest.fixture
 def api_client():
@@ -10,7 +39,7 @@ def api_client():
 
 @pytest.fixture
 def authenticate(api_client):
-    def do_authenticate(is_staff=False):
-        return api_client.force_authenticate(user=User(is_staff=is_staff))
+    def do_authenticate(is_staff=False, user=None):
+        return api_client.force_authenticate(user=user or User(is_staff=is_staff))
 
     return do_authenticate
@@ -0,0 +1,126 @@
+from django.db import connection
+from model_bakery import baker
+import pytest
+
+from store.admin import CollectionFilter
+from store.models import Cart, CartItem, Collection, Customer, Order, Product, Promotion
+from store.pagination import EstimatedCountPaginator
+
+
+def make_rows(count):
+    for collection in baker.make(Collection, _quantity=count):
+        product = baker.make(Product, collection=collection, promotions=[baker.make(Promotion)])
+        user = baker.make("core.User")
+        baker.make(Order, customer=Customer.objects.get(user=user))
+        baker.make(CartItem, cart=baker.make(Cart), product=product)
+
+
+@pytest.mark.django_db
+class TestChangelists:
+    # session, user, then the rows and their count; products also load the
+    # collection filter's choices.
+    @pytest.mark.parametrize(
+        "model, queries",
+        [
+            ("product", 6),
+            ("order", 5),
+            ("customer", 5),
+            ("cartitem", 5),
+            ("collection", 5),
+            ("promotion", 5),
+        ],
+    )
+    @pytest.mark.parametrize("rows", [1, 10])
+    def test_if_query_count_does_not_depend_on_rows(
+        self, admin_client, django_assert_num_queries, model, queries, rows
+    ):
+        make_rows(rows)
+
+        with django_assert_num_queries(queries):
+            response = admin_client.get(f"/admin/store/{model}/")
+
+        assert response.status_code == 200
+
+    def test_if_order_number_search_uses_primary_key(self, admin_client):
+        make_rows(3)
+        order = Order.objects.last()
+
+        response = admin_client.get("/admin/store/order/", {"q": str(order.pk)})
+
+        assert list(response.context["cl"].result_list) == [order]
+
+    def test_if_customer_search_matches_username_prefix(self, admin_client):
+        user = baker.make("core.User", username="marjan.k")
+        baker.make("core.User", username="someone")
+
+        response = admin_client.get("/admin/store/customer/", {"q": "marj"})
+
+        assert [customer.user_id for customer in response.context["cl"].result_list] == [user.id]
+
+    def test_if_customer_search_matches_names_ignoring_case(self, admin_client):
+        user = baker.make("core.User", first_name="Marjan", last_name="Kovac")
+        baker.make("core.User", first_name="Someone", last_name="Else")
+        order = baker.make(Order, customer=Customer.objects.get(user=user))
+
+        by_first = admin_client.get("/admin/store/customer/", {"q": "marj"})
+        by_last = admin_client.get("/admin/store/order/", {"q": "KOV"})
+
+        assert [customer.user_id for customer in by_first.context["cl"].result_list] == [user.id]
+        assert list(by_last.context["cl"].result_list) == [order]
+
+    def test_if_product_search_uses_full_text(self, admin_client):
+        baker.make(Product, title="Sourdough bread")
+        baker.make(Product, title="Red wine")
+
+        response = admin_client.get("/admin/store/product/", {"q": "bread"})
+
+        assert [product.title for product in response.context["cl"].result_list] == [
+            "Sourdough bread"
+        ]
+
+    def test_if_collection_filter_lists_biggest_and_selected(self, admin_client):
+        collections = baker.make(Collection, _quantity=CollectionFilter.limit + 1)
+        for rank, collection in enumerate(collections):
+            Collection.objects.filter(pk=collection.pk).update(products_count=rank)
+        smallest = collections[0]
+
+        unfiltered = admin_client.get("/admin/store/product/")
+        selected = admin_client.get("/admin/store/product/", {"collection__id": smallest.id})
+
+        def choices(response):
+            [spec] = [
+                spec
+                for spec in response.context["cl"].filter_specs
+                if isinstance(spec, CollectionFilter)
+            ]
+            return {value for value, _ in spec.lookup_choices}
+
+        assert len(choices(unfiltered)) == CollectionFilter.limit
+        assert str(smallest.id) not in choices(unfiltered)
+        assert str(smallest.id) in choices(selected)
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+    def test_if_unfiltered_table_uses_the_estimate(self, django_assert_num_queries):
+        baker.make(Promotion, _quantity=5)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE store_promotion")
+        paginator = EstimatedCountPaginator(Promotion.objects.order_by("id"), 10)
+        paginator.estimate_above = 1
+
+        # pg_class only, no COUNT(*)
+        with django_assert_num_queries(1) as context:
+            assert paginator.count == 5
+
+        assert "reltuples" in context.captured_queries[0]["sql"]
+
+    def test_if_small_or_filtered_tables_are_counted_exactly(self):
+        baker.make(Promotion, discount=10, _quantity=3)
+        baker.make(Promotion, discount=20, _quantity=2)
+
+        assert EstimatedCountPaginator(Promotion.objects.order_by("id"), 10).count == 5
+        assert (
+            EstimatedCountPaginator(Promotion.objects.filter(discount=20).order_by("id"), 10).count
+            == 2
+        )
@@ -0,0 +1,70 @@
+import json
+from model_bakery import baker
+from rest_framework import status
+import pytest
+
+from store.models import Collection, Product, ProductImage
+from store.search import rebuild_search_index
+
+
+@pytest.fixture
+def catalog():
+    collection = baker.make(Collection)
+    products = baker.make(Product, collection=collection, unit_price=10, _quantity=15)
+    for product in products[:3]:
+        baker.make(ProductImage, product=product, image="store/images/a.jpg")
+    rebuild_search_index()
+    return products
+
+
+def get_json(client, url):
+    response = client.get(url)
+    body = json.loads(response.content)
+    for key in ["next", "previous"]:
+        if isinstance(body, dict) and body.get(key):
+            body[key] = body[key].replace("/store/async/", "/store/")
+    return response.status_code, body
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    @pytest.mark.parametrize(
+        "query",
+        ["", "?ordering=-unit_price", "?collection_id=1", "?search=a&price_lt=20"],
+    )
+    def test_if_product_list_matches_the_sync_view(self, client, catalog, query):
+        assert get_json(client, f"/store/async/products/{query}") == get_json(
+            client, f"/store/products/{query}"
+        )
+
+    def test_if_next_page_matches_the_sync_view(self, client, catalog):
+        _, first = get_json(client, "/store/async/products/")
+
+        assert get_json(client, first["next"].replace("/store/", "/store/async/")) == (
+            get_json(client, first["next"])
+        )
+
+    def test_if_product_detail_matches_the_sync_view(self, client, catalog):
+        product = catalog[0]
+
+        assert get_json(client, f"/store/async/products/{product.id}/") == get_json(
+            client, f"/store/products/{product.id}/"
+        )
+
+    def test_if_product_does_not_exist_returns_404(self, client):
+        assert get_json(client, "/store/async/products/0/") == get_json(
+            client, "/store/products/0/"
+        )
+
+    def test_if_filter_is_invalid_returns_400(self, client):
+        status_code, body = get_json(client, "/store/async/products/?price_lt=abc")
+
+        assert status_code == status.HTTP_400_BAD_REQUEST
+        assert (status_code, body) == get_json(client, "/store/products/?price_lt=abc")
+
+    def test_if_collection_list_matches_the_sync_view(self, client, catalog):
+        baker.make(Collection, _quantity=3)
+
+        assert get_json(client, "/store/async/collections/") == get_json(
+            client, "/store/collections/"
+        )
@@ -0,0 +1,176 @@
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+import pytest
+
+from store.models import (
+    Cart,
+    CartItem,
+    Collection,
+    Customer,
+    Order,
+    OrderItem,
+    Product,
+    ProductImage,
+)
+from store.search import rebuild_search_index
+
+BUDGETS = json.loads((Path(__file__).parent / "benchmark_budgets.json").read_text())
+ITERATIONS = 20
+
+pytestmark = [pytest.mark.django_db, pytest.mark.benchmark]
+
+
+def measure(request, setup=None, iterations=ITERATIONS):
+    # Every call starts from a cold catalog cache, otherwise a new N+1 would
+    # hide behind cached responses.
+    def prepare():
+        cache.clear()
+        return setup() if setup else ()
+
+    request(*prepare())
+    queries = 0
+    timings = []
+    # Like timeit, keep full collections of the whole test session's heap out
+    # of the timings.
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            args = prepare()
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = request(*args)
+                timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code < 400, response.content
+            queries = max(queries, len(context.captured_queries))
+    finally:
+        gc.enable()
+
+    args = prepare()
+    tracemalloc.start()
+    request(*args)
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "queries": queries,
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(statistics.quantiles(timings, n=20)[-1], 2),
+        "alloc_kb": round(allocated / 1024, 1),
+    }
+
+
+def check_budget(name, results, record_property):
+    for metric, value in results.items():
+        record_property(f"{name}.{metric}", value)
+    over = {
+        metric: f"{value} > {BUDGETS[name][metric]}"
+        for metric, value in results.items()
+        if value > BUDGETS[name][metric]
+    }
+    assert not over, f"{name} is over budget: {over}"
+
+
+@pytest.fixture
+def catalog():
+    collections = baker.make(Collection, _quantity=10)
+    products = baker.prepare(
+        Product, collection=collections[0], unit_price=10, inventory=1000, _quantity=500
+    )
+    for index, product in enumerate(products):
+        product.title = f"Product {index}"
+        product.collection = collections[index % len(collections)]
+    Product.objects.bulk_create(products)
+    rebuild_search_index()
+    ProductImage.objects.bulk_create(
+        [ProductImage(product=product, image="store/images/a.jpg") for product in products]
+    )
+    return products
+
+
+@pytest.fixture
+def customer_client(api_client, authenticate):
+    authenticate(user=baker.make(settings.AUTH_USER_MODEL))
+    return api_client
+
+
+def test_product_list(api_client, catalog, record_property):
+    results = measure(lambda: api_client.get("/store/products/"))
+
+    check_budget("product_list", results, record_property)
+
+
+def test_product_detail(api_client, catalog, record_property):
+    results = measure(lambda: api_client.get(f"/store/products/{catalog[0].id}/"))
+
+    check_budget("product_detail", results, record_property)
+
+
+def test_product_search(api_client, catalog, record_property):
+    results = measure(lambda: api_client.get("/store/products/?search=product"))
+
+    check_budget("product_search", results, record_property)
+
+
+def test_collection_list(api_client, catalog, record_property):
+    results = measure(lambda: api_client.get("/store/collections/"))
+
+    check_budget("collection_list", results, record_property)
+
+
+def test_cart_add(api_client, catalog, record_property):
+    cart = baker.make(Cart)
+    products = iter(catalog)
+
+    results = measure(
+        lambda product: api_client.post(
+            f"/store/carts/{cart.id}/items/", {"product_id": product.id, "quantity": 1}
+        ),
+        setup=lambda: (next(products),),
+    )
+
+    check_budget("cart_add", results, record_property)
+
+
+def test_checkout(customer_client, catalog, record_property):
+    def setup():
+        cart = baker.make(Cart)
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, product=product, quantity=1) for product in catalog[:10]]
+        )
+        return (cart,)
+
+    results = measure(
+        lambda cart: customer_client.post("/store/orders/", {"cart_id": str(cart.id)}),
+        setup=setup,
+    )
+
+    check_budget("checkout", results, record_property)
+
+
+def test_order_list(api_client, authenticate, catalog, record_property):
+    staff = baker.make(settings.AUTH_USER_MODEL, is_staff=True)
+    orders = Order.objects.bulk_create(
+        [Order(customer=Customer.objects.get(user=staff), total=30) for _ in range(50)]
+    )
+    OrderItem.objects.bulk_create(
+        [
+            OrderItem(order=order, product=product, quantity=1, unit_price=10)
+            for order in orders
+            for product in catalog[:3]
+        ]
+    )
+    authenticate(user=staff)
+
+    # A keyset page, not all 50 orders.
+    results = measure(lambda: api_client.get("/store/orders/?cursor="))
+
+    check_budget("order_list", results, record_property)
@@ -0,0 +1,185 @@
+import json
+from decimal import Decimal
+from django.contrib.admin.models import LogEntry
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+import pytest
+
+from store import bulk
+from store.cache import (
+    CATALOG_VERSION_KEY,
+    collection_version_key,
+    get_version,
+    product_version_key,
+)
+from store.admin import BulkActionAdmin
+from store.models import Collection, Product
+from store.tasks import run_bulk_action
+
+
+def run_action(admin_client, action, products, **data):
+    return admin_client.post(
+        "/admin/store/product/",
+        {"action": action, "_selected_action": [product.id for product in products], **data},
+        follow=True,
+    )
+
+
+@pytest.mark.django_db
+class TestBulkActions:
+    def test_if_small_selection_runs_in_the_request(self, admin_client):
+        products = baker.make(Product, inventory=5, _quantity=3)
+
+        response = run_action(admin_client, "clear_inventory", products[:2])
+
+        assert "2 row(s) updated." in response.content.decode()
+        assert sorted(Product.objects.values_list("inventory", flat=True)) == [0, 0, 5]
+
+    def test_if_prices_are_adjusted_rounded_and_clamped(self, admin_client):
+        cheap = baker.make(Product, unit_price=Decimal("1.05"))
+        regular = baker.make(Product, unit_price=Decimal("19.99"))
+        dear = baker.make(Product, unit_price=Decimal("9999.00"))
+
+        run_action(admin_client, "adjust_prices", [regular, dear], percent="10")
+        run_action(admin_client, "adjust_prices", [cheap], percent="-50")
+
+        prices = dict(Product.objects.values_list("id", "unit_price"))
+        assert prices == {
+            cheap.id: Decimal("1.00"),
+            regular.id: Decimal("21.99"),
+            dear.id: Decimal("9999.99"),
+        }
+
+    def test_if_price_adjustment_needs_a_percent(self, admin_client):
+        product = baker.make(Product, unit_price=Decimal("10.00"))
+
+        response = run_action(admin_client, "adjust_prices", [product], percent="")
+
+        assert "Enter a valid percent" in response.content.decode()
+        product.refresh_from_db()
+        assert product.unit_price == Decimal("10.00")
+
+    def test_if_large_selection_runs_in_a_task_with_progress(
+        self, admin_client, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        monkeypatch.setattr(BulkActionAdmin, "inline_limit", 2)
+        monkeypatch.setattr(bulk, "BATCH_SIZE", 2)
+        products = baker.make(Product, inventory=5, _quantity=5)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = run_action(admin_client, "clear_inventory", products)
+
+        [message] = response.context["messages"]
+        progress_url = message.message.split('href="')[1].split('"')[0]
+        progress = admin_client.get(progress_url).json()
+        assert progress == {"action": "clear_inventory", "status": "done", "total": 5, "done": 5}
+        assert not Product.objects.exclude(inventory=0).exists()
+
+    def test_if_select_all_is_rebuilt_from_the_changelist_filters(
+        self, admin_client, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        monkeypatch.setattr(BulkActionAdmin, "inline_limit", 0)
+        low = baker.make(Product, title="lamp", inventory=5, _quantity=2)
+        baker.make(Product, title="lamp", inventory=50)
+        baker.make(Product, title="desk", inventory=5)
+        delay = run_bulk_action.delay
+        payloads = []
+
+        def capture(*args):
+            payloads.append(json.loads(json.dumps(args)))
+            return delay(*payloads[-1])
+
+        monkeypatch.setattr(run_bulk_action, "delay", capture)
+        with django_capture_on_commit_callbacks(execute=True):
+            admin_client.post(
+                "/admin/store/product/?inventory=%3C10&q=lamp",
+                {
+                    "action": "clear_inventory",
+                    "select_across": "1",
+                    "_selected_action": [low[0].id],
+                },
+            )
+
+        [(_, _, _, selection, _)] = payloads
+        assert selection["params"] == "inventory=%3C10&q=lamp"
+        cleared = Product.objects.filter(inventory=0).values_list("id", flat=True)
+        assert sorted(cleared) == sorted(product.id for product in low)
+
+    def test_if_edited_prices_are_saved_in_one_update(self, admin_client):
+        products = baker.make(Product, unit_price=10, _quantity=3)
+        data = {
+            "form-TOTAL_FORMS": 3,
+            "form-INITIAL_FORMS": 3,
+            "_save": "Save",
+        }
+        for index, product in enumerate(products):
+            data[f"form-{index}-id"] = product.id
+            data[f"form-{index}-unit_price"] = 20 + index
+
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post("/admin/store/product/", data)
+
+        writes = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith(("UPDATE", "INSERT"))
+        ]
+        assert response.status_code == 302
+        assert len(writes) == 2
+        assert writes[0].startswith('UPDATE "store_product"')
+        assert writes[1].startswith('INSERT INTO "django_admin_log"')
+        prices = Product.objects.order_by("id").values_list("unit_price", flat=True)
+        assert list(prices) == [20, 21, 22]
+        logged = LogEntry.objects.order_by("object_id").values_list("object_id", flat=True)
+        assert list(logged) == sorted(str(product.id) for product in products)
+
+    def test_if_batches_are_keyed_on_the_primary_key(self):
+        products = baker.make(Product, _quantity=5)
+
+        batches = list(bulk.batches(Product.objects.order_by("-id"), batch_size=2))
+
+        assert batches == [
+            [products[0].id, products[1].id],
+            [products[2].id, products[3].id],
+            [products[4].id],
+        ]
+
+    def test_if_a_batch_bumps_each_cache_key_once(self, django_capture_on_commit_callbacks):
+        collection = baker.make(Collection)
+        products = baker.make(Product, collection=collection, _quantity=4)
+        keys = [
+            CATALOG_VERSION_KEY,
+            collection_version_key(collection.id),
+            product_version_key(products[0].id),
+        ]
+        before = [get_version(key) for key in keys]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            bulk.run("job", "clear_inventory", Product.objects.all(), {})
+
+        # Once in the batch's transaction and once after it commits.
+        assert [get_version(key) - version for key, version in zip(keys, before)] == [2, 2, 2]
+
+    def test_if_failure_is_reported_in_progress(self, monkeypatch):
+        baker.make(Product, _quantity=3)
+
+        def fail(products):
+            raise ValueError("boom")
+
+        monkeypatch.setitem(bulk.ACTIONS, "fail", fail)
+        with pytest.raises(ValueError):
+            bulk.run("job", "fail", Product.objects.all(), {})
+
+        assert bulk.get_progress("job") == {
+            "action": "fail",
+            "status": "failed",
+            "total": 3,
+            "done": 0,
+            "error": "boom",
+        }
+
+    def test_if_unknown_job_returns_404(self, admin_client):
+        response = admin_client.get("/admin/store/product/bulk/missing/")
+
+        assert response.status_code == 404
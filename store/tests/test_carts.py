@@ -0,0 +1,177 @@
+from decimal import Decimal
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from model_bakery import baker
+import pytest
+
+from store.models import Cart, CartItem, OrderItem, Product, Promotion
+from store.serializers import CreateOrderSerializer
+
+
+@pytest.fixture(params=["store.carts.DatabaseCartStore", "store.carts.RedisCartStore"])
+def cart_store(request, settings):
+    settings.CART_STORE = request.param
+    return request.param
+
+
+@pytest.fixture
+def create_cart(api_client, cart_store):
+    def do_create_cart():
+        return api_client.post("/store/carts/").data["id"]  # type: ignore
+
+    return do_create_cart
+
+
+@pytest.mark.django_db
+class TestCartStores:
+    def test_if_items_are_added_listed_and_updated(self, api_client, create_cart):
+        product = baker.make(Product, unit_price=2)
+        cart_id = create_cart()
+
+        added = api_client.post(
+            f"/store/carts/{cart_id}/items/", {"product_id": product.id, "quantity": 1}
+        )
+        api_client.post(
+            f"/store/carts/{cart_id}/items/", {"product_id": product.id, "quantity": 2}
+        )
+        item_id = api_client.get(f"/store/carts/{cart_id}/items/").data[0]["id"]  # type: ignore
+        updated = api_client.put(
+            f"/store/carts/{cart_id}/items/{item_id}/", {"quantity": 3}
+        )
+        cart = api_client.get(f"/store/carts/{cart_id}/")
+
+        assert added.status_code == status.HTTP_201_CREATED
+        assert updated.data == {"quantity": 3}  # type: ignore
+        assert cart.data["items"][0]["product"]["id"] == product.id  # type: ignore
+        assert cart.data["items"][0]["quantity"] == 3  # type: ignore
+        assert cart.data["total_price"] == 6  # type: ignore
+
+    def test_if_cart_does_not_exist_returns_404(self, api_client, cart_store):
+        response = api_client.get("/store/carts/6d5f2a3e-9d64-4c1b-9d43-3a9c6b1f2e11/")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_deleted_cart_is_gone(self, api_client, create_cart):
+        cart_id = create_cart()
+
+        api_client.delete(f"/store/carts/{cart_id}/")
+        response = api_client.get(f"/store/carts/{cart_id}/")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_cart_is_checked_out_an_order_is_placed(self, api_client, create_cart):
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL))
+        product = baker.make(Product, inventory=5)
+        cart_id = create_cart()
+        api_client.post(
+            f"/store/carts/{cart_id}/items/", {"product_id": product.id, "quantity": 2}
+        )
+
+        response = api_client.post("/store/orders/", {"cart_id": cart_id})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert OrderItem.objects.get(product=product).quantity == 2
+        assert api_client.get(f"/store/carts/{cart_id}/").status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_if_cart_total_is_computed_by_the_database(api_client, django_assert_num_queries):
+    cart = baker.make(Cart)
+    products = baker.make(Product, unit_price=Decimal("2.50"), _quantity=10)
+    for product in products:
+        baker.make(CartItem, cart=cart, product=product, quantity=2)
+    products[0].promotions.add(
+        baker.make(Promotion, discount=10), baker.make(Promotion, discount=50)
+    )
+
+    # the cart with its total, then the items with their products and totals
+    with django_assert_num_queries(2):
+        response = api_client.get(f"/store/carts/{cart.id}/")
+
+    totals = {item["product"]["id"]: item["total_price"] for item in response.data["items"]}  # type: ignore
+    assert response.data["total_price"] == Decimal("47.50")  # type: ignore
+    assert totals[products[0].id] == Decimal("2.50")
+    assert totals[products[1].id] == Decimal(5)
+
+
+@pytest.mark.django_db
+def test_if_redis_carts_are_not_written_to_the_database(api_client, settings):
+    settings.CART_STORE = "store.carts.RedisCartStore"
+    product = baker.make(Product)
+
+    cart_id = api_client.post("/store/carts/").data["id"]  # type: ignore
+    api_client.post(
+        f"/store/carts/{cart_id}/items/", {"product_id": product.id, "quantity": 1}
+    )
+
+    assert not Cart.objects.exists()
+    assert not CartItem.objects.exists()
+
+
+@pytest.mark.django_db
+def test_if_redis_cart_is_written_only_inside_checkout(api_client, settings):
+    settings.CART_STORE = "store.carts.RedisCartStore"
+    product = baker.make(Product, inventory=1)
+    cart_id = api_client.post("/store/carts/").data["id"]  # type: ignore
+    api_client.post(
+        f"/store/carts/{cart_id}/items/", {"product_id": product.id, "quantity": 2}
+    )
+    serializer = CreateOrderSerializer(
+        data={"cart_id": cart_id},
+        context={"customer_id": baker.make(settings.AUTH_USER_MODEL).customer.id},
+    )
+
+    assert serializer.is_valid()
+    assert not Cart.objects.exists()
+    with pytest.raises(ValidationError):
+        serializer.save()
+    assert not Cart.objects.exists()
+    assert not CartItem.objects.exists()
+    assert api_client.get(f"/store/carts/{cart_id}/").status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestAddCartItems:
+    def test_if_batch_is_written_with_one_product_lookup(
+        self, api_client, create_cart, django_assert_max_num_queries
+    ):
+        products = baker.make(Product, _quantity=5)
+        cart_id = create_cart()
+        items = [{"product_id": product.id, "quantity": 2} for product in products]
+
+        # product IN (...) lookup, the cart lookup and the upsert
+        with django_assert_max_num_queries(3):
+            response = api_client.post(
+                f"/store/carts/{cart_id}/items/", items, format="json"
+            )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data) == 5  # type: ignore
+        listed = api_client.get(f"/store/carts/{cart_id}/items/").data  # type: ignore
+        assert sorted(item["product"]["id"] for item in listed) == sorted(
+            product.id for product in products
+        )
+
+    def test_if_batch_has_unknown_product_returns_404(self, api_client, create_cart):
+        product = baker.make(Product)
+        cart_id = create_cart()
+        items = [
+            {"product_id": product.id, "quantity": 1},
+            {"product_id": product.id + 100, "quantity": 1},
+        ]
+
+        response = api_client.post(f"/store/carts/{cart_id}/items/", items, format="json")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.get(f"/store/carts/{cart_id}/items/").data == []  # type: ignore
+
+    def test_if_cart_does_not_exist_returns_404(self, api_client, cart_store):
+        product = baker.make(Product)
+
+        response = api_client.post(
+            "/store/carts/6d5f2a3e-9d64-4c1b-9d43-3a9c6b1f2e11/items/",
+            {"product_id": product.id, "quantity": 1},
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
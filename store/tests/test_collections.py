@@ -1,3 +1,5 @@
+from io import StringIO
+from django.core.management import call_command
 from rest_framework import status
 from model_bakery import baker
 from rest_framework.test import APIClient
@@ -57,3 +59,71 @@ class TestRetriveCollection:
             "title": collection.title,
             "products_count": 0,
         }
+
+
+@pytest.mark.django_db
+class TestCollectionProductsCount:
+    def test_if_count_follows_create_move_and_delete(self):
+        collection, other = baker.make(Collection, _quantity=2)
+        products = baker.make(Product, collection=collection, _quantity=3)
+
+        product = Product.objects.get(pk=products[0].id)
+        product.collection = other
+        product.save()
+        products[1].delete()
+
+        collection.refresh_from_db()
+        other.refresh_from_db()
+        assert collection.products_count == 1
+        assert other.products_count == 1
+
+    def test_if_count_follows_products_loaded_with_a_deferred_collection(self):
+        collection, other = baker.make(Collection, _quantity=2)
+        moved, kept, deleted = baker.make(Product, collection=collection, _quantity=3)
+
+        product = Product.objects.only("title").get(pk=moved.id)
+        product.collection = other
+        product.save()
+        product.save()
+        product = Product.objects.defer("collection").get(pk=kept.id)
+        product.title = "renamed"
+        product.save()
+        Product.objects.only("title").get(pk=deleted.id).delete()
+
+        collection.refresh_from_db()
+        other.refresh_from_db()
+        assert collection.products_count == 1
+        assert other.products_count == 1
+
+    def test_if_count_follows_bulk_create_and_update(self):
+        collection, other = baker.make(Collection, _quantity=2)
+        Product.objects.bulk_create(
+            baker.prepare(Product, collection=collection, _quantity=4)
+        )
+
+        moved = Product.objects.filter(
+            pk__in=Product.objects.filter(collection=collection).values("pk")[:3]
+        ).update(collection=other)
+
+        collection.refresh_from_db()
+        other.refresh_from_db()
+        assert moved == 3
+        assert collection.products_count == 1
+        assert other.products_count == 3
+
+    def test_if_rebuild_command_fixes_drift(self):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, _quantity=2)
+        Collection.objects.update(products_count=7)
+
+        call_command("rebuild_collection_counts", stdout=StringIO())
+
+        collection.refresh_from_db()
+        assert collection.products_count == 2
+
+    def test_if_seeded_collections_are_counted(self):
+        call_command("seed_db", stdout=StringIO())
+
+        assert Collection.objects.get(title="Grocery").products_count == (
+            Product.objects.filter(collection__title="Grocery").count()
+        )
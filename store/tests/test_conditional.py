@@ -0,0 +1,110 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from rest_framework import status
+import pytest
+
+from store.models import Collection, Product, ProductImage
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    def test_if_product_detail_has_validators(self, api_client):
+        product = baker.make(Product)
+
+        response = api_client.get(f"/store/products/{product.id}/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"].startswith('W/"')
+        assert "Last-Modified" in response
+
+    def test_if_matching_etag_returns_304(self, api_client):
+        product = baker.make(Product)
+        etag = api_client.get(f"/store/products/{product.id}/")["ETag"]
+
+        response = api_client.get(f"/store/products/{product.id}/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+        assert not response.content
+
+    def test_if_304_skips_serialization_when_not_cached(self, api_client):
+        baker.make(Product, _quantity=5)
+        etag = api_client.get("/store/products/")["ETag"]
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get("/store/products/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        # The ids and timestamps, and the like counts the flush took with it.
+        assert len(context.captured_queries) == 2
+
+    def test_if_modified_since_returns_304(self, api_client):
+        product = baker.make(Product)
+        last_modified = api_client.get(f"/store/products/{product.id}/")["Last-Modified"]
+
+        response = api_client.get(
+            f"/store/products/{product.id}/", HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_reserved_inventory_changes_etag(self, api_client):
+        product = baker.make(Product, inventory=10)
+        etag = api_client.get(f"/store/products/{product.id}/")["ETag"]
+
+        cache.clear()
+        Product.objects.filter(pk=product.pk).update(inventory=9)
+        response = api_client.get(f"/store/products/{product.id}/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+
+    def test_if_inventory_change_changes_etag(self, api_client, authenticate):
+        product = baker.make(Product, inventory=10)
+        etag = api_client.get(f"/store/products/{product.id}/")["ETag"]
+
+        authenticate(is_staff=True)
+        api_client.patch(f"/store/products/{product.id}/", {"inventory": 8})
+        response = api_client.get(f"/store/products/{product.id}/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+        assert response.data["inventory"] == 8  # type: ignore
+
+    def test_if_new_image_changes_list_etag(self, api_client):
+        product = baker.make(Product)
+        etag = api_client.get("/store/products/")["ETag"]
+
+        baker.make(ProductImage, product=product, image="store/images/a.jpg")
+        response = api_client.get("/store/products/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+
+    def test_if_collection_count_changes_etag(self, api_client):
+        collection = baker.make(Collection)
+        etag = api_client.get(f"/store/collections/{collection.id}/")["ETag"]
+
+        baker.make(Product, collection=collection)
+        response = api_client.get(f"/store/collections/{collection.id}/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+        assert response.data["products_count"] == 1  # type: ignore
+
+    def test_if_image_list_returns_304(self, api_client):
+        image = baker.make(ProductImage, image="store/images/a.jpg")
+        url = f"/store/products/{image.product_id}/images/"
+        etag = api_client.get(url)["ETag"]
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_missing_product_still_returns_404(self, api_client):
+        response = api_client.get("/store/products/999/", HTTP_IF_NONE_MATCH='W/"x"')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
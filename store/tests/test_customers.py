@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+import pytest
+
+from store.models import Cart, CartItem, Customer, Order, Product
+
+
+@pytest.fixture
+def user():
+    return get_user_model().objects.create_user(
+        username="ada", email="ada@example.com", password="secret-password"
+    )
+
+
+@pytest.fixture
+def token_client(api_client, user):
+    response = api_client.post(
+        "/auth/jwt/create/", {"username": "ada", "password": "secret-password"}
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"JWT {response.data['access']}")
+    return api_client
+
+
+def customer_queries(context):
+    return [query for query in context.captured_queries if "store_customer" in query["sql"]]
+
+
+@pytest.mark.django_db
+class TestCustomerClaim:
+    def test_if_tokens_carry_the_customer_id(self, api_client, user):
+        response = api_client.post(
+            "/auth/jwt/create/", {"username": "ada", "password": "secret-password"}
+        )
+        refreshed = api_client.post("/auth/jwt/refresh/", {"refresh": response.data["refresh"]})
+
+        assert AccessToken(response.data["access"])["customer_id"] == user.customer.id
+        assert AccessToken(refreshed.data["access"])["customer_id"] == user.customer.id
+
+    def test_if_orders_are_listed_without_a_customer_query(self, token_client, user):
+        baker.make(Order, customer=user.customer)
+        baker.make(Order, customer=baker.make(get_user_model()).customer)
+
+        with CaptureQueriesContext(connection) as context:
+            response = token_client.get("/store/orders/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 1  # type: ignore
+        assert customer_queries(context) == []
+        # The user, the orders and their items
+        assert len(context.captured_queries) == 3
+
+    def test_if_checkout_skips_the_customer_query(self, token_client, user):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=baker.make(Product, inventory=5), quantity=1)
+
+        with CaptureQueriesContext(connection) as context:
+            response = token_client.post("/store/orders/", {"cart_id": str(cart.id)})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Order.objects.get().customer_id == user.customer.id
+        assert customer_queries(context) == []
+
+    def test_if_tokens_without_the_claim_use_the_cache(self, api_client, user):
+        api_client.credentials(HTTP_AUTHORIZATION=f"JWT {AccessToken.for_user(user)}")
+
+        with CaptureQueriesContext(connection) as first:
+            api_client.get("/store/orders/")
+        with CaptureQueriesContext(connection) as second:
+            response = api_client.get("/store/customers/me/")
+
+        assert len(customer_queries(first)) == 1
+        # Only the customer row /me renders
+        assert len(customer_queries(second)) == 1
+        assert response.data["id"] == user.customer.id  # type: ignore
+
+    def test_if_customer_changes_invalidate_the_cache(self, api_client, user):
+        api_client.force_authenticate(user=user)
+        api_client.get("/store/orders/")
+
+        Customer.objects.filter(pk=user.customer.pk).delete()
+        replacement = Customer.objects.create(user=user)
+        response = api_client.get("/store/customers/me/")
+
+        assert response.data["id"] == replacement.id  # type: ignore
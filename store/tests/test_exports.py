@@ -0,0 +1,102 @@
+import json
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from model_bakery import baker
+import pytest
+
+from store import exports
+from store.models import Customer, Order, OrderItem, Product
+
+
+@pytest.fixture
+def staff_client(api_client):
+    api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL, is_staff=True))
+    return api_client
+
+
+def place_orders(count, items_per_order=1, **kwargs):
+    customer = Customer.objects.get(user=baker.make(settings.AUTH_USER_MODEL))
+    product = baker.make(Product)
+    orders = Order.objects.bulk_create(
+        [Order(customer=customer, **kwargs) for _ in range(count)]
+    )
+    OrderItem.objects.bulk_create(
+        [
+            OrderItem(order=order, product=product, quantity=1, unit_price=1)
+            for order in orders
+            for _ in range(items_per_order)
+        ]
+    )
+    return orders
+
+
+def read(response):
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+class TestExportOrders:
+    def test_if_user_is_not_admin_returns_403(self, api_client, authenticate):
+        authenticate()
+
+        response = api_client.get("/store/orders/export/")
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_csv_has_a_row_per_order_item(self, staff_client):
+        place_orders(3, items_per_order=2)
+
+        response = staff_client.get("/store/orders/export/")
+
+        lines = read(response).splitlines()
+        assert response["Content-Type"] == "text/csv"
+        assert lines[0].split(",") == exports.HEADER
+        assert len(lines) == 7
+
+    def test_if_ndjson_is_filtered_by_status_and_date(self, staff_client):
+        place_orders(2, payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        place_orders(3, payment_status=Order.PAYMENT_STATUS_PENDING)
+        since = (timezone.now() - timedelta(days=1)).date()
+
+        response = staff_client.get(
+            f"/store/orders/export/?file_type=ndjson&payment_status=C&placed_after={since}"
+        )
+
+        rows = [json.loads(line) for line in read(response).splitlines()]
+        assert len(rows) == 2
+        assert {row["payment_status"] for row in rows} == {"C"}
+
+    def test_if_filter_is_invalid_returns_400(self, staff_client):
+        response = staff_client.get("/store/orders/export/?placed_after=yesterday")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_memory_stays_flat_as_the_export_grows(self):
+        def peak_memory():
+            tracemalloc.start()
+            response = exports.streaming_response(OrderItem.objects.all(), "csv", chunk_size=100)
+            for _ in response.streaming_content:
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+
+        place_orders(500)
+        small = peak_memory()
+        place_orders(4500)
+        large = peak_memory()
+
+        assert large < small * 1.5
+
+    def test_if_benchmark_reports_the_exported_rows(self):
+        place_orders(3)
+        out = StringIO()
+
+        call_command("benchmark_order_export", "--file-type", "ndjson", stdout=out)
+
+        assert out.getvalue().startswith("Exported 3 line(s)")
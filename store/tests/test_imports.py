@@ -0,0 +1,137 @@
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import SlugField
+from model_bakery import baker
+import pytest
+
+from store.models import Collection, Product
+
+
+def import_products(path, *args):
+    out = StringIO()
+    call_command("import_products", str(path), *args, stdout=out)
+    return out.getvalue()
+
+
+def write_csv(path, rows):
+    lines = ["title,slug,description,unit_price,inventory,collection"]
+    lines += [",".join(str(value) for value in row) for row in rows]
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("method", ["copy", "batch"])
+class TestImportProducts:
+    def test_if_rows_are_upserted_by_slug(self, tmp_path, method):
+        collection = baker.make(Collection, title="Toys")
+        baker.make(Product, slug="kept", title="Kept", description="d",
+                   unit_price=5, inventory=1, collection=collection)
+        baker.make(Product, slug="changed", title="Old", collection=collection)
+        path = write_csv(tmp_path / "catalog.csv", [
+            ("Kept", "kept", "d", "5.00", 1, "Toys"),
+            ("New title", "changed", "d", "7.50", 3, "Games"),
+            ("Added", "added", "d", "2", 9, "Games"),
+            ("Added again", "added", "d", "3", 9, "Games"),
+        ])
+
+        out = import_products(path, "--method", method, "--chunk-size", "2")
+
+        assert out.startswith(
+            "Inserted 1, updated 1, unchanged 1 product(s) and created 1 collection(s)"
+        )
+        changed = Product.objects.get(slug="changed")
+        assert (changed.title, changed.collection.title) == ("New title", "Games")
+        assert Product.objects.get(slug="added").title == "Added again"
+        assert dict(Collection.objects.values_list("title", "products_count")) == {
+            "Toys": 1,
+            "Games": 2,
+        }
+
+    def test_if_jsonl_is_imported(self, tmp_path, method):
+        path = tmp_path / "catalog.jsonl"
+        path.write_text("\n".join(
+            json.dumps({"title": f"P{i}", "slug": f"p-{i}", "description": "d",
+                        "unit_price": "1.25", "inventory": 2, "collection": "Books"})
+            for i in range(5)
+        ))
+
+        import_products(path, "--method", method)
+
+        assert Product.objects.filter(collection__title="Books").count() == 5
+
+    def test_if_row_is_invalid_raises_with_line_number(self, tmp_path, method):
+        path = write_csv(tmp_path / "catalog.csv", [
+            ("Fine", "fine", "d", "1", 1, "Toys"),
+            ("Broken", "not a slug", "d", "1", 1, "Toys"),
+        ])
+
+        with pytest.raises(CommandError, match="line 3: slug"):
+            import_products(path, "--method", method, "--chunk-size", "10")
+
+        assert not Product.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("method", ["copy", "batch"])
+def test_if_import_fills_the_search_vector(tmp_path, api_client, method):
+    path = write_csv(tmp_path / "catalog.csv", [("Blue lamp", "lamp", "d", "1", 1, "Home")])
+
+    import_products(path, "--method", method)
+
+    response = api_client.get("/store/products/?search=lamp")
+    assert [product["slug"] for product in response.data["results"]] == ["lamp"]  # type: ignore
+
+
+@pytest.mark.django_db
+def test_if_backfill_gives_duplicate_slugs_distinct_ones():
+    unique = Product._meta.get_field("slug")
+    plain = SlugField()
+    plain.set_attributes_from_name("slug")
+    plain.model = Product
+    # A database from before slugs were unique.
+    with connection.schema_editor() as editor:
+        editor.alter_field(Product, unique, plain)
+    first, second = baker.make(Product, title="Blue lamp", slug="blue-lamp", _quantity=2)
+    kept = baker.make(Product, slug="kept")
+
+    call_command("backfill_product_slugs", stdout=StringIO())
+
+    with connection.cursor() as cursor:
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    with connection.schema_editor() as editor:
+        editor.alter_field(Product, plain, unique)
+
+    slugs = dict(Product.objects.values_list("id", "slug"))
+    assert slugs == {
+        first.id: f"blue-lamp-{first.id}",
+        second.id: f"blue-lamp-{second.id}",
+        kept.id: "kept",
+    }
+
+
+@pytest.fixture
+def ids_past_int4():
+    sequences = ["store_product_id_seq", "store_collection_id_seq"]
+    with connection.cursor() as cursor:
+        for sequence in sequences:
+            cursor.execute(f"ALTER SEQUENCE {sequence} RESTART WITH {2**31}")
+    yield
+    with connection.cursor() as cursor:
+        for sequence in sequences:
+            cursor.execute(f"ALTER SEQUENCE {sequence} RESTART")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("method", ["copy", "batch"])
+def test_if_ids_past_int4_are_imported(tmp_path, ids_past_int4, method):
+    path = write_csv(tmp_path / "catalog.csv", [("Lamp", "lamp", "d", "1", 1, "Home")])
+
+    import_products(path, "--method", method)
+
+    product = Product.objects.get(slug="lamp")
+    assert product.id >= 2**31
+    assert product.collection.products_count == 1
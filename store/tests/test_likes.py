@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from model_bakery import baker
+from rest_framework import status
+import pytest
+
+from likes import counters
+from likes.models import LikedItem
+from likes.tasks import flush_likes
+from store.models import Product
+
+
+@pytest.fixture
+def like(api_client):
+    def do_like(product, user, method="post"):
+        api_client.force_authenticate(user=user)
+        response = getattr(api_client, method)(f"/store/products/{product.id}/like/")
+        api_client.force_authenticate(user=None)
+        return response
+
+    return do_like
+
+
+@pytest.mark.django_db
+class TestLikeProduct:
+    def test_if_user_is_anonymous_returns_401(self, api_client):
+        product = baker.make(Product)
+
+        response = api_client.post(f"/store/products/{product.id}/like/")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_product_does_not_exist_returns_404(self, like):
+        response = like(Product(id=0), baker.make(settings.AUTH_USER_MODEL))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_likes_are_counted_once_per_user(self, like):
+        product = baker.make(Product)
+        first, second = baker.make(settings.AUTH_USER_MODEL, _quantity=2)
+
+        like(product, first)
+        like(product, first)
+        response = like(product, second)
+        unliked = like(product, first, "delete")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"likes": 2}  # type: ignore
+        assert unliked.data == {"likes": 1}  # type: ignore
+
+    def test_if_likes_are_written_only_by_the_flush(self, like):
+        product, other = baker.make(Product, _quantity=2)
+        first, second = baker.make(settings.AUTH_USER_MODEL, _quantity=2)
+        like(product, first)
+        like(other, first)
+        like(other, second)
+
+        assert not LikedItem.objects.exists()
+        assert flush_likes.delay().get() == 3
+        like(other, first, "delete")
+        flush_likes.delay()
+
+        liked = LikedItem.objects.values_list("object_id", "user_id")
+        assert sorted(liked) == sorted([(product.id, first.id), (other.id, second.id)])
+        assert flush_likes.delay().get() == 0
+
+    def test_if_counts_are_served_with_products(self, api_client, like):
+        product, other = baker.make(Product, _quantity=2)
+        etag = api_client.get(f"/store/products/{product.id}/")["ETag"]
+
+        like(product, baker.make(settings.AUTH_USER_MODEL))
+        detail = api_client.get(f"/store/products/{product.id}/", HTTP_IF_NONE_MATCH=etag)
+        response = api_client.get("/store/products/")
+
+        assert detail.status_code == status.HTTP_200_OK
+        assert detail.data["likes"] == 1  # type: ignore
+        likes = {row["id"]: row["likes"] for row in response.data["results"]}  # type: ignore
+        assert likes == {product.id: 1, other.id: 0}
+
+    def test_if_counts_come_back_from_the_database_after_a_restart(self, api_client, like):
+        product = baker.make(Product)
+        first, second = baker.make(settings.AUTH_USER_MODEL, _quantity=2)
+        like(product, first)
+        like(product, second)
+        flush_likes.delay()
+
+        cache.clear()
+        # A new process starts with a cold content type cache too.
+        ContentType.objects.clear_cache()
+        async_detail = api_client.get(f"/store/async/products/{product.id}/").json()
+        cache.clear()
+        detail = api_client.get(f"/store/products/{product.id}/")
+        again = like(product, first)
+        unliked = like(product, second, "delete")
+
+        assert async_detail["likes"] == 2
+        assert detail.data["likes"] == 2  # type: ignore
+        assert again.data == {"likes": 2}  # type: ignore
+        assert unliked.data == {"likes": 1}  # type: ignore
+
+    def test_if_stored_counts_come_with_the_product_page(
+        self, api_client, like, django_assert_num_queries
+    ):
+        product = baker.make(Product)
+        like(product, baker.make(settings.AUTH_USER_MODEL))
+        flush_likes.delay()
+
+        cache.clear()
+        # The page with its stored like counts, then the images.
+        with django_assert_num_queries(2):
+            response = api_client.get("/store/products/")
+
+        assert response.data["results"][0]["likes"] == 1  # type: ignore
+
+    def test_if_an_interrupted_flush_is_replayed(self, like, monkeypatch):
+        product = baker.make(Product)
+        user = baker.make(settings.AUTH_USER_MODEL)
+        like(product, user)
+
+        def fail(changes):
+            raise RuntimeError
+
+        monkeypatch.setattr(counters, "write_changes", fail)
+        with pytest.raises(RuntimeError):
+            counters.flush()
+        monkeypatch.undo()
+        like(product, user, "delete")
+        counters.flush()
+
+        assert get_redis_connection("default").exists(counters.PENDING_KEY)
+        assert LikedItem.objects.filter(object_id=product.id).exists()
+        counters.flush()
+        assert not LikedItem.objects.exists()
@@ -0,0 +1,90 @@
+from celery import shared_task
+from model_bakery import baker
+from prometheus_client import REGISTRY
+from rest_framework import status
+import pytest
+
+from store.models import Product
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@shared_task
+def add(x, y):
+    return x + y
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+    def test_if_request_latency_and_queries_are_recorded(self, api_client):
+        product = baker.make(Product)
+        requests = sample(
+            "storefront_request_duration_seconds_count",
+            view="products-detail", method="GET", status="200",
+        )
+        queries = sample("storefront_request_db_queries_sum", view="products-detail")
+
+        api_client.get(f"/store/products/{product.id}/")
+
+        assert sample(
+            "storefront_request_duration_seconds_count",
+            view="products-detail", method="GET", status="200",
+        ) == requests + 1
+        assert sample("storefront_request_db_queries_sum", view="products-detail") > queries
+
+    def test_if_cache_hits_and_misses_are_counted(self, api_client):
+        baker.make(Product)
+        misses = sample("storefront_cache_lookups_total", view="products-list", result="miss")
+        hits = sample("storefront_cache_lookups_total", view="products-list", result="hit")
+
+        api_client.get("/store/products/")
+        api_client.get("/store/products/")
+
+        assert sample(
+            "storefront_cache_lookups_total", view="products-list", result="miss"
+        ) == misses + 1
+        assert sample(
+            "storefront_cache_lookups_total", view="products-list", result="hit"
+        ) == hits + 1
+
+    def test_if_metrics_endpoint_exposes_the_metrics(self, api_client, settings):
+        settings.METRICS_ALLOWED_IPS = ["127.0.0.1"]
+        api_client.get("/store/collections/")
+
+        response = api_client.get("/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b'storefront_response_size_bytes_count{view="collection-list"}' in response.content
+
+    def test_if_metrics_endpoint_is_closed_to_other_addresses(self, api_client, settings):
+        settings.METRICS_ALLOWED_IPS = ["10.0.0.5"]
+
+        response = api_client.get("/metrics")
+        allowed = api_client.get("/metrics", REMOTE_ADDR="10.0.0.5")
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert allowed.status_code == status.HTTP_200_OK
+
+    def test_if_metrics_endpoint_is_closed_by_default(self, api_client):
+        response = api_client.get("/metrics")
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_staff_can_read_metrics_from_anywhere(self, client, admin_user):
+        client.force_login(admin_user)
+
+        response = client.get("/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+
+
+def test_if_celery_task_runtime_is_recorded():
+    count = sample("storefront_celery_task_duration_seconds_count", task=add.name, state="SUCCESS")
+
+    add.apply(args=[1, 2])
+
+    assert sample(
+        "storefront_celery_task_duration_seconds_count", task=add.name, state="SUCCESS"
+    ) == count + 1
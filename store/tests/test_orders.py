@@ -0,0 +1,187 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection
+from rest_framework import serializers, status
+from model_bakery import baker
+import pytest
+
+from store.models import Cart, CartItem, Customer, Order, OrderItem, Product
+from store.serializers import CreateOrderSerializer
+
+
+def checkout(user, cart):
+    serializer = CreateOrderSerializer(
+        data={"cart_id": str(cart.id)}, context={"customer_id": user.customer.id}
+    )
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+@pytest.mark.django_db
+class TestCheckout:
+    def test_if_cart_is_checked_out_inventory_is_decremented(self):
+        user = baker.make(settings.AUTH_USER_MODEL)
+        product = baker.make(Product, inventory=5, unit_price=Decimal("1.25"))
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=product, quantity=2)
+
+        order = checkout(user, cart)
+
+        product.refresh_from_db()
+        order.refresh_from_db()
+        assert product.inventory == 3
+        assert order.total == Decimal("2.50")
+        assert order.customer_id == Customer.objects.get(user=user).id
+        assert list(order.items.values_list("product_id", "quantity")) == [(product.id, 2)]
+        assert not Cart.objects.filter(pk=cart.id).exists()
+
+    def test_if_inventory_is_insufficient_nothing_is_written(self):
+        user = baker.make(settings.AUTH_USER_MODEL)
+        product, scarce = baker.make(Product, inventory=5, _quantity=2)
+        Product.objects.filter(pk=scarce.id).update(inventory=1)
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=product, quantity=1)
+        baker.make(CartItem, cart=cart, product=scarce, quantity=2)
+
+        with pytest.raises(serializers.ValidationError):
+            checkout(user, cart)
+
+        product.refresh_from_db()
+        assert product.inventory == 5
+        assert not Order.objects.exists()
+        assert Cart.objects.filter(pk=cart.id).exists()
+
+    def test_if_cart_is_empty_returns_400(self, api_client):
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL))
+        cart = baker.make(Cart)
+
+        response = api_client.post("/store/orders/", {"cart_id": str(cart.id)})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_checkout_query_count_does_not_depend_on_cart_size(
+        self, django_assert_num_queries
+    ):
+        user = baker.make(settings.AUTH_USER_MODEL)
+        cart = baker.make(Cart)
+        for product in baker.make(Product, inventory=10, _quantity=10):
+            baker.make(CartItem, cart=cart, product=product, quantity=1)
+
+        # cart with discounts, cart items + cart delete, inventory lock and
+        # update, order, order items and the savepoint pair of the nested
+        # atomic block
+        with django_assert_num_queries(9):
+            checkout(user, cart)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_if_parallel_checkouts_do_not_oversell():
+    product = baker.make(Product, inventory=5)
+    buyers = []
+    for _ in range(12):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=product, quantity=1)
+        buyers.append((baker.make(settings.AUTH_USER_MODEL), cart))
+
+    def attempt(buyer):
+        try:
+            checkout(*buyer)
+            return True
+        except serializers.ValidationError:
+            return False
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(buyers)) as executor:
+        results = list(executor.map(attempt, buyers))
+
+    product.refresh_from_db()
+    assert results.count(True) == 5
+    assert product.inventory == 0
+    assert OrderItem.objects.filter(product=product).count() == 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_if_overlapping_checkouts_do_not_deadlock():
+    first, second, third = baker.make(Product, inventory=24, _quantity=3)
+    buyers = []
+    for products in [(first, second, third), (third, second, first)] * 6:
+        cart = baker.make(Cart)
+        for product in products:
+            baker.make(CartItem, cart=cart, product=product, quantity=2)
+        buyers.append((baker.make(settings.AUTH_USER_MODEL), cart))
+
+    def attempt(buyer):
+        try:
+            return checkout(*buyer)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(buyers)) as executor:
+        orders = list(executor.map(attempt, buyers))
+
+    assert len(orders) == 12
+    assert set(Product.objects.values_list("inventory", flat=True)) == {0}
+
+
+@pytest.mark.django_db
+class TestListOrders:
+    def place_orders(self, customer, count):
+        for order in baker.make(Order, customer=customer, _quantity=count):
+            baker.make(OrderItem, order=order, unit_price=1, quantity=1, _quantity=3)
+
+    @pytest.mark.parametrize("count", [1, 10])
+    def test_if_staff_list_query_count_is_fixed(
+        self, api_client, django_assert_num_queries, count
+    ):
+        staff = baker.make(settings.AUTH_USER_MODEL, is_staff=True)
+        self.place_orders(Customer.objects.get(user=staff), count)
+        api_client.force_authenticate(user=staff)
+
+        # the orders, then their items joined with products
+        with django_assert_num_queries(2):
+            response = api_client.get("/store/orders/")
+
+        assert len(response.data) == count  # type: ignore
+        assert len(response.data[0]["items"]) == 3  # type: ignore
+
+    @pytest.mark.parametrize("count", [1, 10])
+    def test_if_customer_list_query_count_is_fixed(
+        self, api_client, django_assert_num_queries, count
+    ):
+        user = baker.make(settings.AUTH_USER_MODEL)
+        self.place_orders(Customer.objects.get(user=user), count)
+        other = baker.make(settings.AUTH_USER_MODEL)
+        self.place_orders(Customer.objects.get(user=other), 2)
+        api_client.force_authenticate(user=user)
+        # Without a token claim the first request caches the customer id.
+        api_client.get("/store/orders/")
+
+        with django_assert_num_queries(2):
+            response = api_client.get("/store/orders/")
+
+        assert len(response.data) == count  # type: ignore
+
+    def test_if_cursor_pages_are_opt_in(self, api_client):
+        staff = baker.make(settings.AUTH_USER_MODEL, is_staff=True)
+        self.place_orders(Customer.objects.get(user=staff), 12)
+        api_client.force_authenticate(user=staff)
+
+        first = api_client.get("/store/orders/?cursor=")
+        second = api_client.get(first.data["next"])  # type: ignore
+
+        assert len(first.data["results"]) == 10  # type: ignore
+        assert len(second.data["results"]) == 2  # type: ignore
+        assert second.data["next"] is None  # type: ignore
+
+    def test_if_summary_list_has_no_items(self, api_client, django_assert_num_queries):
+        staff = baker.make(settings.AUTH_USER_MODEL, is_staff=True)
+        self.place_orders(Customer.objects.get(user=staff), 5)
+        api_client.force_authenticate(user=staff)
+
+        with django_assert_num_queries(1):
+            response = api_client.get("/store/orders/?summary")
+
+        assert "items" not in response.data[0]  # type: ignore
+        assert "total" in response.data[0]  # type: ignore
@@ -0,0 +1,133 @@
+from decimal import Decimal
+from django.conf import settings
+from model_bakery import baker
+import pytest
+
+from store.models import Cart, CartItem, Product, Promotion
+from store.pricing import TAX_RATE, effective_price
+from store.serializers import CreateOrderSerializer
+
+
+def price_with_tax(price):
+    return Decimal(price) * TAX_RATE
+
+
+class TestEffectivePrice:
+    def test_if_discount_is_a_percentage(self):
+        assert effective_price(Decimal("19.99"), 15) == Decimal("16.99")
+
+    def test_if_discount_is_clamped(self):
+        assert effective_price(Decimal("10.00"), 0) == Decimal("10.00")
+        assert effective_price(Decimal("10.00"), 150) == Decimal("0.00")
+        assert effective_price(Decimal("10.00"), -5) == Decimal("10.00")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("discount", [15, 12.5, 0.1, 150, -5])
+def test_if_database_prices_match_effective_price(discount):
+    product = baker.make(Product, unit_price=Decimal("19.99"))
+    product.promotions.add(baker.make(Promotion, discount=discount))
+    cart = baker.make(Cart)
+    baker.make(CartItem, cart=cart, product=product, quantity=1)
+
+    cart = Cart.objects.with_total_price().get(pk=cart.id)
+
+    assert cart.total_price == effective_price(Decimal("19.99"), discount)  # type: ignore
+
+
+@pytest.mark.django_db
+class TestPromotionPrices:
+    def test_if_best_promotion_applies(self, api_client):
+        product = baker.make(Product, unit_price=Decimal("20.00"))
+        product.promotions.add(
+            baker.make(Promotion, discount=10), baker.make(Promotion, discount=25)
+        )
+
+        response = api_client.get(f"/store/products/{product.id}/")
+
+        assert response.data["unit_price"] == "20.00"  # type: ignore
+        assert response.data["price_with_tax"] == price_with_tax("15.00")  # type: ignore
+
+    def test_if_list_and_detail_agree(self, api_client):
+        product = baker.make(Product, unit_price=Decimal("20.00"))
+        product.promotions.add(baker.make(Promotion, discount=10))
+
+        detail = api_client.get(f"/store/products/{product.id}/").json()
+        listed = api_client.get("/store/products/").json()["results"][0]
+        async_detail = api_client.get(f"/store/async/products/{product.id}/").json()
+
+        assert listed["price_with_tax"] == detail["price_with_tax"]
+        assert async_detail["price_with_tax"] == detail["price_with_tax"]
+
+    def test_if_adding_a_promotion_reprices_cached_product(self, api_client):
+        product = baker.make(Product, unit_price=Decimal("20.00"))
+        api_client.get(f"/store/products/{product.id}/")
+
+        product.promotions.add(baker.make(Promotion, discount=50))
+        response = api_client.get(f"/store/products/{product.id}/")
+
+        assert response.data["price_with_tax"] == price_with_tax("10.00")  # type: ignore
+
+    def test_if_promotion_change_reprices_products(self, api_client):
+        promotion = baker.make(Promotion, discount=50)
+        product = baker.make(Product, unit_price=Decimal("20.00"))
+        promotion.product_set.add(product)
+        api_client.get("/store/products/")
+
+        promotion.discount = 25
+        promotion.save()
+        response = api_client.get("/store/products/")
+
+        assert response.data["results"][0]["price_with_tax"] == price_with_tax("15.00")  # type: ignore
+
+    def test_if_promotion_delete_reprices_products(self, api_client):
+        promotion = baker.make(Promotion, discount=50)
+        product = baker.make(Product, unit_price=Decimal("20.00"))
+        product.promotions.add(promotion)
+        api_client.get(f"/store/products/{product.id}/")
+
+        promotion.delete()
+        response = api_client.get(f"/store/products/{product.id}/")
+
+        assert response.data["price_with_tax"] == price_with_tax("20.00")  # type: ignore
+
+    def test_if_cleared_promotions_reprice_products(self, api_client):
+        promotion = baker.make(Promotion, discount=50)
+        product = baker.make(Product, unit_price=Decimal("20.00"))
+        promotion.product_set.add(product)
+        api_client.get(f"/store/products/{product.id}/")
+
+        promotion.product_set.clear()
+        response = api_client.get(f"/store/products/{product.id}/")
+
+        assert response.data["price_with_tax"] == price_with_tax("20.00")  # type: ignore
+
+    def test_if_cart_and_checkout_use_promotion_prices(self, api_client):
+        product = baker.make(Product, unit_price=Decimal("20.00"), inventory=10)
+        product.promotions.add(baker.make(Promotion, discount=10))
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=product, quantity=2)
+
+        response = api_client.get(f"/store/carts/{cart.id}/")
+        serializer = CreateOrderSerializer(
+            data={"cart_id": str(cart.id)},
+            context={"customer_id": baker.make(settings.AUTH_USER_MODEL).customer.id},
+        )
+        serializer.is_valid(raise_exception=True)
+        order = serializer.save()
+
+        assert response.data["items"][0]["total_price"] == Decimal("36.00")  # type: ignore
+        assert response.data["total_price"] == Decimal("36.00")  # type: ignore
+        assert order.total == Decimal("36.00")
+        assert order.items.get().unit_price == Decimal("18.00")
+
+    def test_if_redis_cart_uses_promotion_prices(self, api_client, settings):
+        settings.CART_STORE = "store.carts.RedisCartStore"
+        product = baker.make(Product, unit_price=Decimal("20.00"))
+        product.promotions.add(baker.make(Promotion, discount=10))
+        cart_id = api_client.post("/store/carts/").data["id"]  # type: ignore
+        api_client.post(f"/store/carts/{cart_id}/items/", {"product_id": product.id, "quantity": 1})
+
+        response = api_client.get(f"/store/carts/{cart_id}/items/")
+
+        assert response.data[0]["total_price"] == Decimal("18.00")  # type: ignore
@@ -0,0 +1,119 @@
+from io import BytesIO
+from django.contrib.admin.sites import site
+from django.core.files.uploadedfile import SimpleUploadedFile
+from model_bakery import baker
+from PIL import Image
+from rest_framework import status
+import pytest
+
+from store.admin import ProductImageInline
+from store.models import Product, ProductImage
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+def jpeg(size=(1200, 800)):
+    buffer = BytesIO()
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    Image.new("RGB", size, "red").save(buffer, "JPEG", exif=exif, quality=50)
+    return SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+
+@pytest.mark.django_db
+class TestProductImageVariants:
+    def test_if_upload_returns_before_variants_are_rendered(
+        self, api_client, django_capture_on_commit_callbacks
+    ):
+        product = baker.make(Product)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post(
+                f"/store/products/{product.id}/images/", {"image": jpeg()}, format="multipart"
+            )
+            assert response.status_code == status.HTTP_201_CREATED
+            assert response.data["variants"] == {}  # type: ignore
+
+        product_image = ProductImage.objects.get()
+        assert set(product_image.variants) == {"thumbnail", "medium"}
+
+    def test_if_variants_are_resized_webp_and_stripped(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image = baker.make(ProductImage, image=jpeg())
+
+        product_image.refresh_from_db()
+        storage = product_image.image.storage
+        for variant, size in [("thumbnail", 150), ("medium", 600)]:
+            with Image.open(storage.path(product_image.variants[variant]["webp"])) as image:
+                assert image.format == "WEBP"
+                assert max(image.size) == size
+            with Image.open(storage.path(product_image.variants[variant]["jpeg"])) as image:
+                assert image.format == "JPEG"
+                assert not image.getexif()
+
+    def test_if_product_exposes_variant_urls(self, api_client, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image = baker.make(ProductImage, image=jpeg())
+
+        response = api_client.get(f"/store/products/{product_image.product_id}/")
+
+        variants = response.data["images"][0]["variants"]  # type: ignore
+        assert variants["thumbnail"]["webp"].startswith("http://testserver/media/")
+        assert variants["thumbnail"]["webp"].endswith("_thumbnail.webp")
+
+    def test_if_admin_shows_the_thumbnail_variant(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image = baker.make(ProductImage, image=jpeg())
+        product_image = ProductImage.objects.get(pk=product_image.pk)
+
+        html = ProductImageInline(Product, site).thumbnail(product_image)
+
+        assert "_thumbnail.jpg" in html
+
+    def test_if_unreadable_upload_is_recorded_on_the_row(
+        self, django_capture_on_commit_callbacks
+    ):
+        upload = SimpleUploadedFile("photo.jpg", b"not a jpeg", content_type="image/jpeg")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image = baker.make(ProductImage, image=upload)
+
+        product_image.refresh_from_db()
+        assert product_image.variants == {}
+        assert "cannot identify image file" in product_image.processing_error
+
+    def test_if_variants_are_deleted_with_the_image(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image = baker.make(ProductImage, image=jpeg())
+        product_image.refresh_from_db()
+        storage = product_image.image.storage
+        names = [
+            name for encodings in product_image.variants.values() for name in encodings.values()
+        ]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image.delete()
+
+        assert names
+        assert not any(storage.exists(name) for name in names)
+
+    def test_if_variants_of_a_replaced_image_are_deleted(
+        self, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image = baker.make(ProductImage, image=jpeg())
+        product_image = ProductImage.objects.get(pk=product_image.pk)
+        storage = product_image.image.storage
+        old = product_image.variants["thumbnail"]["webp"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image.image = jpeg()
+            product_image.save()
+
+        product_image.refresh_from_db()
+        assert not storage.exists(old)
+        assert storage.exists(product_image.variants["thumbnail"]["webp"])
+        assert product_image.variants["thumbnail"]["webp"] != old
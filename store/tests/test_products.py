@@ -0,0 +1,273 @@
+from decimal import Decimal
+from django.db import connection, connections
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from model_bakery import baker
+import pytest
+
+from store import cache as catalog_cache
+from store.models import Collection, Product, ProductImage
+from store.search import (
+    ProductSearchFilter,
+    install_search_index,
+    match_products,
+    rebuild_search_index,
+)
+
+
+@pytest.mark.django_db
+class TestProductCache:
+    def test_if_list_is_served_from_cache_on_second_request(self, api_client):
+        baker.make(Product, _quantity=3)
+
+        api_client.get("/store/products/")
+        response = api_client.get("/store/products/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == 3  # type: ignore
+        assert catalog_cache.stats()["hits"] == 1
+        assert catalog_cache.stats()["misses"] == 1
+
+    def test_if_query_params_are_part_of_the_key(self, api_client):
+        baker.make(Product, _quantity=3)
+
+        api_client.get("/store/products/")
+        api_client.get("/store/products/?ordering=unit_price")
+        api_client.get("/store/products/?page=1")
+
+        assert catalog_cache.stats()["misses"] == 3
+
+    def test_if_product_update_invalidates_detail(self, api_client):
+        product = baker.make(Product, title="a")
+        api_client.get(f"/store/products/{product.id}/")
+
+        product.title = "b"
+        product.save()
+        response = api_client.get(f"/store/products/{product.id}/")
+
+        assert response.data["title"] == "b"  # type: ignore
+
+    def test_if_collection_change_invalidates_both_collection_lists(self, api_client):
+        old, new = baker.make(Collection, _quantity=2)
+        product = baker.make(Product, collection=old)
+        api_client.get(f"/store/products/?collection_id={old.id}")
+        api_client.get(f"/store/products/?collection_id={new.id}")
+
+        product = Product.objects.get(pk=product.id)
+        product.collection = new
+        product.save()
+        old_response = api_client.get(f"/store/products/?collection_id={old.id}")
+        new_response = api_client.get(f"/store/products/?collection_id={new.id}")
+
+        assert old_response.data["results"] == []  # type: ignore
+        assert len(new_response.data["results"]) == 1  # type: ignore
+
+    def test_if_other_collection_list_stays_cached(self, api_client):
+        collection, other = baker.make(Collection, _quantity=2)
+        baker.make(Product, collection=other)
+        api_client.get(f"/store/products/?collection_id={other.id}")
+
+        baker.make(Product, collection=collection)
+        api_client.get(f"/store/products/?collection_id={other.id}")
+
+        assert catalog_cache.stats()["hits"] == 1
+
+
+@pytest.mark.django_db
+class TestListProducts:
+    def test_if_list_item_matches_detail_payload(self, api_client):
+        product = baker.make(Product, unit_price=Decimal("12.30"))
+        baker.make(ProductImage, product=product, image="store/images/a.jpg")
+
+        list_response = api_client.get("/store/products/")
+        detail_response = api_client.get(f"/store/products/{product.id}/")
+
+        assert list_response.status_code == status.HTTP_200_OK
+        assert list_response.json()["results"] == [detail_response.json()]
+
+    @pytest.mark.parametrize("page_size", [1, 10])
+    def test_if_query_count_does_not_depend_on_page_size(
+        self, api_client, django_assert_num_queries, page_size
+    ):
+        for product in baker.make(Product, _quantity=page_size):
+            baker.make(ProductImage, product=product, _quantity=2)
+
+        # The page of products with their discounts, tags and stored like
+        # counts, and one query for all their images
+        with django_assert_num_queries(2):
+            response = api_client.get("/store/products/")
+
+        assert len(response.data["results"]) == page_size  # type: ignore
+
+
+@pytest.mark.django_db
+class TestPaginateProducts:
+    def walk(self, api_client, url):
+        ids = []
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            ids += [product["id"] for product in response.data["results"]]  # type: ignore
+            url = response.data["next"]  # type: ignore
+        return ids
+
+    def test_if_page_numbers_stay_the_default(self, api_client):
+        baker.make(Product, _quantity=25)
+
+        response = api_client.get("/store/products/?page=3")
+
+        assert response.data["count"] == 25  # type: ignore
+        assert len(response.data["results"]) == 5  # type: ignore
+        assert response.data["next"] is None  # type: ignore
+        assert api_client.get("/store/products/?page=4").status_code == 404
+
+    def test_if_cursor_pages_cover_every_product_once(self, api_client):
+        products = baker.make(Product, unit_price=Decimal(5), _quantity=15)
+        products += baker.make(Product, unit_price=Decimal(3), _quantity=10)
+
+        ids = self.walk(api_client, "/store/products/?cursor=&ordering=-unit_price")
+
+        expected = sorted(products, key=lambda product: (-product.unit_price, -product.id))
+        assert ids == [product.id for product in expected]
+
+    def test_if_previous_link_returns_the_previous_page(self, api_client):
+        baker.make(Product, _quantity=25)
+        first = api_client.get("/store/products/?cursor=&ordering=last_update")
+        second = api_client.get(first.data["next"])  # type: ignore
+
+        response = api_client.get(second.data["previous"])  # type: ignore
+
+        assert response.data["results"] == first.data["results"]  # type: ignore
+        assert response.data["previous"] is None  # type: ignore
+
+    def test_if_cursor_is_invalid_returns_404(self, api_client):
+        response = api_client.get("/store/products/?cursor=bogus")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestSearchProducts:
+    def test_if_results_are_ranked_by_relevance(self, api_client):
+        in_description = baker.make(Product, title="mug", description="a coffee mug")
+        in_title = baker.make(Product, title="coffee beans", description="beans")
+        baker.make(Product, title="tea", description="green tea")
+
+        response = api_client.get("/store/products/?search=coffee")
+
+        ids = [product["id"] for product in response.data["results"]]  # type: ignore
+        assert ids == [in_title.id, in_description.id]
+
+    def test_if_search_is_kept_current_on_save(self, api_client):
+        product = baker.make(Product, title="coffee", description="")
+        product.title = "tea"
+        product.save()
+
+        response = api_client.get("/store/products/?search=coffee")
+
+        assert response.data["results"] == []  # type: ignore
+
+    def test_if_search_combines_with_filters_and_pagination(self, api_client):
+        collection = baker.make(Collection)
+        matches = baker.make(
+            Product, title="coffee", unit_price=Decimal(5), collection=collection, _quantity=12
+        )
+        baker.make(Product, title="coffee", unit_price=Decimal(50), collection=collection)
+        baker.make(Product, title="coffee", unit_price=Decimal(5))
+
+        url = f"/store/products/?search=coffee&collection_id={collection.id}&price_lt=10"
+        first = api_client.get(url)
+        second = api_client.get(first.data["next"])  # type: ignore
+
+        ids = [product["id"] for product in first.data["results"] + second.data["results"]]  # type: ignore
+        assert sorted(ids) == sorted(product.id for product in matches)
+        assert second.data["next"] is None  # type: ignore
+
+    def test_if_search_vector_has_a_gin_index(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, "store_product")
+
+        index = constraints["product_search_vector_gin"]
+        assert index["type"] == "gin"
+        assert index["columns"] == ["search_vector"]
+
+
+@pytest.fixture
+def sqlite_products(tmp_path):
+    # A throwaway SQLite database with just the store_product columns search reads.
+    alias = "search_sqlite"
+    sqlite_settings = {"ENGINE": "django.db.backends.sqlite3", "NAME": str(tmp_path / "db.sqlite3")}
+    connections.settings[alias] = connections.configure_settings(
+        {**connections.settings, alias: sqlite_settings}
+    )[alias]
+    sqlite = connections[alias]
+    with sqlite.cursor() as cursor:
+        cursor.execute(
+            "CREATE TABLE store_product (id integer PRIMARY KEY, title text, description text)"
+        )
+    yield alias
+    sqlite.close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+def insert_products(alias, *rows):
+    with connections[alias].cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO store_product (id, title, description) VALUES (%s, %s, %s)", rows
+        )
+
+
+@pytest.mark.django_db
+class TestSqliteSearch:
+    def test_if_fts5_matches_title_and_description(self, sqlite_products):
+        install_search_index(using=sqlite_products)
+        insert_products(
+            sqlite_products, (1, "mug", "a coffee mug"), (2, "coffee beans", "beans"), (3, "tea", "green tea")
+        )
+
+        products = match_products(Product.objects.using(sqlite_products), "coffee")
+
+        assert sorted(products.values_list("id", flat=True)) == [1, 2]
+
+    def test_if_results_are_ranked_by_relevance(self, sqlite_products):
+        install_search_index(using=sqlite_products)
+        insert_products(sqlite_products, (1, "mug", "a coffee mug"), (2, "coffee beans", "beans"))
+        request = Request(APIRequestFactory().get("/store/products/?search=coffee"))
+
+        products = ProductSearchFilter().filter_queryset(
+            request, Product.objects.using(sqlite_products), None
+        )
+
+        assert list(products.values_list("id", flat=True)) == [2, 1]
+
+    def test_if_triggers_keep_the_index_current(self, sqlite_products):
+        install_search_index(using=sqlite_products)
+        insert_products(sqlite_products, (1, "coffee", ""), (2, "coffee", ""))
+        with connections[sqlite_products].cursor() as cursor:
+            cursor.execute("UPDATE store_product SET title = 'tea' WHERE id = 1")
+            cursor.execute("DELETE FROM store_product WHERE id = 2")
+
+        products = Product.objects.using(sqlite_products)
+
+        assert not match_products(products, "coffee").exists()
+        assert list(match_products(products, "tea").values_list("id", flat=True)) == [1]
+
+    def test_if_rebuild_indexes_existing_rows(self, sqlite_products):
+        insert_products(sqlite_products, (1, "coffee", ""))
+        install_search_index(using=sqlite_products)
+
+        count = rebuild_search_index(using=sqlite_products)
+
+        products = match_products(Product.objects.using(sqlite_products), "coffee")
+        assert count == 1
+        assert list(products.values_list("id", flat=True)) == [1]
+
+    def test_if_query_syntax_in_input_is_quoted(self, sqlite_products):
+        install_search_index(using=sqlite_products)
+        insert_products(sqlite_products, (1, 'the "best" coffee', "NEAR(beans)"))
+
+        products = match_products(Product.objects.using(sqlite_products), 'NEAR( "best')
+
+        assert list(products.values_list("id", flat=True)) == [1]
@@ -0,0 +1,91 @@
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+import msgpack
+import pytest
+
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+from store.models import Cart, Collection, Product
+
+
+@pytest.mark.django_db
+class TestRenderers:
+    def test_if_orjson_matches_drf_json(self, api_client):
+        product = baker.make(Product, unit_price=Decimal("10.05"))
+
+        response = api_client.get(f"/store/products/{product.id}/")
+
+        assert response["Content-Type"] == "application/json"
+        assert response.content == JSONRenderer().render(response.data)
+
+    def test_if_msgpack_is_negotiated(self, api_client):
+        product = baker.make(Product, unit_price=Decimal("10.05"))
+
+        response = api_client.get(
+            f"/store/products/{product.id}/", HTTP_ACCEPT="application/msgpack"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/msgpack"
+        data = msgpack.unpackb(response.content)
+        assert data["unit_price"] == "10.05"
+        assert data["price_with_tax"] == pytest.approx(11.055)
+
+    def test_if_client_without_msgpack_gets_json(self, api_client):
+        product = baker.make(Product, unit_price=Decimal("10.05"))
+
+        response = api_client.get(
+            f"/store/products/{product.id}/", HTTP_ACCEPT="application/json, */*;q=0.8"
+        )
+
+        assert response["Content-Type"] == "application/json"
+        assert response.json()["unit_price"] == "10.05"
+
+    def test_if_views_that_did_not_opt_in_keep_drf_json(self, api_client):
+        baker.make(Collection)
+
+        response = api_client.get("/store/collections/")
+        msgpack_response = api_client.get(
+            "/store/collections/", HTTP_ACCEPT="application/msgpack"
+        )
+
+        assert type(response.accepted_renderer) is JSONRenderer
+        assert msgpack_response.status_code == status.HTTP_406_NOT_ACCEPTABLE
+
+    def test_if_msgpack_encodes_cart_uuid(self, api_client):
+        cart = baker.make(Cart)
+
+        response = api_client.get(f"/store/carts/{cart.id}/?format=msgpack")
+
+        assert msgpack.unpackb(response.content)["id"] == str(cart.id)
+
+    def test_if_renderers_encode_decimals_and_uuids(self):
+        cart = baker.prepare(Cart)
+        data = {"id": cart.id, "price": Decimal("1.50"), "items": ({"n": 1},)}
+
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+        assert msgpack.unpackb(MessagePackRenderer().render(data)) == {
+            "id": str(cart.id),
+            "price": 1.5,
+            "items": [{"n": 1}],
+        }
+
+    def test_if_malformed_json_returns_400(self, api_client):
+        response = api_client.post(
+            "/store/carts/", "{not json", content_type="application/json"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "JSON parse error" in response.data["detail"]  # type: ignore
+
+    def test_if_benchmark_reports_every_renderer(self):
+        baker.make(Product, _quantity=3)
+        out = StringIO()
+
+        call_command("benchmark_renderers", "--iterations", "2", stdout=out)
+
+        for name in ["drf json", "orjson", "msgpack"]:
+            assert name in out.getvalue()
@@ -0,0 +1,84 @@
+from django.contrib.contenttypes.models import ContentType
+from model_bakery import baker
+import pytest
+
+from store.models import Product
+from tags.models import Tag, TaggedItem
+
+
+def tag(product, *labels):
+    content_type = ContentType.objects.get_for_model(Product)
+    for label in labels:
+        tag = Tag.objects.filter(label=label).first() or baker.make(Tag, label=label)
+        TaggedItem.objects.create(tag=tag, content_type=content_type, object_id=product.id)
+
+
+@pytest.mark.django_db
+class TestProductTags:
+    def test_if_tags_are_listed_with_products(self, api_client):
+        product, untagged = baker.make(Product, _quantity=2)
+        tag(product, "vegan", "organic")
+
+        response = api_client.get("/store/products/")
+        detail = api_client.get(f"/store/products/{product.id}/")
+
+        tags = {row["id"]: row["tags"] for row in response.data["results"]}  # type: ignore
+        assert tags == {product.id: ["organic", "vegan"], untagged.id: []}
+        assert detail.data["tags"] == ["organic", "vegan"]  # type: ignore
+
+    def test_if_other_models_tags_are_ignored(self, api_client):
+        product = baker.make(Product)
+        TaggedItem.objects.create(
+            tag=baker.make(Tag, label="staff"),
+            content_type=ContentType.objects.get_for_model(Tag),
+            object_id=product.id,
+        )
+
+        response = api_client.get(f"/store/products/{product.id}/")
+
+        assert response.data["tags"] == []  # type: ignore
+
+    def test_if_products_are_filtered_by_any_tag(self, api_client):
+        vegan, organic, plain = baker.make(Product, _quantity=3)
+        tag(vegan, "vegan")
+        tag(organic, "organic", "vegan")
+
+        response = api_client.get("/store/products/?tags=vegan, organic")
+        missing = api_client.get("/store/products/?tags=gluten-free")
+        blank = api_client.get("/store/products/?tags=,")
+
+        assert [row["id"] for row in response.data["results"]] == [vegan.id, organic.id]  # type: ignore
+        assert missing.data["results"] == []  # type: ignore
+        assert len(blank.data["results"]) == 3  # type: ignore
+
+    def test_if_tagging_invalidates_cached_product(self, api_client):
+        product = baker.make(Product)
+        etag = api_client.get(f"/store/products/{product.id}/")["ETag"]
+
+        tag(product, "vegan")
+        response = api_client.get(f"/store/products/{product.id}/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert response.data["tags"] == ["vegan"]  # type: ignore
+
+    def test_if_relabeling_invalidates_cached_products(self, api_client):
+        product = baker.make(Product)
+        tag(product, "vegn")
+        api_client.get("/store/products/")
+
+        relabeled = Tag.objects.get(label="vegn")
+        relabeled.label = "vegan"
+        relabeled.save()
+        response = api_client.get("/store/products/")
+
+        assert response.data["results"][0]["tags"] == ["vegan"]  # type: ignore
+
+    def test_if_untagging_invalidates_cached_product(self, api_client):
+        product = baker.make(Product)
+        tag(product, "vegan")
+        api_client.get(f"/store/products/{product.id}/")
+
+        TaggedItem.objects.get().delete()
+        response = api_client.get(f"/store/products/{product.id}/")
+
+        assert response.data["tags"] == []  # type: ignore
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register("products", views.ProductViewSet, basename="products")
@@ -19,4 +19,11 @@ urlpatterns = [
     path(r"", include(router.urls)),
     path(r"", include(product_router.urls)),
     path(r"", include(cart_item_router.urls)),
+    path("async/products/", async_views.product_list, name="async-products-list"),
+    path(
+        "async/products/<int:pk>/",
+        async_views.product_detail,
+        name="async-products-detail",
+    ),
+    path("async/collections/", async_views.collection_list, name="async-collection-list"),
 ]
@@ -1,10 +1,12 @@
-from django.db.models.aggregates import Count
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import Http404
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.mixins import (
     CreateModelMixin,
     RetrieveModelMixin,
@@ -12,14 +14,24 @@ from rest_framework.mixins import (
 )
 from rest_framework.viewsets import GenericViewSet
 from rest_framework import status
-from .filters import ProductFiltering
-from .pagination import DefaultPagination
+from rest_framework.exceptions import ValidationError
+from core.parsers import FAST_PARSER_CLASSES
+from core.renderers import FAST_RENDERER_CLASSES
+from likes.counters import LikeCounter
+from . import cache as catalog_cache
+from . import conditional, exports, likes
+from .authentication import CustomerRequestMixin
+from .carts import get_cart_store
+from .conditional import ConditionalGetMixin
+from .filters import OrderExportFiltering, ProductFiltering
+from .pagination import OptInKeysetPagination, ProductPagination
+from .search import ProductSearchFilter
 from .models import (
     Cart,
-    CartItem,
     Collection,
     Customer,
     Order,
+    OrderItem,
     Product,
     ProductImage,
     Reviews,
@@ -32,8 +44,10 @@ from .serializers import (
     CreateOrderSerializer,
     CustomerSerializer,
     OrderSerializer,
+    OrderSummarySerializer,
     OrderUpdateSerializer,
     ProductImageSerializer,
+    ProductRowSerializer,
     ProductSerializer,
     ReviewSerializer,
     UpdateCartItemSerializer,
@@ -41,20 +55,82 @@ from .serializers import (
 from .permissions import IsAdminOrReadOnly, ViewCustomerHistoryPermission
 
 
-class ProductViewSet(ModelViewSet):
-    queryset = Product.objects.select_related("collection")
+class ProductViewSet(ConditionalGetMixin, ModelViewSet):
+    queryset = (
+        Product.objects.for_catalog().defer("search_vector").prefetch_related("images")
+    )
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
     filterset_class = ProductFiltering
-    pagination_class = DefaultPagination
+    pagination_class = ProductPagination
     search_fields = ["title", "description"]
     ordering_fields = ["unit_price", "last_update"]
     permission_classes = [IsAdminOrReadOnly]
+    renderer_classes = FAST_RENDERER_CLASSES
+
+    def get_queryset(self):
+        if self.action == "list":
+            return Product.objects.for_catalog().values(*ProductRowSerializer.Meta.fields)
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return ProductRowSerializer
+        return ProductSerializer
 
     def get_serializer_context(self):
-        print(self.request.query_params)  # type: ignore
         return {"request": self.request}
 
+    def list(self, request, *args, **kwargs):
+        key = catalog_cache.product_list_key(request)
+        return self.cached_response(key, request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, pk, *args, **kwargs):
+        if not pk.isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        key = catalog_cache.product_detail_key(request, pk)
+        return self.cached_response(key, request, super().retrieve, *args, **kwargs)
+
+    def get_validators(self, request, rows):
+        rows = list(rows)
+        self.catalog_validators = super().get_validators(request, rows)
+        self.like_counts = likes.counts(
+            [conditional.get_value(row, "id") for row in rows], likes.stored_counts(rows)
+        )
+        etag, last_modified = self.catalog_validators
+        return likes.etag(etag, self.like_counts), last_modified
+
+    def cached_response(self, key, request, handler, *args, **kwargs):
+        # Cached entries keep their catalog validators, so a hit can still
+        # answer 304. Like counts are added on the way out.
+        cached = catalog_cache.get_cached(key)
+        if cached is not None:
+            data, etag, last_modified = cached
+            like_counts = likes.counts(likes.product_ids(data))
+            etag = likes.etag(etag, like_counts)
+            response = conditional.not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+            data = likes.with_likes(data, like_counts)
+            return conditional.set_validators(Response(data), etag, last_modified)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            catalog_cache.set_cached(key, (response.data, *self.catalog_validators))
+            response.data = likes.with_likes(response.data, self.like_counts)
+        return response
+
+    @action(detail=True, methods=["post", "delete"], permission_classes=[IsAuthenticated])
+    def like(self, request, pk):
+        # No row is written here, see likes.counters.flush().
+        if not pk.isdigit() or not Product.objects.filter(pk=pk).exists():
+            raise Http404
+        counter = LikeCounter(Product)
+        if request.method == "POST":
+            count = counter.like(int(pk), request.user.id)
+        else:
+            count = counter.unlike(int(pk), request.user.id)
+        return Response({"likes": count})
+
     def destroy(self, request, pk, *args, **kwargs):
         product = self.get_object()
         if product.orderitems.count() > 0:
@@ -67,14 +143,14 @@ class ProductViewSet(ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class COllectionViewSet(ModelViewSet):
+class COllectionViewSet(ConditionalGetMixin, ModelViewSet):
     serializer_class = CollectionSerializer
     permission_classes = [IsAdminOrReadOnly]
-    queryset = Collection.objects.annotate(products_count=Count("products")).all()
+    queryset = Collection.objects.all()
 
     def destroy(self, request, *args, **kwargs):
         collection = self.get_object()
-        if collection.products.count() > 0:
+        if collection.products_count > 0:
             return Response(
                 {
                     "error": "Collection cannot be deleted because it includes one or more products."
@@ -86,6 +162,7 @@ class COllectionViewSet(ModelViewSet):
 
 class ReviewViewset(ModelViewSet):
     serializer_class = ReviewSerializer
+    pagination_class = OptInKeysetPagination
 
     def get_serializer_context(self):
         return {"product_id": self.kwargs["product_pk"]}
@@ -98,12 +175,28 @@ class CartViewSet(
     CreateModelMixin, DestroyModelMixin, RetrieveModelMixin, GenericViewSet
 ):
     serializer_class = CartSerializer
-    queryset = Cart.objects.prefetch_related("items__product").all()
+    queryset = Cart.objects.none()
+    renderer_classes = FAST_RENDERER_CLASSES
+    parser_classes = FAST_PARSER_CLASSES
+
+    def get_object(self):
+        cart = get_cart_store().get(self.kwargs["pk"])
+        if cart is None:
+            raise Http404
+        return cart
+
+    def perform_create(self, serializer):
+        serializer.instance = get_cart_store().create()
+
+    def perform_destroy(self, instance):
+        get_cart_store().delete(instance)
 
 
 class CartItemViewSet(ModelViewSet):
     http_method_names = ["put", "get", "post"]
     serializer_class = CartItemSerializer
+    renderer_classes = FAST_RENDERER_CLASSES
+    parser_classes = FAST_PARSER_CLASSES
 
     def get_serializer_class(self):
         if self.request.method == "POST":
@@ -112,16 +205,28 @@ class CartItemViewSet(ModelViewSet):
             return UpdateCartItemSerializer
         return CartItemSerializer
 
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     def get_queryset(self):
-        return CartItem.objects.select_related("product").filter(
-            cart_id=self.kwargs["cart_pk"]
-        )
+        return get_cart_store().items(self.kwargs["cart_pk"])
+
+    def get_object(self):
+        cart_item = get_cart_store().get_item(self.kwargs["cart_pk"], self.kwargs["pk"])
+        if cart_item is None:
+            raise Http404
+        return cart_item
 
     def get_serializer_context(self):
         return {"cart_id": self.kwargs["cart_pk"]}
 
 
-class CustomerViewSet(ModelViewSet):
+class CustomerViewSet(CustomerRequestMixin, ModelViewSet):
     serializer_class = CustomerSerializer
     queryset = Customer.objects.all()
     permission_classes = [IsAdminUser]
@@ -132,7 +237,7 @@ class CustomerViewSet(ModelViewSet):
 
     @action(detail=False, methods=["GET", "PUT"], permission_classes=[IsAuthenticated])
     def me(self, request):
-        user = Customer.objects.get(user_id=request.user.id)
+        user = get_object_or_404(Customer, pk=request.customer_id)
         if request.method == "GET":
             serializer = CustomerSerializer(user)
             return Response(serializer.data)
@@ -143,39 +248,77 @@ class CustomerViewSet(ModelViewSet):
             return Response(serializer.data)
 
 
-class OrderViewSet(ModelViewSet):
+def order_items_prefetch():
+    # Only the columns OrderItemSerializer/SimpleProductSerializer render.
+    return Prefetch(
+        "items",
+        queryset=OrderItem.objects.select_related("product").only(
+            "id",
+            "order_id",
+            "quantity",
+            "unit_price",
+            "product__id",
+            "product__title",
+            "product__unit_price",
+        ),
+    )
+
+
+class OrderViewSet(CustomerRequestMixin, ModelViewSet):
     http_method_names = ["get", "patch", "post", "delete", "head", "options"]
+    pagination_class = OptInKeysetPagination
 
     def get_serializer_class(self):
         if self.request.method == "POST":
             return CreateOrderSerializer
         elif self.request.method == "PATCH":
             return OrderUpdateSerializer
+        elif self.is_summary():
+            return OrderSummarySerializer
         return OrderSerializer
 
+    def is_summary(self):
+        return self.action == "list" and "summary" in self.request.query_params
+
     def get_permissions(self):
-        if self.request.method in ["PATCH", "DELETE"]:
+        if self.request.method in ["PATCH", "DELETE"] or self.action == "export":
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:  # type: ignore
-            return Order.objects.all()
-        customer_id = Customer.objects.only("id").get(user_id=user.id)  # type: ignore
-        return Order.objects.filter(customer_id=customer_id)
+            queryset = Order.objects.all()
+        else:
+            queryset = Order.objects.filter(customer_id=self.request.customer_id)  # type: ignore
+        if self.action in ["list", "retrieve"] and not self.is_summary():
+            queryset = queryset.prefetch_related(order_items_prefetch())
+        return queryset
 
     def create(self, request, *args, **kwargs):
         serializer = CreateOrderSerializer(
-            data=request.data, context={"user_id": self.request.user.id}  # type: ignore
+            data=request.data, context={"customer_id": request.customer_id}
         )
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
+        prefetch_related_objects([order], order_items_prefetch())
         serializer = OrderSerializer(order)
         return Response(serializer.data)
 
+    @action(detail=False)
+    def export(self, request):
+        filterset = OrderExportFiltering(
+            request.query_params, queryset=OrderItem.objects.all()
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        file_type = request.query_params.get("file_type", "csv")
+        if file_type not in exports.FORMATS:
+            raise ValidationError({"file_type": f"Choose one of {list(exports.FORMATS)}."})
+        return exports.streaming_response(filterset.qs, file_type)
+
 
-class ProductImageViewSet(ModelViewSet):
+class ProductImageViewSet(ConditionalGetMixin, ModelViewSet):
     serializer_class = ProductImageSerializer
     def get_serializer_context(self):
         return {'product_id':self.kwargs['product_pk']}
@@ -1,5 +1,10 @@
 import os
+import time
 from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_init
+from prometheus_client import start_http_server
+
+from core import metrics
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "storefront.settings.dev")
 
@@ -7,3 +12,25 @@ celery = Celery("storefront", broker_connection_retry_on_startup=True)
 celery.config_from_object("django.conf:settings", namespace="CELERY")
 celery.conf.broker_connection_retry_on_startup = True
 celery.autodiscover_tasks()
+
+
+@task_prerun.connect
+def start_task_timer(task_id, task, **kwargs):
+    task.request.metrics_started_at = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task(task_id, task, state=None, **kwargs):
+    started_at = getattr(task.request, "metrics_started_at", None)
+    if started_at is not None:
+        metrics.TASK_LATENCY.labels(task=task.name, state=state or "UNKNOWN").observe(
+            time.perf_counter() - started_at
+        )
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    # Prefork children report through PROMETHEUS_MULTIPROC_DIR, see metrics.registry().
+    port = os.environ.get("CELERY_METRICS_PORT")
+    if port:
+        start_http_server(int(port), registry=metrics.registry())
@@ -37,6 +37,8 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    # Registers OpClass for the index expressions on core.User.
+    "django.contrib.postgres",
     # new
     "debug_toolbar",
     "django_filters",
@@ -53,6 +55,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.PrometheusMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -143,12 +146,14 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "core.User"
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "store.authentication.CustomerJWTAuthentication",
     ),
 }
 SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("JWT",),
     "ACCESS_TOKEN_LIFETIME": timedelta(days=5),
+    # Adds the customer_id claim, see store.authentication.
+    "TOKEN_OBTAIN_SERIALIZER": "store.authentication.CustomerTokenObtainPairSerializer",
 }
 DJOSER = {
     "SERIALIZERS": {
@@ -157,13 +162,31 @@ DJOSER = {
     }
 }
 
+# Addresses allowed to scrape /metrics without signing in as staff. Set it per
+# deployment to the scraper's address: behind a local proxy every request
+# comes from loopback, so allowing it by default would open /metrics to all.
+METRICS_ALLOWED_IPS = []
+
+CATALOG_CACHE_TIMEOUT = 60 * 15
+# Customer ids of users whose tokens predate the customer_id claim.
+CUSTOMER_CACHE_TIMEOUT = 60 * 5
+# "store.carts.RedisCartStore" keeps carts in the default cache until checkout.
+CART_STORE = "store.carts.DatabaseCartStore"
+CART_TTL = 60 * 60 * 24 * 7
+# Seconds between writes of the likes buffered in Redis to likes_likeditem.
+LIKES_FLUSH_INTERVAL = 10
+
 CELERY_BEAT_SCHEDULE = {
     "sina": {
         "task": "playground.tasks.sina",
         "schedule": 5,
         "args": ["dash"],
         "kwargs": {},
-    }
+    },
+    "flush-likes": {
+        "task": "likes.tasks.flush_likes",
+        "schedule": LIKES_FLUSH_INTERVAL,
+    },
 }
 
 
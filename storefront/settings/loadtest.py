@@ -0,0 +1,12 @@
+import os
+
+from .dev import *
+
+# Profile the app the way it runs in production: no debug toolbar, no
+# query logging.
+DEBUG = False
+ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
+# The toolbar middleware is sync-only and would push every ASGI request
+# through a thread.
+MIDDLEWARE = [name for name in MIDDLEWARE if not name.startswith("debug_toolbar.")]
+DATABASES["default"]["NAME"] = os.environ.get("LOAD_TEST_DB_NAME", "storefront_loadtest")
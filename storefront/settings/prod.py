@@ -24,3 +24,4 @@ EMAIL_HOST = os.environ["MAILGUN_SMTP_SERVER"]
 EMAIL_HOST_USER = os.environ["MAILGUN_SMTP_LOGIN"]
 EMAIL_HOST_PASSWORD = os.environ["MAILGUN_SMTP_PASSWORD"]
 EMAIL_PORT = os.environ["MAILGUN_SMTP_PORT"]
+METRICS_ALLOWED_IPS = os.environ.get("METRICS_ALLOWED_IPS", "").split()